@@ -48,106 +48,16 @@ execute_query() {
     echo ""
 }
 
-# 1. Create Daily Sales Summary Table
-execute_query "
-CREATE EXTERNAL TABLE IF NOT EXISTS daily_sales_summary (
-    order_date DATE,
-    total_orders BIGINT,
-    unique_customers BIGINT,
-    total_revenue DOUBLE,
-    avg_order_value DOUBLE,
-    total_units_sold BIGINT,
-    avg_units_per_order DOUBLE
-)
-PARTITIONED BY (
-    year INT,
-    month INT
-)
-STORED AS PARQUET
-LOCATION 's3://$GOLD_BUCKET/daily_sales_summary/'
-" "daily_sales_summary table"
+# Table definitions come from the shared schema registry
+GOLD_TABLES="daily_sales_summary customer_lifetime_value product_performance session_summary conversion_funnel sales_cube"
 
-# 2. Create Customer Lifetime Value Table
-execute_query "
-CREATE EXTERNAL TABLE IF NOT EXISTS customer_lifetime_value (
-    customer_id STRING,
-    total_orders BIGINT,
-    lifetime_value DOUBLE,
-    first_order_date TIMESTAMP,
-    last_order_date TIMESTAMP,
-    avg_order_value DOUBLE,
-    days_as_customer INT,
-    days_since_last_order INT,
-    segment STRING
-)
-PARTITIONED BY (
-    year INT,
-    month INT
-)
-STORED AS PARQUET
-LOCATION 's3://$GOLD_BUCKET/customer_lifetime_value/'
-" "customer_lifetime_value table"
+for TABLE in $GOLD_TABLES; do
+    execute_query "$(python src/common/schema_registry.py gold --bucket $GOLD_BUCKET --table $TABLE)" "$TABLE table"
+done
 
-# 3. Create Product Performance Table
-execute_query "
-CREATE EXTERNAL TABLE IF NOT EXISTS product_performance (
-    product_id STRING,
-    times_ordered BIGINT,
-    units_sold BIGINT,
-    total_revenue DOUBLE,
-    product_name STRING,
-    category STRING,
-    current_price DOUBLE,
-    cost DOUBLE,
-    total_profit DOUBLE,
-    profit_margin DOUBLE,
-    avg_revenue_per_order DOUBLE,
-    revenue_rank DOUBLE
-)
-PARTITIONED BY (
-    year INT,
-    month INT
-)
-STORED AS PARQUET
-LOCATION 's3://$GOLD_BUCKET/product_performance/'
-" "product_performance table"
-
-# 4. Create Conversion Funnel Table
-execute_query "
-CREATE EXTERNAL TABLE IF NOT EXISTS conversion_funnel (
-    event_type STRING,
-    total_events BIGINT,
-    unique_sessions BIGINT,
-    session_conversion_rate DOUBLE,
-    stage_order INT
-)
-PARTITIONED BY (
-    year INT,
-    month INT
-)
-STORED AS PARQUET
-LOCATION 's3://$GOLD_BUCKET/conversion_funnel/'
-" "conversion_funnel table"
-
-# 5. Repair partitions for daily_sales_summary
-execute_query "
-MSCK REPAIR TABLE daily_sales_summary
-" "Repair partitions: daily_sales_summary"
-
-# 6. Repair partitions for customer_lifetime_value
-execute_query "
-MSCK REPAIR TABLE customer_lifetime_value
-" "Repair partitions: customer_lifetime_value"
-
-# 7. Repair partitions for product_performance
-execute_query "
-MSCK REPAIR TABLE product_performance
-" "Repair partitions: product_performance"
-
-# 8. Repair partitions for conversion_funnel
-execute_query "
-MSCK REPAIR TABLE conversion_funnel
-" "Repair partitions: conversion_funnel"
+for TABLE in $GOLD_TABLES; do
+    execute_query "MSCK REPAIR TABLE $TABLE" "Repair partitions: $TABLE"
+done
 
 echo "========================================"
 echo "✅ All Athena Tables Created!"
@@ -161,4 +71,6 @@ echo "Available tables:"
 echo "  - daily_sales_summary"
 echo "  - customer_lifetime_value"
 echo "  - product_performance"
-echo "  - conversion_funnel"
\ No newline at end of file
+echo "  - session_summary"
+echo "  - conversion_funnel"
+echo "  - sales_cube"
\ No newline at end of file
@@ -11,8 +11,16 @@ PACKAGE_DIR=$(mktemp -d)
 echo "Temp directory: $PACKAGE_DIR"
 
 # Copy Lambda function
-echo "Copying lambda_function.py..."
+echo "Copying lambda_function.py and helper modules..."
 cp src/ingestion/lambda_function.py $PACKAGE_DIR/
+cp src/ingestion/schema_validator.py $PACKAGE_DIR/
+cp src/ingestion/spool.py $PACKAGE_DIR/
+cp src/ingestion/request_decoding.py $PACKAGE_DIR/
+cp src/ingestion/dedup_index.py $PACKAGE_DIR/
+cp src/common/pipeline_logging.py $PACKAGE_DIR/
+cp src/common/object_store.py $PACKAGE_DIR/
+cp src/common/partition_catalog.py $PACKAGE_DIR/
+cp src/common/schema_registry.py $PACKAGE_DIR/
 
 # Install only necessary dependencies
 echo "Installing dependencies (this may take a minute)..."
@@ -68,6 +76,17 @@ cd $OLDPWD
 # Cleanup
 rm -rf $PACKAGE_DIR
 
+# Package the quality check Lambda with the shared modules it imports
+# (src/common/ is flattened next to the handler, as for the ingestion Lambda)
+echo "📦 Packaging quality check Lambda..."
+QC_PACKAGE_DIR=$(mktemp -d)
+cp src/orchestration/quality_check_lambda.py $QC_PACKAGE_DIR/
+cp src/common/*.py $QC_PACKAGE_DIR/
+(cd $QC_PACKAGE_DIR && zip -r9 -q quality_check_lambda.zip . -x "*.pyc" -x "*__pycache__*")
+mv $QC_PACKAGE_DIR/quality_check_lambda.zip .
+rm -rf $QC_PACKAGE_DIR
+echo "✅ Package created: quality_check_lambda.zip"
+
 # Get size
 SIZE=$(du -h lambda_function.zip | awk '{print $1}')
 echo "✅ Package created: lambda_function.zip ($SIZE)"
@@ -32,6 +32,8 @@ ORDER BY 1, 2;
 
 -- 2. Conversion Funnel Analysis
 -- Analyze drop-off rates from unique visitors to purchasers
+-- (scans every event; gold conversion_funnel has the same counts per day,
+-- with HLL sketches to roll up any range of days without a rescan)
 SELECT 
     COUNT(DISTINCT CASE WHEN event_type = 'page_view' THEN session_id END) as visitors,
     COUNT(DISTINCT CASE WHEN event_type = 'add_to_cart' THEN session_id END) as cart_adders,
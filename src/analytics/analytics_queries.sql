@@ -99,7 +99,7 @@ SELECT
     units_sold,
     times_ordered,
     profit_margin,
-    revenue_rank
+    RANK() OVER (ORDER BY total_revenue DESC) as revenue_rank
 FROM product_performance
 ORDER BY total_revenue DESC
 LIMIT 20;
@@ -133,6 +133,7 @@ LIMIT 50;
 -- ============================================
 
 -- 9. Conversion Funnel
+-- Latest day; for a range of days merge sessions_sketch (src/processing/hll.py)
 SELECT 
     event_type,
     total_events,
@@ -144,6 +145,7 @@ SELECT
         2
     ) as stage_conversion_rate
 FROM conversion_funnel
+WHERE event_date = (SELECT MAX(event_date) FROM conversion_funnel)
 ORDER BY stage_order;
 
 -- ============================================
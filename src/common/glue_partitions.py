@@ -0,0 +1,98 @@
+"""
+Glue partition registration for event-time partitioned outputs
+
+Silver and gold objects land in the partition of their records' event time,
+so a run can add (late) data to any past partition. Rather than rerunning
+``MSCK REPAIR TABLE``, writers register each partition they write to with
+the Glue Data Catalog, copying the table's storage descriptor.
+
+Registration is enabled by setting GLUE_DATABASE (as config/aws_resources.sh
+does); tables not yet created in Glue are skipped with a warning.
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional, Set, Tuple
+
+from partition_catalog import partition_values
+
+logger = logging.getLogger(__name__)
+
+GLUE_DATABASE = os.environ.get("GLUE_DATABASE", "")
+
+
+class PartitionRegistrar:
+    """Adds the partitions of written objects to Glue tables, once each"""
+
+    def __init__(self, glue, database: str):
+        self.glue = glue
+        self.database = database
+        self._registered: Set[Tuple[str, str]] = set()
+        self._descriptors: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def _storage_descriptor(self, table_name: str) -> Optional[Dict[str, Any]]:
+        if table_name not in self._descriptors:
+            try:
+                table = self.glue.get_table(DatabaseName=self.database, Name=table_name)
+                descriptor = table["Table"]["StorageDescriptor"]
+            except self.glue.exceptions.EntityNotFoundException:
+                logger.warning(
+                    "Glue table %s.%s not found: partitions not registered",
+                    self.database,
+                    table_name,
+                )
+                descriptor = None
+            self._descriptors[table_name] = descriptor
+        return self._descriptors[table_name]
+
+    def register(self, table_name: str, bucket: str, key: str) -> bool:
+        """Register the partition holding ``key``; True if it was added"""
+        values = partition_values(key)
+        if not values:
+            return False
+        location = f"s3://{bucket}/{key.rsplit('/', 1)[0]}/"
+        if (table_name, location) in self._registered:
+            return False
+
+        descriptor = self._storage_descriptor(table_name)
+        if descriptor is None:
+            return False
+
+        response = self.glue.batch_create_partition(
+            DatabaseName=self.database,
+            TableName=table_name,
+            PartitionInputList=[
+                {
+                    "Values": [str(value) for value in values.values()],
+                    "StorageDescriptor": {**descriptor, "Location": location},
+                }
+            ],
+        )
+        self._registered.add((table_name, location))
+
+        errors = [
+            error
+            for error in response.get("Errors", [])
+            if error["ErrorDetail"]["ErrorCode"] != "AlreadyExistsException"
+        ]
+        for error in errors:
+            logger.warning(
+                "Could not register partition %s of %s: %s",
+                location,
+                table_name,
+                error["ErrorDetail"].get("ErrorMessage"),
+            )
+        added = not response.get("Errors")
+        if added:
+            logger.info("Registered partition %s of %s", location, table_name)
+        return added
+
+
+def open_registrar(database: str = GLUE_DATABASE) -> Optional[PartitionRegistrar]:
+    """The configured registrar, or None when GLUE_DATABASE is not set"""
+    if not database:
+        return None
+
+    import boto3
+
+    return PartitionRegistrar(boto3.client("glue"), database)
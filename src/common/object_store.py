@@ -0,0 +1,433 @@
+"""
+Object storage backends for the pipeline's buckets
+
+Every stage reads and writes bucket/key addressed objects through an
+``ObjectStore`` rather than an S3 client, so the same code runs against:
+- ``S3Store``: Amazon S3 through a boto3 client (the default)
+- ``LocalStore``: a directory, one subdirectory per bucket, for offline runs
+  and throughput benchmarks
+- ``MemoryStore``: a dict, for tests and single-process experiments
+
+The backend is chosen with OBJECT_STORE:
+
+    OBJECT_STORE=s3                   # default
+    OBJECT_STORE=local:/tmp/lakehouse
+    OBJECT_STORE=memory
+
+Listings return S3-shaped dicts (``Key``, ``Size``, ``LastModified`` as an
+aware UTC datetime) in key order, so watermark and compaction logic work
+unchanged on every backend. Missing objects raise ``ObjectNotFound``.
+"""
+
+import io
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional
+
+OBJECT_STORE = os.environ.get("OBJECT_STORE", "s3")
+
+# Objects larger than this are uploaded in parts of this size
+MULTIPART_CHUNK_BYTES = int(
+    os.environ.get("MULTIPART_CHUNK_BYTES", str(64 * 1024 * 1024))
+)
+
+
+class ObjectNotFound(KeyError):
+    """The requested object does not exist"""
+
+
+class ObjectStore:
+    """
+    Interface shared by the backends
+
+    ``upload_file`` is built on the multipart calls here; backends with a
+    managed transfer of their own override it.
+    """
+
+    def get(self, bucket: str, key: str) -> bytes:
+        """Whole object contents"""
+        raise NotImplementedError
+
+    def open(self, bucket: str, key: str) -> IO[bytes]:
+        """Readable stream of the object, for reading without buffering it all"""
+        return io.BytesIO(self.get(bucket, key))
+
+    def get_range(self, bucket: str, key: str, start: int, end: int) -> bytes:
+        """Bytes ``start`` up to (not including) ``end``"""
+        raise NotImplementedError
+
+    def size(self, bucket: str, key: str) -> int:
+        raise NotImplementedError
+
+    def put(
+        self,
+        bucket: str,
+        key: str,
+        body: bytes,
+        content_type: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> None:
+        raise NotImplementedError
+
+    def list(
+        self, bucket: str, prefix: str = "", start_after: str = ""
+    ) -> Iterator[Dict[str, Any]]:
+        """Objects under ``prefix`` with keys after ``start_after``, in key order"""
+        raise NotImplementedError
+
+    def delete(self, bucket: str, keys: Iterable[str]) -> None:
+        """Delete objects; missing keys are ignored"""
+        raise NotImplementedError
+
+    def copy(self, bucket: str, source_key: str, key: str) -> None:
+        """Copy an object within a bucket"""
+        self.put(bucket, key, self.get(bucket, source_key))
+
+    def create_multipart(self, bucket: str, key: str) -> str:
+        """Start a multipart upload and return its upload ID"""
+        raise NotImplementedError
+
+    def upload_part(
+        self, bucket: str, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        """Upload one part (numbered from 1) and return its ETag"""
+        raise NotImplementedError
+
+    def complete_multipart(
+        self, bucket: str, key: str, upload_id: str, etags: List[str]
+    ) -> None:
+        """Assemble the parts, in order, into the object"""
+        raise NotImplementedError
+
+    def abort_multipart(self, bucket: str, key: str, upload_id: str) -> None:
+        raise NotImplementedError
+
+    def upload_file(
+        self, fileobj: IO[bytes], bucket: str, key: str, part_size: int = 0
+    ) -> None:
+        """Upload a file object, in parts when it is larger than one part"""
+        part_size = part_size or MULTIPART_CHUNK_BYTES
+        first = fileobj.read(part_size)
+        if len(first) < part_size:
+            self.put(bucket, key, first)
+            return
+
+        upload_id = self.create_multipart(bucket, key)
+        try:
+            etags, data = [], first
+            while data:
+                etags.append(
+                    self.upload_part(bucket, key, upload_id, len(etags) + 1, data)
+                )
+                data = fileobj.read(part_size)
+            self.complete_multipart(bucket, key, upload_id, etags)
+        except BaseException:
+            self.abort_multipart(bucket, key, upload_id)
+            raise
+
+
+class S3Store(ObjectStore):
+    """Amazon S3 through a boto3 client"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _get_object(self, bucket: str, key: str, **kwargs) -> Dict[str, Any]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.get_object(Bucket=bucket, Key=key, **kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise ObjectNotFound(f"s3://{bucket}/{key}") from e
+            raise
+
+    def get(self, bucket: str, key: str) -> bytes:
+        return self._get_object(bucket, key)["Body"].read()
+
+    def open(self, bucket: str, key: str) -> IO[bytes]:
+        return self._get_object(bucket, key)["Body"]
+
+    def get_range(self, bucket: str, key: str, start: int, end: int) -> bytes:
+        response = self._get_object(bucket, key, Range=f"bytes={start}-{end - 1}")
+        return response["Body"].read()
+
+    def size(self, bucket: str, key: str) -> int:
+        return self.client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+
+    def put(self, bucket, key, body, content_type=None, metadata=None) -> None:
+        params: Dict[str, Any] = {"Bucket": bucket, "Key": key, "Body": body}
+        if content_type:
+            params["ContentType"] = content_type
+        if metadata:
+            params["Metadata"] = metadata
+        self.client.put_object(**params)
+
+    def list(self, bucket, prefix="", start_after=""):
+        params = {"Bucket": bucket, "Prefix": prefix}
+        if start_after:
+            params["StartAfter"] = start_after
+        for page in self.client.get_paginator("list_objects_v2").paginate(**params):
+            for obj in page.get("Contents", []):
+                yield {
+                    "Key": obj["Key"],
+                    "Size": obj.get("Size", 0),
+                    "LastModified": obj["LastModified"],
+                }
+
+    def delete(self, bucket, keys):
+        keys = list(keys)
+        # DeleteObjects takes at most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=bucket,
+                Delete={
+                    "Objects": [{"Key": key} for key in keys[start : start + 1000]],
+                    "Quiet": True,
+                },
+            )
+
+    def copy(self, bucket, source_key, key):
+        from botocore.exceptions import ClientError
+
+        # Server-side, in parts for objects over 5 GB
+        try:
+            self.client.copy({"Bucket": bucket, "Key": source_key}, bucket, key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise ObjectNotFound(f"s3://{bucket}/{source_key}") from e
+            raise
+
+    def create_multipart(self, bucket, key):
+        response = self.client.create_multipart_upload(Bucket=bucket, Key=key)
+        return response["UploadId"]
+
+    def upload_part(self, bucket, key, upload_id, part_number, data):
+        response = self.client.upload_part(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return response["ETag"]
+
+    def complete_multipart(self, bucket, key, upload_id, etags):
+        self.client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"ETag": etag, "PartNumber": number}
+                    for number, etag in enumerate(etags, start=1)
+                ]
+            },
+        )
+
+    def abort_multipart(self, bucket, key, upload_id):
+        self.client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+
+    def upload_file(self, fileobj, bucket, key, part_size=0):
+        # boto3's managed transfer uploads the parts concurrently
+        self.client.upload_fileobj(fileobj, bucket, key)
+
+
+class LocalStore(ObjectStore):
+    """
+    Objects as files under ``root/<bucket>/<key>``
+
+    Writes go to a temporary file that is renamed into place, so readers
+    never see a partial object. LastModified is the file's mtime.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._staging = os.path.join(self.root, ".staging")
+        os.makedirs(self._staging, exist_ok=True)
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def _open(self, bucket: str, key: str) -> IO[bytes]:
+        try:
+            return open(self._path(bucket, key), "rb")
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError) as e:
+            raise ObjectNotFound(f"{bucket}/{key}") from e
+
+    def _publish(self, staged: str, bucket: str, key: str) -> None:
+        path = self._path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(staged, path)
+
+    def get(self, bucket, key):
+        with self._open(bucket, key) as f:
+            return f.read()
+
+    def open(self, bucket, key):
+        return self._open(bucket, key)
+
+    def get_range(self, bucket, key, start, end):
+        with self._open(bucket, key) as f:
+            f.seek(start)
+            return f.read(max(0, end - start))
+
+    def size(self, bucket, key):
+        try:
+            return os.path.getsize(self._path(bucket, key))
+        except OSError as e:
+            raise ObjectNotFound(f"{bucket}/{key}") from e
+
+    def put(self, bucket, key, body, content_type=None, metadata=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        staged = os.path.join(self._staging, uuid.uuid4().hex)
+        with open(staged, "wb") as f:
+            f.write(body)
+        self._publish(staged, bucket, key)
+
+    def list(self, bucket, prefix="", start_after=""):
+        bucket_root = os.path.join(self.root, bucket)
+        # Walk only the directory the prefix is certainly inside
+        directory = prefix.rsplit("/", 1)[0] if "/" in prefix else ""
+        yield from self._walk(bucket_root, directory, prefix, start_after)
+
+    def _walk(self, bucket_root, directory, prefix, start_after):
+        try:
+            entries = list(os.scandir(os.path.join(bucket_root, directory)))
+        except (FileNotFoundError, NotADirectoryError):
+            return
+
+        # List in S3 key order: a directory "a" sorts by its keys ("a/...")
+        def sort_key(entry):
+            return entry.name + "/" if entry.is_dir() else entry.name
+
+        for entry in sorted(entries, key=sort_key):
+            key = f"{directory}/{entry.name}" if directory else entry.name
+            if entry.is_dir():
+                child = key + "/"
+                in_prefix = child.startswith(prefix) or prefix.startswith(child)
+                # Every key of the directory sorts at or before start_after
+                consumed = child < start_after and not start_after.startswith(child)
+                if in_prefix and not consumed:
+                    yield from self._walk(bucket_root, key, prefix, start_after)
+            elif key.startswith(prefix) and key > start_after:
+                stat = entry.stat()
+                yield {
+                    "Key": key,
+                    "Size": stat.st_size,
+                    "LastModified": datetime.fromtimestamp(
+                        stat.st_mtime, tz=timezone.utc
+                    ),
+                }
+
+    def delete(self, bucket, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(bucket, key))
+            except FileNotFoundError:
+                pass
+
+    def create_multipart(self, bucket, key):
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self._staging, upload_id))
+        return upload_id
+
+    def upload_part(self, bucket, key, upload_id, part_number, data):
+        with open(
+            os.path.join(self._staging, upload_id, f"{part_number:05d}"), "wb"
+        ) as f:
+            f.write(data)
+        return str(part_number)
+
+    def complete_multipart(self, bucket, key, upload_id, etags):
+        parts = os.path.join(self._staging, upload_id)
+        staged = parts + ".object"
+        with open(staged, "wb") as out:
+            for etag in etags:
+                with open(os.path.join(parts, f"{int(etag):05d}"), "rb") as part:
+                    shutil.copyfileobj(part, out)
+        self._publish(staged, bucket, key)
+        shutil.rmtree(parts)
+
+    def abort_multipart(self, bucket, key, upload_id):
+        shutil.rmtree(os.path.join(self._staging, upload_id), ignore_errors=True)
+
+
+class MemoryStore(ObjectStore):
+    """Objects in a dict; visible only to the process that created the store"""
+
+    def __init__(self):
+        self.objects: Dict[tuple, tuple] = {}
+        self._uploads: Dict[str, Dict[int, bytes]] = {}
+
+    def _body(self, bucket: str, key: str) -> bytes:
+        try:
+            return self.objects[(bucket, key)][0]
+        except KeyError:
+            raise ObjectNotFound(f"{bucket}/{key}") from None
+
+    def get(self, bucket, key):
+        return self._body(bucket, key)
+
+    def get_range(self, bucket, key, start, end):
+        return self._body(bucket, key)[start:end]
+
+    def size(self, bucket, key):
+        return len(self._body(bucket, key))
+
+    def put(self, bucket, key, body, content_type=None, metadata=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.objects[(bucket, key)] = (bytes(body), datetime.now(timezone.utc))
+
+    def list(self, bucket, prefix="", start_after=""):
+        keys = sorted(
+            key
+            for object_bucket, key in self.objects
+            if object_bucket == bucket and key.startswith(prefix) and key > start_after
+        )
+        for key in keys:
+            body, modified = self.objects[(bucket, key)]
+            yield {"Key": key, "Size": len(body), "LastModified": modified}
+
+    def delete(self, bucket, keys):
+        for key in keys:
+            self.objects.pop((bucket, key), None)
+
+    def create_multipart(self, bucket, key):
+        upload_id = uuid.uuid4().hex
+        self._uploads[upload_id] = {}
+        return upload_id
+
+    def upload_part(self, bucket, key, upload_id, part_number, data):
+        self._uploads[upload_id][part_number] = bytes(data)
+        return str(part_number)
+
+    def complete_multipart(self, bucket, key, upload_id, etags):
+        parts = self._uploads.pop(upload_id)
+        self.put(bucket, key, b"".join(parts[int(etag)] for etag in etags))
+
+    def abort_multipart(self, bucket, key, upload_id):
+        self._uploads.pop(upload_id, None)
+
+
+def open_store(url: str = OBJECT_STORE, s3_client=None) -> ObjectStore:
+    """
+    The backend named by ``url``: ``s3``, ``local:<directory>`` or ``memory``
+
+    ``s3_client`` is used for S3 instead of creating a new boto3 client.
+    """
+    if url.startswith("local:"):
+        return LocalStore(url[len("local:") :])
+    if url == "memory":
+        return MemoryStore()
+    if url != "s3":
+        raise ValueError(f"Unknown OBJECT_STORE: {url}")
+    if s3_client is None:
+        import boto3
+
+        s3_client = boto3.client("s3")
+    return S3Store(s3_client)
@@ -0,0 +1,514 @@
+"""
+Partition catalog: an index of every Parquet object the pipeline writes
+
+Writers record each object (key, partition values, row count, size and
+per-column min/max) in a SQLite database, one transaction per object;
+readers query it instead of listing buckets:
+- ``latest``: newest object of a dataset (index seek, no listing)
+- ``latest_run``: objects of a dataset's newest (non-compacted) run
+- ``files``: objects written since a point in time, oldest first
+- ``in_range``: objects whose partition overlaps a date range
+- ``overlapping``: objects whose min/max for a column overlaps a range
+
+The catalog is enabled by setting CATALOG_PATH to a database file that
+every writer and reader of a bucket opens: one catalog per bucket, never a
+file per container. A catalog only sees what was recorded in it, so one
+that misses another writer's objects would silently report "nothing new".
+To catch that, a catalog claims each bucket it is opened for with a
+``_catalog.json`` marker holding its ID, and refuses (``CatalogMismatch``)
+a bucket claimed by another catalog. WAL journaling needs a local disk; on
+EFS/NFS set CATALOG_JOURNAL_MODE=DELETE. Existing objects can be registered
+from a bucket listing, which also hands the bucket over to that catalog:
+
+    python src/common/partition_catalog.py rebuild --layer bronze \\
+        --bucket my-bronze-bucket --prefix orders/
+"""
+
+import argparse
+import calendar
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from object_store import ObjectNotFound
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+    from object_store import ObjectStore
+
+CATALOG_PATH = os.environ.get("CATALOG_PATH", "")
+CATALOG_JOURNAL_MODE = os.environ.get("CATALOG_JOURNAL_MODE", "WAL")
+
+# Object naming the catalog a bucket's objects are recorded in
+CATALOG_MARKER = "_catalog.json"
+
+_PARTITION_RE = re.compile(r"(year|month|day)=(\d+)")
+
+# File name prefix of objects written by compaction (compact_partitions.py)
+COMPACTED_PREFIX = "compacted-"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    layer TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    year INTEGER,
+    month INTEGER,
+    day INTEGER,
+    partition_start TEXT,
+    partition_end TEXT,
+    row_count INTEGER,
+    size_bytes INTEGER,
+    written_at TEXT NOT NULL,
+    PRIMARY KEY (layer, key)
+);
+CREATE INDEX IF NOT EXISTS files_by_time ON files (layer, dataset, written_at, key);
+CREATE INDEX IF NOT EXISTS files_by_partition
+    ON files (layer, dataset, partition_start, partition_end);
+CREATE TABLE IF NOT EXISTS column_stats (
+    layer TEXT NOT NULL,
+    key TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    min_value,
+    max_value,
+    PRIMARY KEY (layer, key, column_name)
+);
+CREATE INDEX IF NOT EXISTS stats_by_column ON column_stats (layer, column_name, min_value);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class CatalogMismatch(RuntimeError):
+    """A bucket's objects are recorded in a different catalog"""
+
+
+def _iso(moment: datetime) -> str:
+    """Fixed-width UTC ISO string, so text order matches time order"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _like_escape(text: str) -> str:
+    """Escape LIKE wildcards (``_`` is common in file names) with a backslash"""
+    return re.sub(r"([\\%_])", r"\\\1", text)
+
+
+def _stat_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def partition_values(key: str) -> Dict[str, int]:
+    """Hive-style ``year=/month=/day=`` values in an object key"""
+    return {name: int(value) for name, value in _PARTITION_RE.findall(key)}
+
+
+def is_compacted(key: str) -> bool:
+    """Whether an object was written by compaction (holds older objects' rows)"""
+    return key.rsplit("/", 1)[-1].startswith(COMPACTED_PREFIX)
+
+
+def partition_bounds(values: Dict[str, int]) -> Tuple[Optional[str], Optional[str]]:
+    """First and last calendar day covered by a year/month[/day] partition"""
+    if "year" not in values:
+        return None, None
+    year = values["year"]
+    if "month" not in values:
+        return date(year, 1, 1).isoformat(), date(year, 12, 31).isoformat()
+    month = values["month"]
+    if "day" in values:
+        day = date(year, month, values["day"]).isoformat()
+        return day, day
+    last = calendar.monthrange(year, month)[1]
+    return date(year, month, 1).isoformat(), date(year, month, last).isoformat()
+
+
+def table_stats(table: "pa.Table") -> Dict[str, Tuple[Any, Any]]:
+    """Min/max of every numeric, boolean and temporal column"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    stats = {}
+    for field in table.schema:
+        kind = field.type
+        if not (
+            pa.types.is_integer(kind)
+            or pa.types.is_floating(kind)
+            or pa.types.is_boolean(kind)
+            or pa.types.is_temporal(kind)
+        ):
+            continue
+        result = pc.min_max(table.column(field.name))
+        low, high = result["min"].as_py(), result["max"].as_py()
+        if low is not None:
+            stats[field.name] = (_stat_value(low), _stat_value(high))
+    return stats
+
+
+def _row(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    entry = {column[0]: value for column, value in zip(cursor.description, row)}
+    # Same shape as an S3 listing entry, so callers can use either
+    entry["Key"] = entry["key"]
+    entry["Size"] = entry["size_bytes"]
+    entry["LastModified"] = datetime.fromisoformat(entry["written_at"])
+    return entry
+
+
+class PartitionCatalog:
+    """SQLite-backed index of written Parquet objects"""
+
+    def __init__(
+        self,
+        path: str,
+        timeout: float = 30.0,
+        store: Optional["ObjectStore"] = None,
+        buckets: Iterable[str] = (),
+    ):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        # Buckets are claimed on first use, so opening the catalog costs no I/O
+        self._store = store
+        self._unclaimed = list(buckets) if store is not None else []
+        self._claim_lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One connection per thread, as sqlite3 connections can't be shared
+        # between threads (e.g. the Lambda's S3 object workers); opened
+        # lazily so the catalog can be handed to worker processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.row_factory = _row
+            conn.execute(f"PRAGMA journal_mode={CATALOG_JOURNAL_MODE}")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        if self._unclaimed:
+            self._claim_buckets()
+        return conn
+
+    @property
+    def catalog_id(self) -> str:
+        """ID of this catalog database, created with it"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO meta VALUES ('catalog_id', ?)",
+                (uuid.uuid4().hex,),
+            )
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        return cursor.execute(
+            "SELECT value FROM meta WHERE name = 'catalog_id'"
+        ).fetchone()[0]
+
+    def marker(self) -> bytes:
+        """Body of the bucket marker naming this catalog"""
+        return json.dumps({"catalog_id": self.catalog_id, "path": self.path}).encode(
+            "utf-8"
+        )
+
+    def _claim_buckets(self) -> None:
+        with self._claim_lock:
+            buckets, self._unclaimed = self._unclaimed, []
+            try:
+                for bucket in buckets:
+                    claim_bucket(self, self._store, bucket)
+            except Exception:
+                self._unclaimed = buckets
+                raise
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Worker processes inherit the parent's (already claimed) buckets
+        return {"path": self.path, "timeout": self.timeout}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"], state["timeout"])
+
+    def close(self) -> None:
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def record(
+        self,
+        layer: str,
+        dataset: str,
+        bucket: str,
+        key: str,
+        size_bytes: Optional[int] = None,
+        row_count: Optional[int] = None,
+        stats: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        written_at: Optional[datetime] = None,
+    ) -> None:
+        """Add (or replace) one object and its column stats atomically"""
+        with self.conn:
+            self._insert(
+                layer, dataset, bucket, key, size_bytes, row_count, stats, written_at
+            )
+
+    def _insert(
+        self,
+        layer: str,
+        dataset: str,
+        bucket: str,
+        key: str,
+        size_bytes: Optional[int] = None,
+        row_count: Optional[int] = None,
+        stats: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        written_at: Optional[datetime] = None,
+    ) -> None:
+        values = partition_values(key)
+        start, end = partition_bounds(values)
+        written_at = written_at or datetime.now(timezone.utc)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                layer,
+                dataset,
+                bucket,
+                key,
+                values.get("year"),
+                values.get("month"),
+                values.get("day"),
+                start,
+                end,
+                row_count,
+                size_bytes,
+                _iso(written_at),
+            ),
+        )
+        self.conn.execute(
+            "DELETE FROM column_stats WHERE layer = ? AND key = ?", (layer, key)
+        )
+        self.conn.executemany(
+            "INSERT INTO column_stats VALUES (?, ?, ?, ?, ?)",
+            [
+                (layer, key, column, low, high)
+                for column, (low, high) in (stats or {}).items()
+            ],
+        )
+
+    def record_table(
+        self,
+        layer: str,
+        dataset: str,
+        bucket: str,
+        key: str,
+        table: "pa.Table",
+        size_bytes: int,
+    ) -> None:
+        """Record an object written from an Arrow table"""
+        self.record(
+            layer,
+            dataset,
+            bucket,
+            key,
+            size_bytes=size_bytes,
+            row_count=table.num_rows,
+            stats=table_stats(table),
+        )
+
+    def remove(self, layer: str, keys: List[str]) -> None:
+        """Drop objects (e.g. files replaced by compaction)"""
+        with self.conn:
+            self._delete(layer, keys)
+
+    def _delete(self, layer: str, keys: List[str]) -> None:
+        for key in keys:
+            self.conn.execute(
+                "DELETE FROM files WHERE layer = ? AND key = ?", (layer, key)
+            )
+            self.conn.execute(
+                "DELETE FROM column_stats WHERE layer = ? AND key = ?", (layer, key)
+            )
+
+    def replace(
+        self, layer: str, old_keys: List[str], new_objects: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Swap objects for others in one transaction (used by compaction)
+
+        ``new_objects`` are keyword arguments of ``record`` (dataset, bucket,
+        key, size_bytes, ...); readers see either the old or the new set.
+        """
+        with self.conn:
+            self._delete(layer, old_keys)
+            for entry in new_objects:
+                self._insert(layer, **entry)
+
+    def latest(self, layer: str, dataset: str) -> Optional[Dict[str, Any]]:
+        """Most recently written object of a dataset"""
+        return self.conn.execute(
+            "SELECT * FROM files WHERE layer = ? AND dataset = ? "
+            "ORDER BY written_at DESC, key DESC LIMIT 1",
+            (layer, dataset),
+        ).fetchone()
+
+    def latest_run(self, layer: str, dataset: str) -> List[Dict[str, Any]]:
+        """
+        Objects of the newest run of a dataset, by key
+
+        A run writes one object per partition, all with the same file name:
+        the newest object that isn't a compaction output (an index seek)
+        names the run, then every object named like it is fetched.
+        """
+        latest = self.conn.execute(
+            "SELECT * FROM files WHERE layer = ? AND dataset = ? "
+            "AND key NOT LIKE ? ESCAPE '\\' "
+            "ORDER BY written_at DESC, key DESC LIMIT 1",
+            (layer, dataset, f"%/{_like_escape(COMPACTED_PREFIX)}%"),
+        ).fetchone()
+        if latest is None:
+            return []
+        name = latest["key"].rsplit("/", 1)[-1]
+        return self.conn.execute(
+            "SELECT * FROM files WHERE layer = ? AND dataset = ? "
+            "AND (key = ? OR key LIKE ? ESCAPE '\\') ORDER BY key",
+            (layer, dataset, name, f"%/{_like_escape(name)}"),
+        ).fetchall()
+
+    def files(
+        self, layer: str, dataset: str, since: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Objects written after ``since`` (all if None), oldest first"""
+        since_text = _iso(since) if since is not None else ""
+        return self.conn.execute(
+            "SELECT * FROM files WHERE layer = ? AND dataset = ? AND written_at > ? "
+            "ORDER BY written_at, key",
+            (layer, dataset, since_text),
+        ).fetchall()
+
+    def in_range(
+        self, layer: str, dataset: str, start: date, end: date
+    ) -> List[Dict[str, Any]]:
+        """Objects whose partition overlaps [start, end]"""
+        return self.conn.execute(
+            "SELECT * FROM files WHERE layer = ? AND dataset = ? "
+            "AND partition_start <= ? AND partition_end >= ? "
+            "ORDER BY partition_start, written_at",
+            (layer, dataset, end.isoformat(), start.isoformat()),
+        ).fetchall()
+
+    def overlapping(
+        self, layer: str, dataset: str, column: str, low: Any, high: Any
+    ) -> List[Dict[str, Any]]:
+        """Objects whose min/max of ``column`` overlaps [low, high]"""
+        return self.conn.execute(
+            "SELECT files.* FROM files JOIN column_stats USING (layer, key) "
+            "WHERE files.layer = ? AND files.dataset = ? AND column_name = ? "
+            "AND min_value <= ? AND max_value >= ? ORDER BY min_value",
+            (layer, dataset, column, _stat_value(high), _stat_value(low)),
+        ).fetchall()
+
+    def column_stats(self, layer: str, key: str) -> Dict[str, Tuple[Any, Any]]:
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        rows = cursor.execute(
+            "SELECT column_name, min_value, max_value FROM column_stats "
+            "WHERE layer = ? AND key = ?",
+            (layer, key),
+        ).fetchall()
+        return {column: (low, high) for column, low, high in rows}
+
+
+def claim_bucket(catalog: PartitionCatalog, store: "ObjectStore", bucket: str) -> None:
+    """
+    Mark a bucket as recorded in ``catalog``, or raise CatalogMismatch if
+    another catalog already claimed it
+    """
+    try:
+        owner = json.loads(store.get(bucket, CATALOG_MARKER))
+    except ObjectNotFound:
+        store.put(bucket, CATALOG_MARKER, catalog.marker())
+        # Read back: of two catalogs claiming at once, the last write wins
+        owner = json.loads(store.get(bucket, CATALOG_MARKER))
+    if owner["catalog_id"] != catalog.catalog_id:
+        raise CatalogMismatch(
+            f"Objects of bucket {bucket} are recorded in catalog "
+            f"{owner['catalog_id']} ({owner.get('path')}), not in "
+            f"{catalog.path}: it would miss them. Point every writer and "
+            "reader at one CATALOG_PATH, rebuild this catalog from a listing, "
+            "or unset CATALOG_PATH"
+        )
+
+
+def open_catalog(
+    path: str = CATALOG_PATH,
+    store: Optional["ObjectStore"] = None,
+    buckets: Iterable[str] = (),
+) -> Optional[PartitionCatalog]:
+    """
+    The configured catalog, or None when CATALOG_PATH is not set
+
+    ``buckets`` (with the ``store`` holding them) are claimed by the
+    catalog on first use; see CatalogMismatch.
+    """
+    return PartitionCatalog(path, store=store, buckets=buckets) if path else None
+
+
+def rebuild_from_listing(
+    catalog: PartitionCatalog, s3, layer: str, bucket: str, prefix: str
+) -> int:
+    """
+    Register existing objects under a prefix from a bucket listing
+
+    Row counts and column stats are left empty; the dataset is the first
+    path component of each key.
+    """
+    count = 0
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            if not obj["Key"].endswith(".parquet"):
+                continue
+            catalog.record(
+                layer,
+                obj["Key"].split("/", 1)[0],
+                bucket,
+                obj["Key"],
+                size_bytes=obj["Size"],
+                written_at=obj["LastModified"],
+            )
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition catalog maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--layer", required=True, choices=["bronze", "silver", "gold"])
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--prefix", default="")
+    parser.add_argument("--catalog", default=CATALOG_PATH or "catalog.db")
+    args = parser.parse_args()
+
+    import boto3
+
+    catalog = PartitionCatalog(args.catalog)
+    s3 = boto3.client("s3")
+    count = rebuild_from_listing(catalog, s3, args.layer, args.bucket, args.prefix)
+    # The rebuilt catalog now indexes the bucket
+    s3.put_object(Bucket=args.bucket, Key=CATALOG_MARKER, Body=catalog.marker())
+    print(f"✓ Registered {count} objects in {args.catalog}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Structured, low-overhead logging shared by ingestion and processing
+
+- Lazy formatting: log with %-style arguments so messages are only built
+  when the level is enabled.
+- Payload caps: ``capped(obj)`` defers serialization until the record is
+  emitted and shrinks large strings/lists so huge events never reach
+  CloudWatch in full.
+- Sampling: ``BatchLog`` logs the first few occurrences of a repetitive
+  warning per batch and counts the rest.
+- Counted summaries: ``BatchLog.summary()`` emits one line per batch with
+  every counter.
+
+Set LOG_FORMAT=json to emit one JSON object per line (CloudWatch Insights).
+"""
+
+import json
+import logging
+import os
+import sys
+from collections import Counter
+from typing import Any, Dict, Optional
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_MAX_PAYLOAD_CHARS = int(os.environ.get("LOG_MAX_PAYLOAD_CHARS", "2048"))
+LOG_SAMPLE_FIRST = int(os.environ.get("LOG_SAMPLE_FIRST", "5"))
+
+# Shrinking limits applied before a payload is serialized
+_MAX_STRING_CHARS = 256
+_MAX_ITEMS = 10
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per record, including any ``fields`` passed via extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(
+    level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, stream=None
+) -> None:
+    """
+    Configure the root logger once per process
+
+    Existing handlers (e.g. the Lambda runtime's) are kept and only get the
+    JSON formatter when ``log_format`` is "json". Without handlers, a plain
+    message-only stream handler is added for CLI runs.
+    """
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not root.handlers:
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root.addHandler(handler)
+    if log_format == "json":
+        for handler in root.handlers:
+            handler.setFormatter(StructuredFormatter())
+
+
+def _shrink(value: Any, depth: int = 0) -> Any:
+    """Truncate long strings/collections so serialization cost stays bounded"""
+    if isinstance(value, str):
+        if len(value) > _MAX_STRING_CHARS:
+            return f"{value[:_MAX_STRING_CHARS]}...(+{len(value) - _MAX_STRING_CHARS} chars)"
+        return value
+    if depth >= 4:
+        return f"<{type(value).__name__}>"
+    if isinstance(value, dict):
+        items = list(value.items())
+        shrunk = {str(k): _shrink(v, depth + 1) for k, v in items[:_MAX_ITEMS]}
+        if len(items) > _MAX_ITEMS:
+            shrunk["..."] = f"+{len(items) - _MAX_ITEMS} keys"
+        return shrunk
+    if isinstance(value, (list, tuple)):
+        shrunk = [_shrink(v, depth + 1) for v in value[:_MAX_ITEMS]]
+        if len(value) > _MAX_ITEMS:
+            shrunk.append(f"...(+{len(value) - _MAX_ITEMS} items)")
+        return shrunk
+    return value
+
+
+class CappedPayload:
+    """Lazily serialized, size-capped view of a payload for log arguments"""
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: int = LOG_MAX_PAYLOAD_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        text = json.dumps(_shrink(self.value), default=str)
+        if len(text) > self.max_chars:
+            text = f"{text[: self.max_chars]}...(truncated)"
+        return text
+
+
+def capped(value: Any, max_chars: int = LOG_MAX_PAYLOAD_CHARS) -> CappedPayload:
+    """Wrap a payload so it is only serialized (and capped) if actually logged"""
+    return CappedPayload(value, max_chars)
+
+
+class BatchLog:
+    """
+    Per-batch counters with sampled warnings and a single summary line
+
+    Usage:
+        batch = BatchLog(logger, "order validation")
+        batch.warning("invalid_record", "Invalid record at index %d: %s", idx, errors)
+        batch.count("valid", 10)
+        batch.summary()
+    """
+
+    def __init__(
+        self, logger: logging.Logger, name: str, sample_first: int = LOG_SAMPLE_FIRST
+    ):
+        self.logger = logger
+        self.name = name
+        self.sample_first = sample_first
+        self.counts: Counter = Counter()
+        self.suppressed: Counter = Counter()
+
+    def count(self, key: str, n: int = 1) -> None:
+        self.counts[key] += n
+
+    def warning(self, key: str, msg: str, *args: Any) -> None:
+        """Count a repetitive warning, logging only the first few per batch"""
+        self.counts[key] += 1
+        if self.counts[key] <= self.sample_first:
+            self.logger.warning(msg, *args)
+        else:
+            self.suppressed[key] += 1
+
+    def summary(self, level: int = logging.INFO, **fields: Any) -> Dict[str, Any]:
+        """Emit and return the counted summary for this batch"""
+        summary: Dict[str, Any] = dict(fields)
+        summary.update(self.counts)
+        if self.suppressed:
+            summary["suppressed_warnings"] = dict(self.suppressed)
+        log_summary(self.logger, self.name, level=level, **summary)
+        return summary
+
+
+def log_summary(
+    logger: logging.Logger, name: str, level: int = logging.INFO, **fields: Any
+) -> None:
+    """Emit one ``name summary: k=v ...`` line, with fields kept for JSON output"""
+    if logger.isEnabledFor(level):
+        text = " ".join(f"{key}={value}" for key, value in fields.items())
+        logger.log(level, "%s summary: %s", name, text, extra={"fields": fields})
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    """Return a configured logger"""
+    configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,585 @@
+"""
+Typed Arrow schema registry shared by ingestion, processing and Athena
+
+One explicit column list per dataset and layer:
+- bronze: raw records plus ingestion metadata (``orders``, ``customers``, ...)
+- silver: cleaned records (``orders_clean``, ...)
+- gold: aggregate tables (``daily_sales_summary``, ...)
+
+Writers conform tables to the registered schema before writing Parquet, so
+timestamps are stored as timestamps, flags as booleans and small integers
+in narrow types, and readers never re-parse them. Athena DDL is generated
+from the same definitions.
+
+Silver is a version log: a record whose content changes is appended again
+rather than rewritten in place, so a key can have several rows. Readers
+keep each key's latest row (greatest ``_ingestion_timestamp``); for Athena
+the silver script adds a ``<entity>_latest`` view per dataset doing that.
+
+Column types are plain names so importing this module doesn't load pyarrow
+(the ingestion Lambda imports pyarrow on first use).
+
+Usage:
+    python src/common/schema_registry.py gold --bucket my-gold-bucket
+"""
+
+import argparse
+import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+Columns = List[Tuple[str, str]]
+
+# Timestamps are stored naive, in UTC, at Athena's millisecond precision
+TIMESTAMP_UNIT = "ms"
+
+ATHENA_TYPES = {
+    "string": "STRING",
+    "bool": "BOOLEAN",
+    "int8": "TINYINT",
+    "int16": "SMALLINT",
+    "int32": "INT",
+    "int64": "BIGINT",
+    "float64": "DOUBLE",
+    "date": "DATE",
+    "timestamp": "TIMESTAMP",
+    "category": "STRING",
+    "binary": "BINARY",
+}
+
+# Controlled vocabularies of low-cardinality columns, stored in silver as
+# dictionary-encoded "category" columns (values in this order, then any
+# unseen values sorted). Transforms validate against the same lists.
+VOCABULARIES: Dict[str, Tuple[str, ...]] = {
+    "status": ("pending", "confirmed", "shipped", "delivered", "cancelled"),
+    "payment_method": (
+        "credit_card",
+        "debit_card",
+        "paypal",
+        "apple_pay",
+        "google_pay",
+    ),
+    "event_type": (
+        "page_view",
+        "product_view",
+        "add_to_cart",
+        "remove_from_cart",
+        "checkout_start",
+        "purchase",
+    ),
+    "device_type": ("mobile", "desktop", "tablet"),
+    "browser": ("Chrome", "Safari", "Firefox", "Edge"),
+    "category": (
+        "Electronics",
+        "Clothing",
+        "Home & Kitchen",
+        "Books",
+        "Toys & Games",
+        "Sports",
+        "Beauty",
+        "Grocery",
+    ),
+    "country": ("USA",),
+}
+
+BOOLEAN_STRINGS = {
+    "true": True,
+    "t": True,
+    "yes": True,
+    "1": True,
+    "false": False,
+    "f": False,
+    "no": False,
+    "0": False,
+}
+
+# Added by the ingestion Lambda to every bronze record
+INGESTION_METADATA: Columns = [
+    ("_ingestion_timestamp", "timestamp"),
+    ("_source", "string"),
+    ("_data_type", "string"),
+    ("_environment", "string"),
+    ("_version", "string"),
+]
+
+CUSTOMER_COLUMNS: Columns = [
+    ("customer_id", "string"),
+    ("first_name", "string"),
+    ("last_name", "string"),
+    ("email", "string"),
+    ("phone", "string"),
+    ("date_of_birth", "date"),
+    ("gender", "string"),
+    ("city", "string"),
+    ("state", "string"),
+    ("country", "string"),
+    ("postal_code", "string"),
+    ("signup_date", "timestamp"),
+    ("customer_segment", "string"),
+    ("is_active", "bool"),
+]
+
+PRODUCT_COLUMNS: Columns = [
+    ("product_id", "string"),
+    ("product_name", "string"),
+    ("category", "string"),
+    ("subcategory", "string"),
+    ("brand", "string"),
+    ("base_price", "float64"),
+    ("current_price", "float64"),
+    ("cost", "float64"),
+    ("inventory_quantity", "int32"),
+    ("weight_kg", "float64"),
+    ("rating", "float64"),
+    ("num_reviews", "int32"),
+    ("is_active", "bool"),
+    ("created_date", "timestamp"),
+]
+
+ORDER_COLUMNS: Columns = [
+    ("order_id", "string"),
+    ("customer_id", "string"),
+    ("product_id", "string"),
+    ("order_date", "timestamp"),
+    ("quantity", "int32"),
+    ("unit_price", "float64"),
+    ("subtotal", "float64"),
+    ("tax", "float64"),
+    ("shipping_cost", "float64"),
+    ("total_amount", "float64"),
+    ("payment_method", "string"),
+    ("status", "string"),
+    ("shipping_address", "string"),
+    ("billing_address", "string"),
+    ("created_at", "timestamp"),
+    ("updated_at", "timestamp"),
+]
+
+ORDER_INGESTION_COLUMNS: Columns = [
+    ("_order_year", "int16"),
+    ("_order_month", "int8"),
+    ("_order_day", "int8"),
+]
+
+EVENT_COLUMNS: Columns = [
+    ("event_id", "string"),
+    ("customer_id", "string"),
+    ("session_id", "string"),
+    ("event_type", "string"),
+    ("product_id", "string"),
+    ("event_timestamp", "timestamp"),
+    ("page_url", "string"),
+    ("referrer_url", "string"),
+    ("device_type", "string"),
+    ("browser", "string"),
+    ("ip_address", "string"),
+    ("country", "string"),
+    ("city", "string"),
+]
+
+BRONZE: Dict[str, Columns] = {
+    "customers": CUSTOMER_COLUMNS + INGESTION_METADATA,
+    "products": PRODUCT_COLUMNS + INGESTION_METADATA,
+    "orders": ORDER_COLUMNS + INGESTION_METADATA + ORDER_INGESTION_COLUMNS,
+    "events": EVENT_COLUMNS + INGESTION_METADATA,
+}
+
+
+def _categorical(columns: Columns) -> Columns:
+    """Columns with a controlled vocabulary switched to the category type"""
+    return [
+        (name, "category" if name in VOCABULARIES else kind) for name, kind in columns
+    ]
+
+
+SILVER: Dict[str, Columns] = {
+    "customers_clean": _categorical(BRONZE["customers"])
+    + [
+        ("age", "int16"),
+        ("dq_email_valid", "bool"),
+        ("dq_has_phone", "bool"),
+    ],
+    "products_clean": _categorical(BRONZE["products"])
+    + [
+        ("discount_pct", "float64"),
+        ("profit_margin", "float64"),
+        ("dq_has_inventory", "bool"),
+    ],
+    "orders_clean": _categorical(BRONZE["orders"])
+    + [
+        ("order_year", "int16"),
+        ("order_month", "int8"),
+        ("order_day", "int8"),
+        ("order_dayofweek", "int8"),
+        ("order_hour", "int8"),
+        ("dq_has_customer", "bool"),
+        ("dq_has_product", "bool"),
+        ("dq_valid_status", "bool"),
+    ],
+    "events_clean": _categorical(BRONZE["events"])
+    + [
+        ("event_date", "date"),
+        ("event_hour", "int8"),
+        ("event_dayofweek", "int8"),
+        ("is_anonymous", "bool"),
+        ("dq_has_session", "bool"),
+        ("dq_valid_event_type", "bool"),
+    ],
+}
+
+GOLD: Dict[str, Columns] = {
+    "daily_sales_summary": [
+        ("order_date", "date"),
+        ("total_orders", "int64"),
+        ("unique_customers", "int64"),
+        ("total_revenue", "float64"),
+        ("avg_order_value", "float64"),
+        ("total_units_sold", "int64"),
+        ("avg_units_per_order", "float64"),
+        ("customers_sketch", "binary"),
+    ],
+    "customer_lifetime_value": [
+        ("customer_id", "string"),
+        ("total_orders", "int64"),
+        ("lifetime_value", "float64"),
+        ("first_order_date", "timestamp"),
+        ("last_order_date", "timestamp"),
+        ("avg_order_value", "float64"),
+        ("days_as_customer", "int32"),
+        ("days_since_last_order", "int32"),
+        ("segment", "string"),
+    ],
+    "product_performance": [
+        ("product_id", "string"),
+        ("times_ordered", "int64"),
+        ("units_sold", "int64"),
+        ("total_revenue", "float64"),
+        ("product_name", "string"),
+        ("category", "string"),
+        ("current_price", "float64"),
+        ("cost", "float64"),
+        ("total_profit", "float64"),
+        ("profit_margin", "float64"),
+        ("avg_revenue_per_order", "float64"),
+        ("revenue_rank", "float64"),
+    ],
+    "session_summary": [
+        ("session_id", "string"),
+        ("session_seq", "int32"),
+        ("customer_id", "string"),
+        ("session_start", "timestamp"),
+        ("session_end", "timestamp"),
+        ("duration_seconds", "float64"),
+        ("event_count", "int64"),
+        ("page_views", "int64"),
+        ("product_views", "int64"),
+        ("reached_cart", "bool"),
+        ("reached_checkout", "bool"),
+        ("purchased", "bool"),
+        ("device_type", "string"),
+    ],
+    "sales_cube": [
+        ("order_date", "date"),
+        ("category", "string"),
+        ("payment_method", "string"),
+        ("status", "string"),
+        ("device_type", "string"),
+        ("grouping_id", "int32"),
+        ("orders", "int64"),
+        ("units_sold", "int64"),
+        ("revenue", "float64"),
+    ],
+    "conversion_funnel": [
+        ("event_date", "date"),
+        ("event_type", "string"),
+        ("total_events", "int64"),
+        ("unique_sessions", "int64"),
+        ("session_conversion_rate", "float64"),
+        ("stage_order", "int32"),
+        ("sessions_sketch", "binary"),
+    ],
+}
+
+REGISTRY: Dict[str, Dict[str, Columns]] = {
+    "bronze": BRONZE,
+    "silver": SILVER,
+    "gold": GOLD,
+}
+
+# Key of each entity: silver holds one row per version of a key
+PRIMARY_KEYS = {
+    "customers": "customer_id",
+    "products": "product_id",
+    "orders": "order_id",
+    "events": "event_id",
+}
+
+# Silver column ordering the versions of a key (later ingestion wins)
+VERSION_COLUMN = "_ingestion_timestamp"
+
+# Hive-style partition columns in each layer's object keys
+PARTITION_KEYS = {
+    "bronze": ["year", "month", "day"],
+    "silver": ["year", "month", "day"],
+    "gold": ["year", "month"],
+}
+
+
+def get_columns(layer: str, dataset: str) -> Optional[Columns]:
+    """Registered (name, type) columns, or None for an unregistered dataset"""
+    return REGISTRY.get(layer, {}).get(dataset)
+
+
+def arrow_type(type_name: str) -> "pa.DataType":
+    import pyarrow as pa
+
+    if type_name == "timestamp":
+        return pa.timestamp(TIMESTAMP_UNIT)
+    if type_name == "date":
+        return pa.date32()
+    if type_name == "bool":
+        return pa.bool_()
+    if type_name == "category":
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.type_for_alias(type_name)
+
+
+@lru_cache(maxsize=None)
+def arrow_schema(layer: str, dataset: str) -> Optional["pa.Schema"]:
+    """Arrow schema for a registered dataset, or None"""
+    import pyarrow as pa
+
+    columns = get_columns(layer, dataset)
+    if columns is None:
+        return None
+    return pa.schema([pa.field(name, arrow_type(kind)) for name, kind in columns])
+
+
+def _parse_values(values: "pd.Series", target: "pa.DataType") -> "pd.Series":
+    """Lenient pandas parse of values Arrow could not cast; failures become NaN"""
+    import pandas as pd
+    import pyarrow as pa
+
+    if pa.types.is_timestamp(target) or pa.types.is_date(target):
+        parsed = pd.to_datetime(values, format="ISO8601", utc=True, errors="coerce")
+        parsed = parsed.dt.tz_convert(None)
+        return parsed.dt.date if pa.types.is_date(target) else parsed
+    if pa.types.is_integer(target) or pa.types.is_floating(target):
+        return pd.to_numeric(values, errors="coerce")
+    if pa.types.is_boolean(target):
+        return values.astype(str).str.strip().str.lower().map(BOOLEAN_STRINGS)
+    if pa.types.is_string(target):
+        return values.map(lambda v: v if v is None else str(v))
+    raise TypeError(f"Cannot convert {values.dtype} to {target}")
+
+
+def cast_column(column, target: "pa.DataType") -> "pa.ChunkedArray":
+    """
+    Cast a column to ``target``
+
+    Uses Arrow's cast when it can; otherwise (e.g. ISO timestamps with UTC
+    offsets, numbers stored as free text) parses through pandas, turning
+    values that cannot be converted into nulls.
+    """
+    import pyarrow as pa
+
+    if column.type == target:
+        return column
+    if pa.types.is_timestamp(target) and pa.types.is_timestamp(column.type):
+        # Unit/time zone change only; sub-millisecond precision is dropped
+        return column.cast(target, safe=False)
+    try:
+        return column.cast(target)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+
+    values = _parse_values(column.to_pandas(), target)
+    converted = pa.chunked_array(
+        [pa.array(values, from_pandas=True).cast(target, safe=False)]
+    )
+    lost = converted.null_count - column.null_count
+    if lost:
+        logger.warning("%d values could not be converted to %s", lost, target)
+    return converted
+
+
+def categorize(values: "pd.Series", vocabulary: Tuple[str, ...]) -> "pd.Series":
+    """
+    Categorical Series with the vocabulary as its first categories
+
+    Values outside the vocabulary are kept, as extra categories sorted after
+    it, so quality checks can still flag them.
+    """
+    import pandas as pd
+
+    categories = list(vocabulary)
+    known = set(categories)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        observed = values.cat.categories
+    else:
+        observed = values.dropna().unique()
+    categories += sorted((value for value in observed if value not in known), key=str)
+    return values.astype(pd.CategoricalDtype(categories))
+
+
+def encode_category(column, vocabulary: Tuple[str, ...]) -> "pa.ChunkedArray":
+    """
+    Dictionary-encode a string column with the vocabulary first
+
+    The dictionary is the vocabulary followed by the unseen values sorted, the
+    same categories ``categorize`` gives pandas. Already-encoded columns are
+    remapped through their dictionaries without decoding every value.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    target = arrow_type("category")
+    if isinstance(column, pa.Array):
+        column = pa.chunked_array([column])
+    if not pa.types.is_dictionary(column.type):
+        if not pa.types.is_string(column.type):
+            column = cast_column(column, pa.string())
+        column = pc.dictionary_encode(column)
+
+    observed = set()
+    for chunk in column.chunks:
+        observed.update(chunk.dictionary.cast(pa.string()).to_pylist())
+    known = set(vocabulary)
+    extra = sorted(
+        value for value in observed if value is not None and value not in known
+    )
+    dictionary = pa.array(list(vocabulary) + extra, pa.string())
+
+    chunks = []
+    for chunk in column.chunks:
+        mapping = pc.index_in(chunk.dictionary.cast(pa.string()), value_set=dictionary)
+        indices = pc.take(mapping, chunk.indices).cast(pa.int32())
+        chunks.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+    return pa.chunked_array(chunks, type=target)
+
+
+def conform_table(
+    table: "pa.Table", layer: str, dataset: str, fill_missing: bool = True
+) -> "pa.Table":
+    """
+    Cast a table to the registered schema for ``dataset``
+
+    Registered columns come first, in registry order. Columns the registry
+    doesn't know are kept after them with their inferred types, and missing
+    registered columns are added as nulls when ``fill_missing`` is set.
+    Tables of unregistered datasets are returned unchanged.
+    """
+    import pyarrow as pa
+
+    schema = arrow_schema(layer, dataset)
+    if schema is None:
+        return table
+
+    names, arrays = [], []
+    for field in schema:
+        if field.name in table.column_names and pa.types.is_dictionary(field.type):
+            vocabulary = VOCABULARIES.get(field.name, ())
+            arrays.append(encode_category(table.column(field.name), vocabulary))
+        elif field.name in table.column_names:
+            arrays.append(cast_column(table.column(field.name), field.type))
+        elif fill_missing:
+            arrays.append(pa.nulls(table.num_rows, field.type))
+        else:
+            continue
+        names.append(field.name)
+
+    for name in table.column_names:
+        if schema.get_field_index(name) == -1:
+            names.append(name)
+            arrays.append(table.column(name))
+
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def conform_dataframe(df: "pd.DataFrame", layer: str, dataset: str) -> "pa.Table":
+    """Convert a DataFrame to an Arrow table with the registered schema"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return conform_table(table, layer, dataset)
+
+
+def athena_ddl(layer: str, dataset: str, bucket: str) -> str:
+    """CREATE EXTERNAL TABLE statement for a registered dataset"""
+    columns = get_columns(layer, dataset)
+    if columns is None:
+        raise KeyError(f"No schema registered for {layer}/{dataset}")
+
+    column_lines = ",\n".join(
+        f"    {name} {ATHENA_TYPES[kind]}" for name, kind in columns
+    )
+    partition_lines = ",\n".join(f"    {key} INT" for key in PARTITION_KEYS[layer])
+    return (
+        f"CREATE EXTERNAL TABLE IF NOT EXISTS {dataset} (\n"
+        f"{column_lines}\n"
+        f")\n"
+        f"PARTITIONED BY (\n"
+        f"{partition_lines}\n"
+        f")\n"
+        f"STORED AS PARQUET\n"
+        f"LOCATION 's3://{bucket}/{dataset}/'"
+    )
+
+
+def athena_latest_view(dataset: str) -> str:
+    """View of a silver dataset with only the latest version of each key"""
+    key = PRIMARY_KEYS[dataset.removesuffix("_clean")]
+    names = [name for name, _ in SILVER[dataset]] + PARTITION_KEYS["silver"]
+    column_list = ", ".join(names)
+    return (
+        f"CREATE OR REPLACE VIEW {dataset.removesuffix('_clean')}_latest AS\n"
+        f"SELECT {column_list}\n"
+        f"FROM (\n"
+        f"    SELECT *, row_number() OVER (\n"
+        f"        PARTITION BY {key} ORDER BY {VERSION_COLUMN} DESC\n"
+        f"    ) AS version_rank\n"
+        f"    FROM {dataset}\n"
+        f"    WHERE {key} IS NOT NULL\n"
+        f")\n"
+        f"WHERE version_rank = 1"
+    )
+
+
+def athena_script(layer: str, bucket: str) -> str:
+    """
+    DDL for every dataset in a layer, followed by partition repairs (and,
+    for silver, the latest-version views)
+    """
+    datasets = list(REGISTRY[layer])
+    statements = [athena_ddl(layer, dataset, bucket) for dataset in datasets]
+    statements += [f"MSCK REPAIR TABLE {dataset}" for dataset in datasets]
+    if layer == "silver":
+        statements += [athena_latest_view(dataset) for dataset in datasets]
+    header = (
+        f"-- Create Athena Tables for {layer.title()} Layer\n"
+        f"-- Generated by src/common/schema_registry.py: edit the registry, not this file\n\n"
+    )
+    return header + ";\n\n".join(statements) + ";\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Athena DDL")
+    parser.add_argument("layer", choices=list(REGISTRY))
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--table", help="Only this table, without the repair")
+    args = parser.parse_args()
+
+    if args.table:
+        print(athena_ddl(args.layer, args.table, args.bucket))
+    else:
+        print(athena_script(args.layer, args.bucket), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Cold-start / warm-start timing benchmark for the ingestion Lambda
+
+Each run starts a fresh Python interpreter (a simulated cold container) that
+reuses the setup from test_lambda_local.py, then measures:
+  - import time of lambda_function
+  - first-invocation latency (cold) and second-invocation latency (warm)
+  - which heavy modules were loaded at import time
+
+S3 is stubbed with botocore's Stubber, so boto3 client creation is included
+in the first invocation but no AWS calls are made.
+
+Usage:
+    python src/ingestion/benchmark_cold_start.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["boto3", "pandas", "pyarrow", "numpy"]
+
+SCENARIOS = {
+    # Rejected before any validation: should not load the heavy modules
+    "rejected_400": {"body": json.dumps({"data_type": "order", "records": []})},
+    # Valid API batch: validates, enriches and writes Parquet to stubbed S3
+    "ingest_200": {
+        "body": json.dumps(
+            {
+                "data_type": "order",
+                "records": [
+                    {
+                        "order_id": f"ORD-{i:04d}",
+                        "customer_id": "CUST-001",
+                        "product_id": "PROD-001",
+                        "order_date": "2025-01-27T10:30:00",
+                        "quantity": 1,
+                        "total_amount": 49.99,
+                        "status": "pending",
+                    }
+                    for i in range(100)
+                ],
+            }
+        )
+    },
+}
+
+
+def _stubbed_boto3_client():
+    """Patch boto3.client so created S3 clients answer put_object locally"""
+    import boto3
+    from botocore.stub import Stubber
+
+    real_client = boto3.client
+
+    def client(*args, **kwargs):
+        s3 = real_client(*args, **kwargs)
+        stubber = Stubber(s3)
+        for _ in range(10):
+            stubber.add_response("put_object", {"ETag": '"benchmark"'})
+        stubber.activate()
+        s3._benchmark_stubber = stubber
+        return s3
+
+    boto3.client = client
+
+
+def run_child(scenario):
+    """Measure one cold container; prints a JSON result line"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, here)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ["BRONZE_BUCKET"] = "test-bucket"
+    os.environ["ENVIRONMENT"] = "dev"
+
+    start = time.perf_counter()
+    import lambda_function
+
+    import_ms = (time.perf_counter() - start) * 1000
+    loaded_at_import = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    from test_lambda_local import MockContext
+
+    _stubbed_boto3_client()
+    event = SCENARIOS[scenario]
+
+    latencies = []
+    for _ in range(2):
+        start = time.perf_counter()
+        response = lambda_function.lambda_handler(event, MockContext())
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(
+        json.dumps(
+            {
+                "import_ms": import_ms,
+                "first_invocation_ms": latencies[0],
+                "warm_invocation_ms": latencies[1],
+                "status": response["statusCode"],
+                "loaded_at_import": loaded_at_import,
+            }
+        )
+    )
+
+
+def run_benchmark(runs):
+    """Run every scenario ``runs`` times in fresh interpreters and summarize"""
+    print("=" * 72)
+    print(f"Ingestion Lambda cold-start benchmark ({runs} runs per scenario)")
+    print("=" * 72)
+
+    for scenario in SCENARIOS:
+        results = []
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", scenario],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+        print(f"\n{scenario} (status {results[0]['status']})")
+        print(f"  heavy modules loaded at import: {results[0]['loaded_at_import']}")
+        for metric in ["import_ms", "first_invocation_ms", "warm_invocation_ms"]:
+            values = [r[metric] for r in results]
+            print(
+                f"  {metric:<22} median {statistics.median(values):8.1f}  "
+                f"max {max(values):8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=list(SCENARIOS))
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+    else:
+        run_benchmark(args.runs)
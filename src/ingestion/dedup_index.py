@@ -0,0 +1,232 @@
+"""
+Ingestion-time duplicate suppression
+
+- ``SeenIdIndex``: per-data-type index of ingested IDs made of time-bucketed
+  Bloom filters (one per day by default, kept for ``retention_buckets``).
+  Membership checks and inserts are vectorized over a whole batch. A Bloom
+  filter never misses an ID it has seen but can report a false positive, so
+  ``error_rate`` is the probability of dropping a genuinely new record while
+  a bucket is within ``capacity``; it is kept very small by default.
+- ``IdempotencyStore``: remembers the response of an API request by its
+  ``Idempotency-Key`` so client retries return the original result.
+
+Snapshots (``to_bytes``/``from_bytes``) are merged with a bitwise OR, so
+indexes saved by different containers can be combined without losing IDs.
+A ``SeenIdIndex`` can be shared by threads: its buckets are only read or
+changed under its lock. Checking and then adding IDs is still two steps;
+callers serialize them (see ``lambda_function.drop_duplicates``).
+"""
+
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+def hash_ids(ids: List[Any]) -> np.ndarray:
+    """Two independent 64-bit hashes per ID, shape (n, 2)"""
+    digests = b"".join(
+        hashlib.blake2b(str(value).encode("utf-8"), digest_size=16).digest()
+        for value in ids
+    )
+    return np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a packed bit array"""
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        bits: Optional[np.ndarray] = None,
+        count: int = 0,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        nbytes = (self.num_bits + 7) // 8
+        self.bits = np.zeros(nbytes, dtype=np.uint8) if bits is None else bits
+        self.count = count
+
+    def positions(self, hashes: np.ndarray) -> np.ndarray:
+        """Bit positions for each hashed ID, shape (n, num_hashes)"""
+        h1 = hashes[:, :1]
+        h2 = hashes[:, 1:] | np.uint64(1)
+        k = np.arange(self.num_hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (h1 + k * h2) % np.uint64(self.num_bits)
+
+    def contains(self, positions: np.ndarray) -> np.ndarray:
+        byte = (positions >> np.uint64(3)).astype(np.int64)
+        mask = (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)).astype(
+            np.uint8
+        )
+        return ((self.bits[byte] & mask) != 0).all(axis=1)
+
+    def add(self, positions: np.ndarray) -> None:
+        byte = (positions >> np.uint64(3)).astype(np.int64).ravel()
+        mask = (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)).ravel()
+        np.bitwise_or.at(self.bits, byte, mask.astype(np.uint8))
+        self.count += len(positions)
+
+    def merge(self, other: "BloomFilter") -> None:
+        self.bits |= other.bits
+        self.count = max(self.count, other.count)
+
+
+class SeenIdIndex:
+    """Time-bucketed Bloom filters of ingested IDs for one data type"""
+
+    def __init__(
+        self,
+        capacity: int = 200000,
+        error_rate: float = 1e-6,
+        retention_buckets: int = 7,
+        bucket_seconds: int = 86400,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.retention_buckets = retention_buckets
+        self.bucket_seconds = bucket_seconds
+        self.filters: Dict[int, BloomFilter] = {}
+        self.dirty = False
+        self._lock = threading.RLock()
+
+    def _bucket(self, now: Optional[float]) -> int:
+        return int((time.time() if now is None else now) // self.bucket_seconds)
+
+    def _expire(self, current: int) -> None:
+        for bucket in list(self.filters):
+            if bucket <= current - self.retention_buckets:
+                del self.filters[bucket]
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter(self.capacity, self.error_rate)
+
+    def seen(self, ids: List[Any], now: Optional[float] = None) -> np.ndarray:
+        """Boolean mask of IDs already present in any retained bucket"""
+        with self._lock:
+            self._expire(self._bucket(now))
+            found = np.zeros(len(ids), dtype=bool)
+            if not ids or not self.filters:
+                return found
+            positions = self._new_filter().positions(hash_ids(ids))
+            for bloom in self.filters.values():
+                found |= bloom.contains(positions)
+            return found
+
+    def add(self, ids: List[Any], now: Optional[float] = None) -> None:
+        """Record IDs as ingested in the current bucket"""
+        if not ids:
+            return
+        current = self._bucket(now)
+        hashes = hash_ids(ids)
+        with self._lock:
+            self._expire(current)
+            bloom = self.filters.setdefault(current, self._new_filter())
+            bloom.add(bloom.positions(hashes))
+            self.dirty = True
+
+    def over_capacity(self) -> bool:
+        with self._lock:
+            return any(bloom.count > bloom.capacity for bloom in self.filters.values())
+
+    def merge(self, other: "SeenIdIndex") -> None:
+        with self._lock:
+            for bucket, bloom in other.filters.items():
+                if bucket in self.filters:
+                    self.filters[bucket].merge(bloom)
+                else:
+                    self.filters[bucket] = bloom
+            self._expire(self._bucket(None))
+
+    def to_bytes(self) -> bytes:
+        """Serialize as a JSON header line followed by each bucket's bits"""
+        with self._lock:
+            buckets = sorted(self.filters)
+            header = {
+                "version": 1,
+                "capacity": self.capacity,
+                "error_rate": self.error_rate,
+                "buckets": [[b, self.filters[b].count] for b in buckets],
+            }
+            body = b"".join(self.filters[b].bits.tobytes() for b in buckets)
+            return json.dumps(header).encode("utf-8") + b"\n" + body
+
+    def load_bytes(self, data: bytes) -> None:
+        """Merge a snapshot produced by ``to_bytes`` into this index"""
+        header_line, _, body = data.partition(b"\n")
+        header = json.loads(header_line)
+        if (header["capacity"], header["error_rate"]) != (
+            self.capacity,
+            self.error_rate,
+        ):
+            # Sized differently: cannot be merged bit-for-bit
+            return
+        other = SeenIdIndex(
+            self.capacity, self.error_rate, self.retention_buckets, self.bucket_seconds
+        )
+        nbytes = len(self._new_filter().bits)
+        for i, (bucket, count) in enumerate(header["buckets"]):
+            bits = np.frombuffer(body[i * nbytes : (i + 1) * nbytes], dtype=np.uint8)
+            other.filters[bucket] = BloomFilter(
+                self.capacity, self.error_rate, bits=bits.copy(), count=count
+            )
+        self.merge(other)
+
+
+class IdempotencyStore:
+    """
+    Responses keyed by client Idempotency-Key
+
+    Kept in a small per-container LRU and persisted through ``load``/``save``
+    callables (e.g. S3 GET/PUT) so retries landing on another container
+    still get the original response.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], Optional[bytes]],
+        save: Callable[[str, bytes], None],
+        max_entries: int = 1024,
+    ):
+        self._load = load
+        self._save = save
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self.max_entries = max_entries
+
+    @staticmethod
+    def object_name(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json"
+
+    def _remember(self, name: str, response: Dict) -> None:
+        self._cache[name] = response
+        self._cache.move_to_end(name)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        name = self.object_name(key)
+        if name in self._cache:
+            self._cache.move_to_end(name)
+            return self._cache[name]
+        data = self._load(name)
+        if data is None:
+            return None
+        response = json.loads(data)
+        self._remember(name, response)
+        return response
+
+    def put(self, key: str, response: Dict) -> None:
+        name = self.object_name(key)
+        self._save(name, json.dumps(response).encode("utf-8"))
+        self._remember(name, response)
@@ -13,26 +13,91 @@ Author: ASP
 Date: 2025-01-27
 """
 
+import hashlib
 import json
-import boto3
-import pandas as pd
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO
 import os
-import logging
-from typing import Dict, List, Any
+import sys
+from typing import TYPE_CHECKING, Dict, List, Any, Iterator, Optional, Union
+
+# Shared modules live in src/common locally and next to this file when packaged
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+)
+
+from object_store import (  # noqa: E402
+    OBJECT_STORE,
+    ObjectNotFound,
+    ObjectStore,
+    S3Store,
+    open_store,
+)
+from partition_catalog import PartitionCatalog, open_catalog  # noqa: E402
+from pipeline_logging import BatchLog, capped, get_logger  # noqa: E402
+from request_decoding import (  # noqa: E402
+    BodyDecodeError,
+    BodyTooLarge,
+    iter_api_batches,
+)
+from schema_registry import conform_table  # noqa: E402
+from spool import IngestionSpool  # noqa: E402
+
+# Heavy modules (boto3, pandas, pyarrow, numpy) are imported on first use so
+# that cold starts, and requests rejected before any work, don't pay for them.
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+    from dedup_index import IdempotencyStore, SeenIdIndex
+    from schema_validator import CompiledSchema
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
-# Initialize AWS clients
-s3_client = boto3.client("s3")
+# AWS clients, created on first use and reused by warm containers
+s3_client = None
+
+# Local or in-memory object store when OBJECT_STORE is not "s3"
+_store: Optional[ObjectStore] = None
 
 # Environment variables
 BRONZE_BUCKET = os.environ.get("BRONZE_BUCKET", "ecommerce-analytics-dev-bronze")
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
 
+# Streaming settings for large S3 uploads
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", "10000"))
+STREAM_BLOCK_BYTES = 1024 * 1024
+STREAMING_SUFFIXES = (".csv", ".jsonl", ".ndjson")
+
+# Number of S3 objects from one notification processed concurrently
+S3_MAX_CONCURRENCY = int(os.environ.get("S3_MAX_CONCURRENCY", "4"))
+
+# Write-ahead spool for API batches (disabled unless SPOOL_DIR is set)
+SPOOL_DIR = os.environ.get("SPOOL_DIR", "")
+SPOOL_MAX_ROWS = int(os.environ.get("SPOOL_MAX_ROWS", "100000"))
+SPOOL_MAX_BYTES = int(os.environ.get("SPOOL_MAX_BYTES", str(64 * 1024 * 1024)))
+SPOOL_MAX_AGE_SECONDS = float(os.environ.get("SPOOL_MAX_AGE_SECONDS", "300"))
+
+# Ingestion-time duplicate suppression (seen-ID index disabled unless DEDUP_ENABLED)
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "false").lower() == "true"
+DEDUP_CAPACITY = int(os.environ.get("DEDUP_CAPACITY", "200000"))
+DEDUP_ERROR_RATE = float(os.environ.get("DEDUP_ERROR_RATE", "1e-6"))
+DEDUP_RETENTION_DAYS = int(os.environ.get("DEDUP_RETENTION_DAYS", "7"))
+DEDUP_SNAPSHOT_SECONDS = float(os.environ.get("DEDUP_SNAPSHOT_SECONDS", "30"))
+DEDUP_INDEX_PREFIX = "_dedup_index/"
+IDEMPOTENCY_PREFIX = "_idempotency/"
+
+# Records deduplicated at ingestion, by ID field. Events are immutable; an
+# order's status updates reuse its order_id, so only an exact re-delivery of
+# an order version (same ID and content) is a duplicate. Customers/products
+# carry updates and are never dropped.
+DEDUP_KEYS = {"order": "order_id", "event": "event_id"}
+VERSIONED_DEDUP_TYPES = {"order"}
+
 # Data schemas for validation
 SCHEMAS = {
     "customer": {
@@ -45,6 +110,7 @@ SCHEMAS = {
             "phone": str,
             "is_active": bool,
         },
+        "formats": {"date_of_birth": "date", "signup_date": "timestamp"},
     },
     "product": {
         "required_fields": ["product_id", "product_name", "category", "base_price"],
@@ -56,6 +122,8 @@ SCHEMAS = {
             "current_price": (int, float),
             "inventory_quantity": int,
         },
+        "positive_fields": ["base_price"],
+        "formats": {"created_date": "timestamp"},
     },
     "order": {
         "required_fields": ["order_id", "customer_id", "product_id", "total_amount"],
@@ -68,6 +136,12 @@ SCHEMAS = {
             "total_amount": (int, float),
             "status": str,
         },
+        "positive_fields": ["total_amount", "quantity"],
+        "formats": {
+            "order_date": "timestamp",
+            "created_at": "timestamp",
+            "updated_at": "timestamp",
+        },
     },
     "event": {
         "required_fields": ["event_id", "event_type", "event_timestamp"],
@@ -77,9 +151,25 @@ SCHEMAS = {
             "event_type": str,
             "event_timestamp": str,
         },
+        "formats": {"event_timestamp": "timestamp"},
     },
 }
 
+# Compiled validators, built on first use and reused by warm containers
+_COMPILED_SCHEMAS: Dict[str, "CompiledSchema"] = {}
+
+_spool: Optional[IngestionSpool] = None
+_catalog: Optional[PartitionCatalog] = None
+_catalog_lock = threading.Lock()
+
+_seen_indexes: Dict[str, "SeenIdIndex"] = {}
+_seen_index_saved_at: Dict[str, float] = {}
+# Dedup keys of records being written, by data type: S3 objects run on worker
+# threads, so a key is reserved between the seen check and mark_ingested
+_reserved_keys: Dict[str, set] = {data_type: set() for data_type in DEDUP_KEYS}
+_dedup_locks = {data_type: threading.RLock() for data_type in DEDUP_KEYS}
+_idempotency_store: Optional["IdempotencyStore"] = None
+
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -93,7 +183,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         Response dict with status and message
     """
     try:
-        logger.info(f"Lambda invoked with event: {json.dumps(event)}")
+        logger.info("Lambda invoked with event: %s", capped(event))
 
         # Determine event source
         if "Records" in event:
@@ -107,7 +197,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return handle_direct_invocation(event)
 
     except Exception as e:
-        logger.error(f"Error in lambda_handler: {str(e)}", exc_info=True)
+        logger.error("Error in lambda_handler: %s", e, exc_info=True)
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e), "message": "Internal server error"}),
@@ -118,6 +208,30 @@ def handle_api_event(event: Dict[str, Any]) -> Dict[str, Any]:
     """
     Handle API Gateway event
 
+    A request with an ``Idempotency-Key`` header that already succeeded gets
+    the stored original response back and nothing is written again.
+    """
+    idempotency_key = get_header(event, "idempotency-key")
+    if idempotency_key:
+        cached = get_idempotency_store().get(idempotency_key)
+        if cached is not None:
+            logger.info("Replaying stored response for idempotency key")
+            return cached
+
+    response = process_api_request(event)
+
+    if idempotency_key and response["statusCode"] == 200:
+        try:
+            get_idempotency_store().put(idempotency_key, response)
+        except Exception as e:
+            logger.error("Could not store idempotent response: %s", e, exc_info=True)
+    return response
+
+
+def process_api_request(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate, enrich and write the records of an API Gateway request
+
     Expected body format:
     {
         "data_type": "order",
@@ -126,49 +240,46 @@ def handle_api_event(event: Dict[str, Any]) -> Dict[str, Any]:
             {"order_id": "ORD-002", ...}
         ]
     }
+
+    The body may also be gzip/zstd compressed and/or base64 encoded, or
+    newline-delimited JSON records with the data type given as the
+    ``data_type`` query parameter (see request_decoding). NDJSON is ingested
+    STREAM_CHUNK_ROWS records at a time; if a later line turns out invalid,
+    the batches before it are already written (a retry is deduplicated).
+    Bodies decoding to more than MAX_DECODED_BYTES are rejected with a 413.
     """
+    missing = {
+        "statusCode": 400,
+        "body": json.dumps(
+            {
+                "error": "Missing data_type or records",
+                "message": "Request must include data_type and records",
+            }
+        ),
+    }
     try:
         # Parse request body
-        body = json.loads(event.get("body", "{}"))
-        data_type = body.get("data_type")
-        records = body.get("records", [])
-
-        if not data_type or not records:
-            return {
-                "statusCode": 400,
-                "body": json.dumps(
-                    {
-                        "error": "Missing data_type or records",
-                        "message": "Request must include data_type and records",
-                    }
-                ),
-            }
+        data_type, batches = iter_api_batches(event, STREAM_CHUNK_ROWS)
+        if not data_type:
+            return missing
 
-        logger.info(f"Processing {len(records)} {data_type} records")
+        totals = ingest_api_batches(batches, data_type)
+        if not totals["records"]:
+            return missing
 
-        # Validate and process records
-        valid_records, invalid_records = validate_records(records, data_type)
-
-        if not valid_records:
+        if not totals["valid_records"]:
             return {
                 "statusCode": 400,
                 "body": json.dumps(
                     {
                         "error": "No valid records",
-                        "invalid_count": len(invalid_records),
-                        "invalid_records": invalid_records[
-                            :10
-                        ],  # Return first 10 errors
+                        "invalid_count": totals["invalid_records"],
+                        # Return first 10 errors
+                        "invalid_records": totals["first_invalid"],
                     }
                 ),
             }
 
-        # Enrich records
-        enriched_records = enrich_records(valid_records, data_type)
-
-        # Write to S3
-        s3_key = write_to_s3(enriched_records, data_type)
-
         # Return success response
         return {
             "statusCode": 200,
@@ -176,65 +287,120 @@ def handle_api_event(event: Dict[str, Any]) -> Dict[str, Any]:
                 {
                     "message": "Data ingested successfully",
                     "data_type": data_type,
-                    "valid_records": len(valid_records),
-                    "invalid_records": len(invalid_records),
-                    "s3_location": f"s3://{BRONZE_BUCKET}/{s3_key}",
+                    "valid_records": totals["valid_records"],
+                    "invalid_records": totals["invalid_records"],
+                    "s3_location": totals["parts"][-1] if totals["parts"] else None,
+                    "parts": totals["parts"],
+                    "duplicate_records": totals["duplicate_records"],
+                    "date_parse_failures": totals["date_parse_failures"],
                     "timestamp": datetime.utcnow().isoformat(),
                 }
             ),
         }
 
     except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON in request body: {str(e)}")
+        logger.error("Invalid JSON in request body: %s", e)
         return {
             "statusCode": 400,
             "body": json.dumps({"error": "Invalid JSON", "message": str(e)}),
         }
 
+    except BodyTooLarge as e:
+        logger.error("Request body too large: %s", e)
+        return {
+            "statusCode": 413,
+            "body": json.dumps({"error": "Body too large", "message": str(e)}),
+        }
+
+    except BodyDecodeError as e:
+        logger.error("Invalid request body encoding: %s", e)
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Invalid body encoding", "message": str(e)}),
+        }
+
+
+def ingest_api_batches(batches: Iterator[List[Dict]], data_type: str) -> Dict:
+    """
+    Validate and ingest an API request's record batches, one at a time
+
+    Returns:
+        Totals over the batches, the first 10 invalid records and the S3
+        locations written
+    """
+    totals = {
+        "records": 0,
+        "valid_records": 0,
+        "invalid_records": 0,
+        "first_invalid": [],
+        "parts": [],
+        "duplicate_records": 0,
+        "date_parse_failures": 0,
+    }
+    for records in batches:
+        logger.info("Processing %d %s records", len(records), data_type)
+        totals["records"] += len(records)
+
+        # Validate and process records
+        valid_records, invalid_records = validate_records(records, data_type)
+        totals["invalid_records"] += len(invalid_records)
+        room = 10 - len(totals["first_invalid"])
+        totals["first_invalid"] += invalid_records[:room]
+        if not valid_records:
+            continue
+        totals["valid_records"] += len(valid_records)
+
+        # Drop duplicates, enrich and write to S3 (or the spool)
+        result = ingest_records(valid_records, data_type)
+        if result["s3_location"] is not None:
+            totals["parts"].append(result["s3_location"])
+        totals["duplicate_records"] += result["duplicate_records"]
+        totals["date_parse_failures"] += result["date_parse_failures"]
+    return totals
+
 
 def handle_s3_event(event: Dict[str, Any]) -> Dict[str, Any]:
     """
     Handle S3 event (triggered when file uploaded to S3)
+
+    Objects are processed by up to S3_MAX_CONCURRENCY worker threads so that
+    downloads, parsing and uploads of different objects overlap. A failing
+    object is reported in ``errors`` without stopping the others.
     """
     try:
-        processed_files = []
-
-        for record in event["Records"]:
-            bucket = record["s3"]["bucket"]["name"]
-            key = record["s3"]["object"]["key"]
-
-            logger.info(f"Processing S3 file: s3://{bucket}/{key}")
-
-            # Download file
-            response = s3_client.get_object(Bucket=bucket, Key=key)
-            file_content = response["Body"].read()
-
-            # Parse based on file extension
-            if key.endswith(".json"):
-                data = json.loads(file_content)
-                records = data if isinstance(data, list) else [data]
-            elif key.endswith(".csv"):
-                df = pd.read_csv(BytesIO(file_content))
-                records = df.to_dict("records")
-            else:
-                logger.warning(f"Unsupported file type: {key}")
-                continue
-
-            # Infer data type from key or content
-            data_type = infer_data_type(key, records)
+        objects = [
+            (record["s3"]["bucket"]["name"], record["s3"]["object"]["key"])
+            for record in event["Records"]
+        ]
 
-            # Process records
-            valid_records, _ = validate_records(records, data_type)
-            enriched_records = enrich_records(valid_records, data_type)
-            s3_key = write_to_s3(enriched_records, data_type)
+        # Create the shared client once, before any worker needs it
+        get_store()
 
-            processed_files.append(
-                {
-                    "source_file": f"s3://{bucket}/{key}",
-                    "destination": f"s3://{BRONZE_BUCKET}/{s3_key}",
-                    "record_count": len(enriched_records),
-                }
-            )
+        workers = max(1, min(S3_MAX_CONCURRENCY, len(objects)))
+        if workers == 1:
+            outcomes = [
+                process_s3_object_safely(bucket, key) for bucket, key in objects
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(
+                    executor.map(lambda obj: process_s3_object_safely(*obj), objects)
+                )
+
+        processed_files = [result for result, _ in outcomes if result is not None]
+        errors = [error for _, error in outcomes if error is not None]
+
+        if errors:
+            return {
+                "statusCode": 500,
+                "body": json.dumps(
+                    {
+                        "error": f"{len(errors)} of {len(objects)} S3 files failed",
+                        "files": processed_files,
+                        "errors": errors,
+                    }
+                ),
+            }
 
         return {
             "statusCode": 200,
@@ -244,25 +410,171 @@ def handle_s3_event(event: Dict[str, Any]) -> Dict[str, Any]:
         }
 
     except Exception as e:
-        logger.error(f"Error processing S3 event: {str(e)}", exc_info=True)
+        logger.error("Error processing S3 event: %s", e, exc_info=True)
         return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
 
 
+def process_s3_object_safely(bucket: str, key: str) -> tuple:
+    """
+    Run process_s3_object, capturing a failure instead of raising
+
+    Returns:
+        (result, error) where exactly one side is set, or (None, None) for
+        skipped files
+    """
+    logger.info("Processing S3 file: s3://%s/%s", bucket, key)
+    try:
+        return process_s3_object(bucket, key), None
+    except Exception as e:
+        logger.error("Error processing s3://%s/%s: %s", bucket, key, e, exc_info=True)
+        return None, {"source_file": f"s3://{bucket}/{key}", "error": str(e)}
+
+
+def process_s3_object(bucket: str, key: str) -> Optional[Dict[str, Any]]:
+    """
+    Validate, enrich and write one uploaded S3 object to bronze
+
+    CSV and JSON-lines objects are streamed in chunks of STREAM_CHUNK_ROWS
+    records and each chunk is written as its own bronze Parquet part, so
+    memory stays flat regardless of the object size. Plain .json documents
+    are still parsed whole and written as a single part.
+
+    Returns:
+        Summary of the processed file, or None for unsupported file types
+    """
+    if not key.endswith((".json",) + STREAMING_SUFFIXES):
+        logger.warning("Unsupported file type: %s", key)
+        return None
+
+    # Download file
+    body = get_store().open(bucket, key)
+
+    streamed = not key.endswith(".json")
+    if streamed:
+        chunks = iter_record_chunks(body, key, STREAM_CHUNK_ROWS)
+    else:
+        data = json.loads(body.read())
+        chunks = [data if isinstance(data, list) else [data]]
+
+    # Distinguishes parts of objects processed concurrently in the same second
+    batch_id = uuid.uuid4().hex[:8]
+    data_type = None
+    parts = []
+    record_count = 0
+    invalid_count = 0
+    duplicate_count = 0
+    date_parse_failures = 0
+
+    for part, records in enumerate(chunks):
+        # Infer data type from key or content of the first chunk
+        if data_type is None:
+            data_type = infer_data_type(key, records)
+
+        valid_records, invalid_records = validate_records(records, data_type)
+        invalid_count += len(invalid_records)
+        valid_records, duplicates = drop_duplicates(valid_records, data_type)
+        duplicate_count += duplicates
+        if not valid_records:
+            continue
+
+        try:
+            enriched, failures = enrich_table(valid_records, data_type)
+            s3_key = write_to_s3(
+                enriched,
+                data_type,
+                part=part if streamed else None,
+                batch_id=batch_id,
+            )
+        except Exception:
+            release_reserved(valid_records, data_type)
+            raise
+        mark_ingested(valid_records, data_type)
+        date_parse_failures += failures
+        parts.append(f"s3://{BRONZE_BUCKET}/{s3_key}")
+        record_count += enriched.num_rows
+
+    return {
+        "source_file": f"s3://{bucket}/{key}",
+        "destination": parts[0] if parts else None,
+        "parts": parts,
+        "record_count": record_count,
+        "invalid_count": invalid_count,
+        "duplicate_count": duplicate_count,
+        "date_parse_failures": date_parse_failures,
+    }
+
+
+def iter_lines(body: Any, block_size: int = STREAM_BLOCK_BYTES) -> Iterator[bytes]:
+    """
+    Yield newline-separated lines from a file-like body, reading fixed-size blocks
+    """
+    pending = b""
+    while True:
+        block = body.read(block_size)
+        if not block:
+            break
+        lines = (pending + block).split(b"\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_record_chunks(
+    body: Any, key: str, chunk_rows: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield lists of at most ``chunk_rows`` records from a CSV or JSON-lines body
+    """
+    if key.endswith(".csv"):
+        import pandas as pd
+
+        for df in pd.read_csv(body, chunksize=chunk_rows):
+            yield df.to_dict("records")
+        return
+
+    batch = []
+    for line in iter_lines(body):
+        if not line.strip():
+            continue
+        batch.append(json.loads(line))
+        if len(batch) >= chunk_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 def handle_direct_invocation(event: Dict[str, Any]) -> Dict[str, Any]:
     """
     Handle direct Lambda invocation (for testing)
+
+    ``{"action": "flush_spool"}`` flushes spool segments that are due, so a
+    scheduled rule can enforce SPOOL_MAX_AGE_SECONDS during quiet periods.
     """
+    if event.get("action") == "flush_spool":
+        spool = get_spool()
+        flushed = spool.flush(write_to_s3) if spool is not None else []
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                {
+                    "message": "Spool flushed",
+                    "files": [f"s3://{BRONZE_BUCKET}/{key}" for _, key in flushed],
+                }
+            ),
+        }
+
     data_type = event.get("data_type", "order")
     records = event.get("records", [])
 
-    logger.info(f"Direct invocation with {len(records)} {data_type} records")
+    logger.info("Direct invocation with %d %s records", len(records), data_type)
 
     if not records:
         return {"statusCode": 400, "body": json.dumps({"error": "No records provided"})}
 
     valid_records, invalid_records = validate_records(records, data_type)
-    enriched_records = enrich_records(valid_records, data_type)
-    s3_key = write_to_s3(enriched_records, data_type)
+    result = ingest_records(valid_records, data_type)
 
     return {
         "statusCode": 200,
@@ -271,111 +583,431 @@ def handle_direct_invocation(event: Dict[str, Any]) -> Dict[str, Any]:
                 "message": "Success",
                 "valid_records": len(valid_records),
                 "invalid_records": len(invalid_records),
-                "s3_location": f"s3://{BRONZE_BUCKET}/{s3_key}",
+                **result,
             }
         ),
     }
 
 
-def validate_records(records: List[Dict], data_type: str) -> tuple:  # noqa: C901
+def ingest_records(valid_records: List[Dict], data_type: str) -> Dict[str, Any]:
+    """
+    Drop already-ingested records, then enrich and write (or spool) the rest
+
+    Returns:
+        Response fields: s3_location, duplicate_records, date_parse_failures
+    """
+    fresh_records, duplicate_count = drop_duplicates(valid_records, data_type)
+    if duplicate_count and not fresh_records:
+        return {
+            "s3_location": None,
+            "duplicate_records": duplicate_count,
+            "date_parse_failures": 0,
+        }
+
+    try:
+        enriched, date_parse_failures = enrich_table(fresh_records, data_type)
+        s3_location = write_or_spool(enriched, data_type)
+    except Exception:
+        release_reserved(fresh_records, data_type)
+        raise
+    mark_ingested(fresh_records, data_type)
+    return {
+        "s3_location": s3_location,
+        "duplicate_records": duplicate_count,
+        "date_parse_failures": date_parse_failures,
+    }
+
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    """Case-insensitive request header lookup"""
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def read_bronze_object(key: str) -> Optional[bytes]:
+    """Return an object's bytes from the bronze bucket, or None if missing"""
+    try:
+        return get_store().get(BRONZE_BUCKET, key)
+    except ObjectNotFound:
+        return None
+
+
+def get_idempotency_store() -> "IdempotencyStore":
+    """
+    Return the container's idempotency store, persisted in the bronze bucket
+    """
+    global _idempotency_store
+    if _idempotency_store is None:
+        from dedup_index import IdempotencyStore
+
+        def save(name: str, data: bytes) -> None:
+            get_store().put(BRONZE_BUCKET, IDEMPOTENCY_PREFIX + name, data)
+
+        _idempotency_store = IdempotencyStore(
+            load=lambda name: read_bronze_object(IDEMPOTENCY_PREFIX + name),
+            save=save,
+        )
+    return _idempotency_store
+
+
+def get_seen_index(data_type: str) -> Optional["SeenIdIndex"]:
+    """
+    Return the seen-ID index for a data type, loading its snapshot once per
+    container; None when deduplication does not apply
+    """
+    if not DEDUP_ENABLED or data_type not in DEDUP_KEYS:
+        return None
+    with _dedup_locks[data_type]:
+        index = _seen_indexes.get(data_type)
+        if index is None:
+            from dedup_index import SeenIdIndex
+
+            index = SeenIdIndex(
+                capacity=DEDUP_CAPACITY,
+                error_rate=DEDUP_ERROR_RATE,
+                retention_buckets=DEDUP_RETENTION_DAYS,
+            )
+            snapshot = read_bronze_object(f"{DEDUP_INDEX_PREFIX}{data_type}.bloom")
+            if snapshot:
+                index.load_bytes(snapshot)
+            _seen_indexes[data_type] = index
+            _seen_index_saved_at[data_type] = time.time()
+        return index
+
+
+def dedup_key(record: Dict, data_type: str) -> Any:
+    """A record's ID, plus a digest of its content for versioned data types"""
+    key = record[DEDUP_KEYS[data_type]]
+    if data_type not in VERSIONED_DEDUP_TYPES:
+        return key
+    content = json.dumps(record, sort_keys=True, default=str).encode("utf-8")
+    return f"{key}:{hashlib.blake2b(content, digest_size=8).hexdigest()}"
+
+
+def drop_duplicates(records: List[Dict], data_type: str) -> tuple:
+    """
+    Remove records whose dedup key repeats within the batch, was already
+    ingested or is being written by another thread, and reserve the keys
+    of the rest until mark_ingested (or release_reserved on failure)
+
+    Returns:
+        (fresh_records, duplicate_count)
+    """
+    index = get_seen_index(data_type)
+    if index is None or not records:
+        return records, 0
+
+    first_positions: Dict[Any, int] = {}
+    for position, record in enumerate(records):
+        first_positions.setdefault(dedup_key(record, data_type), position)
+
+    keys = list(first_positions)
+    with _dedup_locks[data_type]:
+        reserved = _reserved_keys[data_type]
+        seen = index.seen(keys)
+        fresh_keys = [
+            key
+            for key, already_seen in zip(keys, seen)
+            if not already_seen and key not in reserved
+        ]
+        reserved.update(fresh_keys)
+
+    fresh = [records[first_positions[key]] for key in fresh_keys]
+    duplicate_count = len(records) - len(fresh)
+    if duplicate_count:
+        logger.info("Dropped %d duplicate %s records", duplicate_count, data_type)
+    return fresh, duplicate_count
+
+
+def release_reserved(records: List[Dict], data_type: str) -> None:
+    """Give back the keys of records that could not be written"""
+    if get_seen_index(data_type) is None:
+        return
+    with _dedup_locks[data_type]:
+        _reserved_keys[data_type].difference_update(
+            dedup_key(record, data_type) for record in records
+        )
+
+
+def mark_ingested(records: List[Dict], data_type: str) -> None:
+    """
+    Add written records' keys to the seen-ID index and snapshot it to S3 at
+    most every DEDUP_SNAPSHOT_SECONDS
+    """
+    index = get_seen_index(data_type)
+    if index is None:
+        return
+    keys = [dedup_key(record, data_type) for record in records]
+    with _dedup_locks[data_type]:
+        index.add(keys)
+        _reserved_keys[data_type].difference_update(keys)
+        if index.over_capacity():
+            logger.warning("%s seen-ID index is over capacity", data_type)
+        if time.time() - _seen_index_saved_at[data_type] >= DEDUP_SNAPSHOT_SECONDS:
+            save_seen_index(data_type)
+
+
+def save_seen_index(data_type: str) -> None:
+    """
+    Merge the stored snapshot (saved by other containers) into this
+    container's index and write the result back
+    """
+    with _dedup_locks[data_type]:
+        index = _seen_indexes.get(data_type)
+        if index is None or not index.dirty:
+            return
+        key = f"{DEDUP_INDEX_PREFIX}{data_type}.bloom"
+        stored = read_bronze_object(key)
+        if stored:
+            index.load_bytes(stored)
+        get_store().put(BRONZE_BUCKET, key, index.to_bytes())
+        index.dirty = False
+        _seen_index_saved_at[data_type] = time.time()
+
+
+def get_spool() -> Optional[IngestionSpool]:
+    """
+    Return the container's ingestion spool, or None when spooling is disabled
+    """
+    global _spool
+    if _spool is None and SPOOL_DIR:
+        _spool = IngestionSpool(
+            SPOOL_DIR,
+            max_rows=SPOOL_MAX_ROWS,
+            max_bytes=SPOOL_MAX_BYTES,
+            max_age_seconds=SPOOL_MAX_AGE_SECONDS,
+        )
+    return _spool
+
+
+def write_or_spool(table: "pa.Table", data_type: str) -> Optional[str]:
+    """
+    Write records to bronze directly, or append them to the spool
+
+    With the spool enabled the records are durable once this returns; any
+    segments that hit a threshold are flushed with write_to_s3.
+
+    Returns:
+        S3 location written for this data type, or None if still spooled
+    """
+    spool = get_spool()
+    if spool is None:
+        return f"s3://{BRONZE_BUCKET}/{write_to_s3(table, data_type)}"
+
+    spool.append(data_type, table.to_pylist())
+    try:
+        flushed = spool.flush(write_to_s3)
+    except Exception as e:
+        # Records are already durable in the spool; the next flush retries
+        logger.error("Spool flush failed: %s", e, exc_info=True)
+        return None
+
+    keys = [key for flushed_type, key in flushed if flushed_type == data_type]
+    return f"s3://{BRONZE_BUCKET}/{keys[-1]}" if keys else None
+
+
+def get_catalog() -> Optional[PartitionCatalog]:
+    """Return the partition catalog, or None if CATALOG_PATH is not set"""
+    global _catalog
+    if _catalog is None:
+        # Object workers share one catalog, so only one of them may open it
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = open_catalog(store=get_store(), buckets=[BRONZE_BUCKET])
+    return _catalog
+
+
+def get_s3_client():
+    """
+    Return the container's S3 client, creating it on first use
+    """
+    global s3_client
+    if s3_client is None:
+        import boto3
+
+        s3_client = boto3.client("s3")
+    return s3_client
+
+
+def get_store() -> ObjectStore:
+    """
+    Return the container's object store: S3 through the shared client
+    unless OBJECT_STORE selects a local or in-memory backend
+    """
+    global _store
+    if OBJECT_STORE == "s3":
+        return S3Store(get_s3_client())
+    if _store is None:
+        _store = open_store(OBJECT_STORE)
+    return _store
+
+
+def get_compiled_schema(data_type: str) -> "CompiledSchema":
+    """
+    Return the columnar validator for a data type, compiling it once per container
+    """
+    compiled = _COMPILED_SCHEMAS.get(data_type)
+    if compiled is None:
+        from schema_validator import CompiledSchema
+
+        compiled = CompiledSchema(SCHEMAS[data_type])
+        _COMPILED_SCHEMAS[data_type] = compiled
+    return compiled
+
+
+def validate_records(records: List[Dict], data_type: str) -> tuple:
     """
     Validate records against schema
 
+    Required fields, types and business rules (``positive_fields``) are
+    checked column-by-column; error messages are only built for failed rows.
+
     Returns:
         (valid_records, invalid_records)
     """
     if data_type not in SCHEMAS:
-        logger.warning(f"Unknown data type: {data_type}, skipping validation")
+        logger.warning("Unknown data type: %s, skipping validation", data_type)
         return records, []
 
-    schema = SCHEMAS[data_type]
-    valid = []
-    invalid = []
-
-    for idx, record in enumerate(records):
-        errors = []
-
-        # Check required fields
-        for field in schema["required_fields"]:
-            if field not in record or record[field] is None:
-                errors.append(f"Missing required field: {field}")
-
-        # Check data types
-        for field, expected_type in schema["types"].items():
-            if field in record and record[field] is not None:
-                if not isinstance(record[field], expected_type):
-                    errors.append(
-                        f"Invalid type for {field}: expected {expected_type}, "
-                        f"got {type(record[field])}"
-                    )
-
-        # Business rules validation
-        if data_type == "order":
-            if "total_amount" in record and record["total_amount"] <= 0:
-                errors.append("total_amount must be positive")
-            if "quantity" in record and record["quantity"] <= 0:
-                errors.append("quantity must be positive")
-
-        if data_type == "product":
-            if "base_price" in record and record["base_price"] <= 0:
-                errors.append("base_price must be positive")
-
-        if errors:
-            invalid.append({"record_index": idx, "errors": errors, "record": record})
-            logger.warning(f"Invalid record at index {idx}: {errors}")
-        else:
-            valid.append(record)
-
-    logger.info(f"Validation complete: {len(valid)} valid, {len(invalid)} invalid")
+    valid, invalid = get_compiled_schema(data_type).validate(records)
+
+    # Only the first few invalid rows are logged; the rest are counted
+    batch = BatchLog(logger, f"{data_type} validation")
+    for entry in invalid:
+        batch.warning(
+            "invalid",
+            "Invalid record at index %d: %s",
+            entry["record_index"],
+            entry["errors"],
+        )
+    batch.summary(valid=len(valid), invalid=len(invalid))
     return valid, invalid
 
 
 def enrich_records(records: List[Dict], data_type: str) -> List[Dict]:
     """
     Enrich records with metadata
+
+    Record-oriented wrapper around enrich_table.
     """
-    enriched = []
-    current_time = datetime.utcnow().isoformat()
+    table, _ = enrich_table(records, data_type)
+    return table.to_pylist()
 
-    for record in records:
-        enriched_record = record.copy()
 
-        # Add metadata
-        enriched_record["_ingestion_timestamp"] = current_time
-        enriched_record["_source"] = "lambda_ingestion"
-        enriched_record["_data_type"] = data_type
-        enriched_record["_environment"] = ENVIRONMENT
-        enriched_record["_version"] = "1.0"
+def enrich_table(records: List[Dict], data_type: str) -> tuple:
+    """
+    Enrich a batch with metadata as whole-column operations
 
-        # Data type specific enrichment
-        if data_type == "order" and "order_date" in enriched_record:
-            # Parse order date and add date components
-            try:
-                order_date = pd.to_datetime(enriched_record["order_date"])
-                enriched_record["_order_year"] = order_date.year
-                enriched_record["_order_month"] = order_date.month
-                enriched_record["_order_day"] = order_date.day
-            except Exception:
-                pass
+    Metadata fields are added as constant columns and ``order_date`` is
+    parsed once for the whole batch to derive ``_order_year/_month/_day``.
 
-        enriched.append(enriched_record)
+    Returns:
+        (enriched Arrow table, number of order_date values that failed to parse)
+    """
+    import pyarrow as pa
+
+    table = records_to_table(records)
+    metadata = {
+        "_ingestion_timestamp": datetime.utcnow().isoformat(),
+        "_source": "lambda_ingestion",
+        "_data_type": data_type,
+        "_environment": ENVIRONMENT,
+        "_version": "1.0",
+    }
+    for name, value in metadata.items():
+        table = set_column(table, name, pa.repeat(value, table.num_rows))
+
+    # Data type specific enrichment
+    failures = 0
+    if data_type == "order" and "order_date" in table.column_names:
+        parts, failures = parse_date_parts(table.column("order_date").to_pandas())
+        for name in ["year", "month", "day"]:
+            table = set_column(table, f"_order_{name}", pa.array(parts[name]))
+        if failures:
+            logger.warning("%d order_date values could not be parsed", failures)
 
-    logger.info(f"Enriched {len(enriched)} records")
-    return enriched
+    logger.info("Enriched %d records", table.num_rows)
+    return table, failures
 
 
-def write_to_s3(records: List[Dict], data_type: str) -> str:
+def parse_date_parts(values: "pd.Series") -> tuple:
     """
-    Write records to S3 as Parquet
+    Parse a column of date strings into year/month/day columns
+
+    ISO-8601 values are parsed in one vectorized pass; anything else falls
+    back to a per-value parse. Values that still fail become nulls.
+
+    Returns:
+        (DataFrame with nullable year, month and day, number of failures)
+    """
+    import pandas as pd
+
+    try:
+        parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    except (ValueError, TypeError):
+        parsed = None
+    if parsed is None or not pd.api.types.is_datetime64_any_dtype(parsed):
+        # e.g. mixed UTC offsets: every value takes the slow path
+        parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+
+    parts = pd.DataFrame(
+        {"year": parsed.dt.year, "month": parsed.dt.month, "day": parsed.dt.day},
+        dtype="Int64",
+    )
+
+    retry = parts["year"].isna() & values.notna()
+    for position in retry.to_numpy().nonzero()[0]:
+        try:
+            value = pd.to_datetime(values.iat[position])
+            parts.iloc[position] = [value.year, value.month, value.day]
+        except (ValueError, TypeError, OverflowError):
+            continue
+
+    failures = int((parts["year"].isna() & values.notna()).sum())
+    return parts, failures
+
+
+def set_column(table: "pa.Table", name: str, values: "pa.Array") -> "pa.Table":
+    """
+    Replace a column by name, or append it if the table doesn't have it
+    """
+    index = table.schema.get_field_index(name)
+    if index == -1:
+        return table.append_column(name, values)
+    return table.set_column(index, name, values)
+
+
+def write_to_s3(
+    records: Union[List[Dict], "pa.Table"],
+    data_type: str,
+    part: Optional[int] = None,
+    batch_id: Optional[str] = None,
+) -> str:
+    """
+    Write records (a list of dicts or an Arrow table) to S3 as Parquet
+
+    ``batch_id`` makes the file name unique per source object and ``part``
+    numbers the files written from one streamed source object.
 
     Returns:
         S3 key of written file
     """
-    if not records:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if len(records) == 0:
         raise ValueError("No records to write")
 
-    # Convert to DataFrame
-    df = pd.DataFrame(records)
+    # Convert to an Arrow table (no pandas round-trip)
+    if isinstance(records, pa.Table):
+        table = records
+    else:
+        table = records_to_table(records)
+
+    # Typed columns from the schema registry; fields it doesn't know are kept
+    table = conform_table(table, "bronze", f"{data_type}s", fill_missing=False)
 
     # Generate S3 key with partitioning
     now = datetime.utcnow()
@@ -384,31 +1016,62 @@ def write_to_s3(records: List[Dict], data_type: str) -> str:
         f"year={now.year}/"
         f"month={now.month:02d}/"
         f"day={now.day:02d}/"
-        f"{data_type}_{now.strftime('%Y%m%d_%H%M%S')}.parquet"
+        f"{data_type}_{now.strftime('%Y%m%d_%H%M%S')}"
     )
+    if batch_id is not None:
+        s3_key += f"_{batch_id}"
+    if part is not None:
+        s3_key += f"_part{part:05d}"
+    s3_key += ".parquet"
 
     # Write to buffer
     buffer = BytesIO()
-    df.to_parquet(buffer, index=False, compression="snappy")
-    buffer.seek(0)
+    pq.write_table(table, buffer, compression="snappy")
+    body = buffer.getvalue()
 
     # Upload to S3
-    s3_client.put_object(
-        Bucket=BRONZE_BUCKET,
-        Key=s3_key,
-        Body=buffer.getvalue(),
-        ContentType="application/octet-stream",
-        Metadata={
-            "record_count": str(len(records)),
+    get_store().put(
+        BRONZE_BUCKET,
+        s3_key,
+        body,
+        content_type="application/octet-stream",
+        metadata={
+            "record_count": str(table.num_rows),
             "data_type": data_type,
             "ingestion_timestamp": datetime.utcnow().isoformat(),
         },
     )
 
-    logger.info(f"Wrote {len(records)} records to s3://{BRONZE_BUCKET}/{s3_key}")
+    catalog = get_catalog()
+    if catalog is not None:
+        catalog.record_table(
+            "bronze", f"{data_type}s", BRONZE_BUCKET, s3_key, table, len(body)
+        )
+
+    logger.info("Wrote %d records to s3://%s/%s", table.num_rows, BRONZE_BUCKET, s3_key)
     return s3_key
 
 
+def records_to_table(records: List[Dict]):
+    """
+    Build an Arrow table from records, using the union of keys as columns
+
+    Columns appear in first-seen order; missing keys and NaN (e.g. empty
+    CSV cells) become nulls.
+    """
+    import pyarrow as pa
+
+    columns = dict.fromkeys(key for record in records for key in record)
+    return pa.table(
+        {
+            column: pa.array(
+                [record.get(column) for record in records], from_pandas=True
+            )
+            for column in columns
+        }
+    )
+
+
 def infer_data_type(filename: str, records: List[Dict]) -> str:
     """
     Infer data type from filename or record structure
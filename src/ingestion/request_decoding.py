@@ -0,0 +1,218 @@
+"""
+Request body decoding for the ingestion API
+
+Accepts, in addition to a plain JSON document:
+- base64 bodies (API Gateway ``isBase64Encoded``)
+- gzip or zstd compression, from ``Content-Encoding`` or the magic bytes
+- newline-delimited JSON (``Content-Type: application/x-ndjson``), parsed one
+  line at a time straight off the decompression stream and handed on in
+  batches (``iter_api_batches``); the data type comes from the ``data_type``
+  query parameter or the ``X-Data-Type`` header
+
+A body that decodes to more than MAX_DECODED_BYTES is rejected with
+``BodyTooLarge`` as soon as the limit is crossed, so a small compressed
+body can't expand without bound in memory.
+
+JSON is decoded with orjson when it is installed, falling back to the stdlib.
+"""
+
+import base64
+import gzip
+import io
+import json
+import os
+import sys
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+
+    _fast_loads = orjson.loads
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    _fast_loads = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+NDJSON_CONTENT_TYPES = (
+    "application/x-ndjson",
+    "application/jsonl",
+    "application/json-seq",
+)
+
+# Largest decoded (decompressed) body accepted
+MAX_DECODED_BYTES = int(os.environ.get("MAX_DECODED_BYTES", str(64 * 1024 * 1024)))
+
+
+class BodyDecodeError(ValueError):
+    """Raised when a request body cannot be decoded or decompressed"""
+
+
+class BodyTooLarge(BodyDecodeError):
+    """Raised when a request body decodes to more than MAX_DECODED_BYTES"""
+
+
+class _BoundedReader(io.RawIOBase):
+    """Stream that raises BodyTooLarge once more than ``limit`` bytes are read"""
+
+    def __init__(self, stream: io.BufferedIOBase, limit: int):
+        self._stream = stream
+        self._limit = limit
+        self._read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._stream.readinto(buffer)
+        self._read += count
+        if self._read > self._limit:
+            raise BodyTooLarge(f"Decoded body exceeds {self._limit} bytes")
+        return count
+
+    def close(self) -> None:
+        self._stream.close()
+        super().close()
+
+
+def loads(data) -> Any:
+    """Decode JSON with the fast decoder if available"""
+    if _fast_loads is not None:
+        return _fast_loads(data)
+    return json.loads(data)
+
+
+def _headers(event: Dict[str, Any]) -> Dict[str, str]:
+    return {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+
+
+def _raw_body(event: Dict[str, Any]) -> bytes:
+    body = event.get("body")
+    if body is None:
+        return b"{}"
+    if event.get("isBase64Encoded"):
+        try:
+            return base64.b64decode(body, validate=True)
+        except (ValueError, TypeError) as e:
+            raise BodyDecodeError(f"Invalid base64 body: {e}")
+    return body.encode("utf-8") if isinstance(body, str) else body
+
+
+def _encoding(headers: Dict[str, str], raw: bytes) -> str:
+    encoding = headers.get("content-encoding", "").strip().lower()
+    if encoding in ("", "identity"):
+        if raw.startswith(GZIP_MAGIC):
+            return "gzip"
+        if raw.startswith(ZSTD_MAGIC):
+            return "zstd"
+        return "identity"
+    return encoding
+
+
+def _decoder(raw: bytes, encoding: str) -> io.BufferedIOBase:
+    if encoding == "identity":
+        return io.BytesIO(raw)
+    if encoding in ("gzip", "x-gzip"):
+        return gzip.GzipFile(fileobj=io.BytesIO(raw))
+    if encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise BodyDecodeError("zstd bodies require the zstandard package")
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(raw))
+        return io.BufferedReader(reader)
+    raise BodyDecodeError(f"Unsupported Content-Encoding: {encoding}")
+
+
+def open_body(
+    event: Dict[str, Any], max_bytes: Optional[int] = None
+) -> io.BufferedIOBase:
+    """
+    Return a binary stream over the decoded (decompressed) request body,
+    raising BodyTooLarge past ``max_bytes`` (default MAX_DECODED_BYTES)
+    """
+    raw = _raw_body(event)
+    stream = _decoder(raw, _encoding(_headers(event), raw))
+    limit = MAX_DECODED_BYTES if max_bytes is None else max_bytes
+    return io.BufferedReader(_BoundedReader(stream, limit))
+
+
+def _decompression_errors() -> tuple:
+    errors = (OSError, EOFError, zlib.error)
+    zstandard = sys.modules.get("zstandard")
+    if zstandard is not None:
+        errors += (zstandard.ZstdError,)
+    return errors
+
+
+def iter_ndjson(stream: io.BufferedIOBase) -> Iterator[Dict[str, Any]]:
+    """Yield one record per non-blank line of a binary stream"""
+    for line in stream:
+        if line.strip():
+            yield loads(line)
+
+
+def is_ndjson(event: Dict[str, Any]) -> bool:
+    content_type = _headers(event).get("content-type", "")
+    return content_type.split(";")[0].strip().lower() in NDJSON_CONTENT_TYPES
+
+
+def _ndjson_data_type(event: Dict[str, Any]) -> Optional[str]:
+    params = event.get("queryStringParameters") or {}
+    return params.get("data_type") or _headers(event).get("x-data-type")
+
+
+def _ndjson_batches(event: Dict[str, Any], batch_rows: int) -> Iterator[List[Dict]]:
+    try:
+        with open_body(event) as stream:
+            batch = []
+            for record in iter_ndjson(stream):
+                batch.append(record)
+                if len(batch) >= batch_rows:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+    except _decompression_errors() as e:
+        raise BodyDecodeError(f"Could not decompress body: {e}")
+
+
+def iter_api_batches(
+    event: Dict[str, Any], batch_rows: int
+) -> Tuple[Optional[str], Iterator[List[Dict]]]:
+    """
+    Decode an API Gateway event into (data_type, batches of records)
+
+    NDJSON bodies are decoded lazily, at most ``batch_rows`` records at a
+    time, so the errors below can also be raised while iterating; a JSON
+    document is one batch.
+
+    Raises:
+        BodyDecodeError: body is not valid base64 / compressed data
+        BodyTooLarge: body decodes to more than MAX_DECODED_BYTES
+        json.JSONDecodeError: body is not valid JSON
+    """
+    if is_ndjson(event):
+        return _ndjson_data_type(event), _ndjson_batches(event, batch_rows)
+
+    try:
+        with open_body(event) as stream:
+            body = loads(stream.read())
+    except _decompression_errors() as e:
+        raise BodyDecodeError(f"Could not decompress body: {e}")
+
+    if not isinstance(body, dict):
+        return None, iter([])
+    records = body.get("records", [])
+    return body.get("data_type"), iter([records] if records else [])
+
+
+def parse_api_request(event: Dict[str, Any]) -> Tuple[Optional[str], List[Dict]]:
+    """
+    Decode an API Gateway event into (data_type, records)
+
+    Raises the same errors as iter_api_batches.
+    """
+    data_type, batches = iter_api_batches(event, batch_rows=10000)
+    return data_type, [record for batch in batches for record in batch]
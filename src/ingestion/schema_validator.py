@@ -0,0 +1,201 @@
+"""
+Columnar schema validation for the ingestion Lambda
+
+Compiles a schema from ``SCHEMAS`` into per-field checks that run over whole
+columns with NumPy masks instead of walking every record and field in Python.
+Error messages are only formatted for the rows that actually failed.
+
+``formats`` fields must hold ISO 8601 dates or timestamps: bronze stores
+them typed, and a value the cast can't read would otherwise be stored as
+null, losing the raw value.
+"""
+
+import numpy as np
+from datetime import date, datetime
+from itertools import compress
+from typing import Any, Dict, List, Tuple
+
+# Marks a field that is absent from a record (distinct from an explicit None)
+_MISSING = object()
+
+# Per-cell classification codes
+_NULL = 0
+_OK = 1
+_BAD_TYPE = 2
+
+_NUMERIC = (int, float)
+
+# Parsers of the ``formats`` a field can be checked against
+_FORMAT_PARSERS = {"date": date.fromisoformat, "timestamp": datetime.fromisoformat}
+
+
+def _parses(value: Any, parse) -> bool:
+    if not isinstance(value, str):
+        return False
+    try:
+        parse(value)
+    except ValueError:
+        return False
+    return True
+
+
+class _TypeCodes(dict):
+    """Memoized ``type -> code`` lookup, equivalent to a per-cell isinstance"""
+
+    def __init__(self, expected_type):
+        super().__init__()
+        self.expected_type = expected_type
+        self[type(None)] = _NULL
+        self[type(_MISSING)] = _NULL
+
+    def __missing__(self, value_type):
+        if self.expected_type is None or issubclass(value_type, self.expected_type):
+            code = _OK
+        else:
+            code = _BAD_TYPE
+        self[value_type] = code
+        return code
+
+
+class CompiledSchema:
+    """Validator for one data type, built once per container"""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.required_fields = list(schema.get("required_fields", []))
+        self.types = dict(schema.get("types", {}))
+        self.positive_fields = list(schema.get("positive_fields", []))
+        self.formats = dict(schema.get("formats", {}))
+
+        fields = (
+            self.required_fields
+            + list(self.types)
+            + self.positive_fields
+            + list(self.formats)
+        )
+        self.fields = list(dict.fromkeys(fields))
+        self._codes = {
+            field: _TypeCodes(self.types.get(field)) for field in self.fields
+        }
+        self._numeric_codes = _TypeCodes(_NUMERIC)
+
+    def _mask(self, column: List[Any], codes: _TypeCodes, code: int) -> np.ndarray:
+        """Mask of cells in a column whose classification equals ``code``"""
+        present = {codes[value_type] for value_type in set(map(type, column))}
+        if code not in present:
+            return np.zeros(len(column), dtype=bool)
+        if present == {code}:
+            return np.ones(len(column), dtype=bool)
+        classified = np.fromiter(
+            map(codes.__getitem__, map(type, column)), dtype=np.int8, count=len(column)
+        )
+        return classified == code
+
+    def _non_positive(self, column: List[Any]) -> np.ndarray:
+        """Mask of numeric cells that are <= 0"""
+        numeric = self._mask(column, self._numeric_codes, _OK)
+        if numeric.all():
+            return np.array(column, dtype=np.float64) <= 0
+        if not numeric.any():
+            return numeric
+        values = np.array(column, dtype=object)
+        values[~numeric] = 1
+        return values.astype(np.float64) <= 0
+
+    def _bad_format(self, column: List[Any], kind: str) -> np.ndarray:
+        """Mask of present cells that are not ISO 8601 values of ``kind``"""
+        parse = _FORMAT_PARSERS[kind]
+        # Dates repeat within a batch: parse each distinct value once
+        verdicts = {}
+        mask = np.zeros(len(column), dtype=bool)
+        for idx, value in enumerate(column):
+            # NaN: an empty CSV cell
+            if value is None or value is _MISSING or value != value:
+                continue
+            key = value if isinstance(value, str) else id(value)
+            if key not in verdicts:
+                verdicts[key] = not _parses(value, parse)
+            mask[idx] = verdicts[key]
+        return mask
+
+    def build_masks(self, records: List[Dict]) -> List[Tuple[str, str, np.ndarray]]:
+        """
+        Evaluate every check over the batch
+
+        Returns:
+            List of (check, field, failure mask) in error-reporting order
+        """
+        columns = {
+            field: [record.get(field, _MISSING) for record in records]
+            for field in self.fields
+        }
+
+        masks = []
+        for field in self.required_fields:
+            mask = self._mask(columns[field], self._codes[field], _NULL)
+            masks.append(("required", field, mask))
+        for field in self.types:
+            mask = self._mask(columns[field], self._codes[field], _BAD_TYPE)
+            masks.append(("type", field, mask))
+        for field in self.positive_fields:
+            masks.append(("positive", field, self._non_positive(columns[field])))
+        for field, kind in self.formats.items():
+            masks.append(("format", field, self._bad_format(columns[field], kind)))
+        return masks
+
+    def _format_errors(self, record: Dict, idx: int, masks) -> List[str]:
+        errors = []
+        for check, field, mask in masks:
+            if not mask[idx]:
+                continue
+            if check == "required":
+                errors.append(f"Missing required field: {field}")
+            elif check == "type":
+                errors.append(
+                    f"Invalid type for {field}: expected {self.types[field]}, "
+                    f"got {type(record[field])}"
+                )
+            elif check == "format":
+                errors.append(
+                    f"Invalid {self.formats[field]} for {field}: expected "
+                    f"ISO 8601, got {record[field]!r}"
+                )
+            else:
+                errors.append(f"{field} must be positive")
+        return errors
+
+    def validate(self, records: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Split records into valid records and invalid entries
+
+        Returns:
+            (valid_records, invalid_records) where each invalid entry is
+            {"record_index": idx, "errors": [...], "record": record}
+        """
+        if not records:
+            return [], []
+
+        masks = self.build_masks(records)
+        failed = np.zeros(len(records), dtype=bool)
+        for _, _, mask in masks:
+            failed |= mask
+
+        if not failed.any():
+            return list(records), []
+
+        valid = list(compress(records, ~failed))
+        invalid = []
+        for idx in np.flatnonzero(failed).tolist():
+            record = records[idx]
+            invalid.append(
+                {
+                    "record_index": idx,
+                    "errors": self._format_errors(record, idx, masks),
+                    "record": record,
+                }
+            )
+        return valid, invalid
+
+
+def compile_schemas(schemas: Dict[str, Dict]) -> Dict[str, CompiledSchema]:
+    """Compile every schema in a ``SCHEMAS``-style dict"""
+    return {data_type: CompiledSchema(schema) for data_type, schema in schemas.items()}
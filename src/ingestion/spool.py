@@ -0,0 +1,202 @@
+"""
+Write-ahead spool for bronze writes
+
+Accepted records are appended to a local per-data-type log and fsync'd before
+the request is acknowledged. A segment is flushed to one right-sized bronze
+Parquet object once it reaches a row count, byte size or age threshold, so
+steady small-batch traffic no longer produces one tiny file per API call.
+
+Flushing renames the active segment to ``.flushing`` before uploading and only
+deletes it after the upload succeeds. Leftover ``.flushing`` segments (from a
+crash or a failed upload) are retried on the next flush, so delivery is
+at-least-once. Point the spool at persistent storage (e.g. an EFS mount) for
+segments to outlive a recycled container.
+
+Appends and flushes hold an ``fcntl.flock`` on the directory's lock file as
+well as a thread lock, so containers sharing the directory never append to
+a segment another one is uploading. Each segment is uploaded with its open
+time as the writer's ``batch_id``, which keeps the objects of segments of
+one data type flushed in the same second apart.
+"""
+
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ACTIVE_SUFFIX = ".log"
+FLUSHING_SUFFIX = ".flushing"
+LOCK_FILE = ".lock"
+
+
+def _fsync_dir(directory: str) -> None:
+    """Persist directory entries (new files, renames)"""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _count_lines(path: str) -> int:
+    count = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            count += block.count(b"\n")
+    return count
+
+
+def _truncate_torn_tail(path: str) -> None:
+    """Drop a partially written last line left behind by a crash mid-append"""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        offset = max(0, size - 1024 * 1024)
+        f.seek(offset)
+        tail = f.read()
+        cut = tail.rfind(b"\n")
+        f.truncate(offset + cut + 1 if cut >= 0 else 0)
+
+
+class IngestionSpool:
+    """Append-only local log of enriched records, flushed in large batches"""
+
+    def __init__(
+        self,
+        directory: str,
+        max_rows: int = 100000,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age_seconds: float = 300,
+    ):
+        self.directory = directory
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._row_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive access to the directory, across threads and processes"""
+        with self._lock:
+            with open(os.path.join(self.directory, LOCK_FILE), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _parse_segment(path: str) -> Tuple[str, float]:
+        """Return (data_type, opened_at) from ``<data_type>.<epoch_ms>.<suffix>``"""
+        data_type, opened_ms, _ = os.path.basename(path).split(".")
+        return data_type, int(opened_ms) / 1000.0
+
+    def _segments(self, data_type: str = "*", suffix: str = ACTIVE_SUFFIX) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, f"{data_type}.*{suffix}")))
+
+    def _active_segment(self, data_type: str) -> str:
+        segments = self._segments(data_type)
+        if segments:
+            return segments[-1]
+        opened_ms = int(time.time() * 1000)
+        # The open time names the segment's upload: never reuse a pending one
+        while os.path.exists(
+            os.path.join(self.directory, f"{data_type}.{opened_ms}{FLUSHING_SUFFIX}")
+        ):
+            opened_ms += 1
+        return os.path.join(self.directory, f"{data_type}.{opened_ms}{ACTIVE_SUFFIX}")
+
+    def _rows(self, path: str) -> int:
+        if path not in self._row_counts:
+            if os.path.exists(path):
+                _truncate_torn_tail(path)
+                self._row_counts[path] = _count_lines(path)
+            else:
+                self._row_counts[path] = 0
+        return self._row_counts[path]
+
+    def append(self, data_type: str, records: List[Dict]) -> None:
+        """Durably append records; returns once they are on disk"""
+        payload = "".join(json.dumps(r, default=str) + "\n" for r in records)
+        with self._locked():
+            path = self._active_segment(data_type)
+            rows = self._rows(path)
+            is_new = not os.path.exists(path)
+            with open(path, "ab") as f:
+                f.write(payload.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            if is_new:
+                _fsync_dir(self.directory)
+            self._row_counts[path] = rows + len(records)
+
+    def is_due(self, path: str, now: Optional[float] = None) -> bool:
+        """Whether a segment has hit its row, byte or age threshold"""
+        now = time.time() if now is None else now
+        _, opened_at = self._parse_segment(path)
+        return (
+            self._rows(path) >= self.max_rows
+            or os.path.getsize(path) >= self.max_bytes
+            or now - opened_at >= self.max_age_seconds
+        )
+
+    @staticmethod
+    def _read_segment(path: str) -> List[Dict]:
+        records = []
+        with open(path, "rb") as f:
+            for line in f:
+                # A line without its newline was never acknowledged
+                if line.endswith(b"\n"):
+                    records.append(json.loads(line))
+        return records
+
+    def _flush_segment(self, path: str, writer: Callable[..., str]) -> Tuple[str, str]:
+        data_type, opened_at = self._parse_segment(path)
+        records = self._read_segment(path)
+        batch_id = str(int(round(opened_at * 1000)))
+        key = writer(records, data_type, batch_id=batch_id) if records else None
+        os.remove(path)
+        self._row_counts.pop(path, None)
+        return data_type, key
+
+    def flush(
+        self, writer: Callable[..., str], force: bool = False
+    ) -> List[Tuple[str, str]]:
+        """
+        Upload due segments with ``writer(records, data_type, batch_id=...)``
+
+        Returns:
+            List of (data_type, key returned by writer) for flushed segments
+        """
+        flushed = []
+        with self._locked():
+            for path in self._segments():
+                if force or self.is_due(path):
+                    flushing = path[: -len(ACTIVE_SUFFIX)] + FLUSHING_SUFFIX
+                    os.rename(path, flushing)
+                    self._row_counts.pop(path, None)
+            _fsync_dir(self.directory)
+
+            for path in self._segments(suffix=FLUSHING_SUFFIX):
+                data_type, key = self._flush_segment(path, writer)
+                if key is not None:
+                    flushed.append((data_type, key))
+        return flushed
+
+    def pending_rows(self, data_type: str) -> int:
+        """Rows acknowledged but not yet flushed for a data type"""
+        with self._locked():
+            paths = self._segments(data_type) + self._segments(
+                data_type, FLUSHING_SUFFIX
+            )
+            return sum(self._rows(path) for path in paths)
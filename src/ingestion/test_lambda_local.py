@@ -3,9 +3,15 @@ Local testing script for Lambda function
 Tests validation and enrichment WITHOUT AWS calls
 """
 
+import base64
+import gzip
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
 from unittest.mock import patch
 
 # Add current directory to Python path
@@ -17,10 +23,16 @@ os.environ["ENVIRONMENT"] = "dev"
 
 # Import Lambda function
 from lambda_function import (  # noqa: E402
+    STREAM_BLOCK_BYTES,
     lambda_handler,
     enrich_records,
+    enrich_table,
+    iter_lines,
+    iter_record_chunks,
     validate_records,
 )
+from partition_catalog import PartitionCatalog  # noqa: E402
+from spool import IngestionSpool  # noqa: E402
 
 
 class MockContext:
@@ -78,6 +90,47 @@ def test_validation():
     print("All validation tests passed!\n")
 
 
+def test_validation_error_messages():
+    """Test per-row error lists from the columnar validator (no AWS)"""
+    print("Testing validation error messages...")
+
+    records = [
+        {
+            "order_id": "ORD-001",
+            "customer_id": "CUST-001",
+            "product_id": "PROD-001",
+            "total_amount": 100.0,
+            "quantity": 1,
+        },
+        {
+            "order_id": "ORD-002",
+            "product_id": "PROD-002",
+            "total_amount": 0,
+            "quantity": "2",
+        },
+        {
+            "order_id": "ORD-003",
+            "customer_id": "CUST-003",
+            "product_id": "PROD-003",
+            "total_amount": 25,
+            "quantity": 3,
+        },
+    ]
+
+    valid, invalid = validate_records(records, "order")
+    assert [r["order_id"] for r in valid] == ["ORD-001", "ORD-003"]
+    assert len(invalid) == 1
+    assert invalid[0]["record_index"] == 1
+    assert invalid[0]["record"] is records[1]
+    assert invalid[0]["errors"] == [
+        "Missing required field: customer_id",
+        "Invalid type for quantity: expected <class 'int'>, got <class 'str'>",
+        "total_amount must be positive",
+    ]
+    print("✓ Error lists built only for failed rows, in schema order")
+    print()
+
+
 def test_enrichment():
     """Test data enrichment (no AWS)"""
     print("Testing data enrichment...")
@@ -104,6 +157,26 @@ def test_enrichment():
     print()
 
 
+def test_enrichment_counts_unparsed_dates():
+    """Test vectorized date parsing reports rows it could not parse (no AWS)"""
+    print("Testing enrichment date parse failures...")
+
+    records = [
+        {"order_id": "ORD-001", "order_date": "2025-01-27T10:00:00"},
+        {"order_id": "ORD-002", "order_date": "01/28/2025"},
+        {"order_id": "ORD-003", "order_date": "not-a-date"},
+        {"order_id": "ORD-004"},
+    ]
+
+    table, failures = enrich_table(records, "order")
+
+    assert failures == 1
+    assert table.column("_order_day").to_pylist() == [27, 28, None, None]
+    assert table.column("_source").to_pylist() == ["lambda_ingestion"] * 4
+    print("✓ 1 unparsable order_date counted, non-ISO date parsed by fallback")
+    print()
+
+
 def test_different_data_types():
     """Test validation for different data types (no AWS)"""
     print("Testing different data types...")
@@ -185,6 +258,516 @@ def test_full_lambda_handler(mock_s3):
     print()
 
 
+@patch("lambda_function.STREAM_CHUNK_ROWS", 10)
+@patch("lambda_function.s3_client")
+def test_s3_event_streams_in_chunks(mock_s3):
+    """Test large S3 drops are streamed and written as bronze parts (S3 mocked)"""
+    print("Testing chunked S3 processing...")
+
+    lines = [
+        json.dumps(
+            {
+                "order_id": f"ORD-{i:03d}",
+                "customer_id": "CUST-001",
+                "product_id": "PROD-001",
+                "total_amount": 10.0 if i != 7 else -1.0,
+                "quantity": 1,
+            }
+        )
+        for i in range(25)
+    ]
+    mock_s3.get_object.return_value = {
+        "Body": BytesIO("\n".join(lines).encode("utf-8"))
+    }
+    mock_s3.put_object.return_value = {"ETag": "mock-etag"}
+
+    event = {
+        "Records": [
+            {
+                "s3": {
+                    "bucket": {"name": "landing"},
+                    "object": {"key": "uploads/orders.jsonl"},
+                }
+            }
+        ]
+    }
+    response = lambda_handler(event, MockContext())
+
+    assert response["statusCode"] == 200
+    files = json.loads(response["body"])["files"]
+    assert files[0]["record_count"] == 24
+    assert files[0]["invalid_count"] == 1
+    assert len(files[0]["parts"]) == 3
+    assert mock_s3.put_object.call_count == 3
+    keys = [call.kwargs["Key"] for call in mock_s3.put_object.call_args_list]
+    assert keys[0].endswith("_part00000.parquet")
+    assert keys[2].endswith("_part00002.parquet")
+    print("✓ JSON-lines object written as 3 bronze parts")
+    print()
+
+
+class CountingBody(BytesIO):
+    """File-like S3 body recording the largest single read"""
+
+    largest_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.largest_read = max(self.largest_read, len(data))
+        return data
+
+
+def test_streaming_reads_bounded_blocks():
+    """Test lines are split across blocks and chunks don't need the whole body"""
+    print("Testing bounded-memory streaming...")
+
+    body = CountingBody(b'{"a": 1}\n\n{"a": 22}\n{"a": 333}')
+    lines = list(iter_lines(body, block_size=4))
+    assert lines == [b'{"a": 1}', b"", b'{"a": 22}', b'{"a": 333}']
+    assert body.largest_read == 4
+
+    # 3 MB of JSON lines: the first chunk is ready after one block
+    line = json.dumps({"order_id": "ORD-000", "note": "x" * 90}).encode() + b"\n"
+    total = 3 * STREAM_BLOCK_BYTES // len(line)
+    body = CountingBody(line * total)
+    chunks = iter_record_chunks(body, "uploads/orders.jsonl", 100)
+    assert len(next(chunks)) == 100
+    assert body.tell() <= STREAM_BLOCK_BYTES
+    assert 100 + sum(len(chunk) for chunk in chunks) == total
+    assert body.largest_read <= STREAM_BLOCK_BYTES
+
+    csv = "order_id,total_amount\n" + "".join(f"ORD-{i},{i}.5\n" for i in range(25))
+    chunks = list(iter_record_chunks(BytesIO(csv.encode()), "orders.csv", 10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert chunks[2][-1] == {"order_id": "ORD-24", "total_amount": 24.5}
+    print("✓ Blocks of at most STREAM_BLOCK_BYTES, chunks yielded as read")
+    print()
+
+
+@patch("lambda_function.S3_MAX_CONCURRENCY", 3)
+@patch("lambda_function.s3_client")
+def test_s3_event_concurrent_objects(mock_s3):
+    """Test many objects are processed concurrently with per-object errors"""
+    print("Testing concurrent S3 object processing...")
+
+    def get_object(Bucket, Key):
+        if Key == "uploads/broken_orders.jsonl":
+            raise IOError("simulated download failure")
+        record = {
+            "order_id": Key,
+            "customer_id": "CUST-001",
+            "product_id": "PROD-001",
+            "total_amount": 10.0,
+            "quantity": 1,
+        }
+        return {"Body": BytesIO(json.dumps(record).encode("utf-8"))}
+
+    mock_s3.get_object.side_effect = get_object
+    mock_s3.put_object.return_value = {"ETag": "mock-etag"}
+
+    keys = [f"uploads/orders_{i}.jsonl" for i in range(5)]
+    keys.insert(2, "uploads/broken_orders.jsonl")
+    event = {
+        "Records": [
+            {"s3": {"bucket": {"name": "landing"}, "object": {"key": key}}}
+            for key in keys
+        ]
+    }
+    response = lambda_handler(event, MockContext())
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 500
+    assert [f["source_file"] for f in body["files"]] == [
+        f"s3://landing/{key}" for key in keys if "broken" not in key
+    ]
+    assert (
+        body["errors"][0]["source_file"] == "s3://landing/uploads/broken_orders.jsonl"
+    )
+    assert mock_s3.put_object.call_count == 5
+    written = {call.kwargs["Key"] for call in mock_s3.put_object.call_args_list}
+    assert len(written) == 5
+    print("✓ 5 objects written, 1 failure reported per object")
+    print()
+
+
+@patch("lambda_function.S3_MAX_CONCURRENCY", 3)
+@patch("lambda_function.s3_client")
+def test_s3_event_concurrency_is_bounded(mock_s3):
+    """Test downloads overlap up to S3_MAX_CONCURRENCY and results keep order"""
+    print("Testing bounded S3 concurrency...")
+
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def get_object(Bucket, Key):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        record = {
+            "order_id": Key,
+            "customer_id": "CUST-001",
+            "product_id": "PROD-001",
+            "total_amount": 10.0,
+            "quantity": 1,
+        }
+        return {"Body": BytesIO(json.dumps(record).encode("utf-8"))}
+
+    mock_s3.get_object.side_effect = get_object
+    mock_s3.put_object.return_value = {"ETag": "mock-etag"}
+
+    keys = [f"uploads/orders_{i}.jsonl" for i in range(9)]
+    event = {
+        "Records": [
+            {"s3": {"bucket": {"name": "landing"}, "object": {"key": key}}}
+            for key in keys
+        ]
+    }
+    started = time.perf_counter()
+    response = lambda_handler(event, MockContext())
+    elapsed = time.perf_counter() - started
+
+    assert response["statusCode"] == 200
+    files = json.loads(response["body"])["files"]
+    assert [f["source_file"] for f in files] == [f"s3://landing/{k}" for k in keys]
+    assert peak[0] == 3
+    # 9 downloads of 50 ms in 3 waves, not one after another
+    assert elapsed < 9 * 0.05
+    print("✓ At most 3 objects in flight, wall time ~3 downloads")
+    print()
+
+
+@patch("lambda_function.S3_MAX_CONCURRENCY", 4)
+@patch("lambda_function.s3_client")
+def test_s3_event_concurrent_objects_with_catalog(mock_s3):
+    """Test worker threads record their objects in the partition catalog"""
+    print("Testing concurrent S3 processing with the catalog enabled...")
+
+    def get_object(Bucket, Key):
+        record = {
+            "order_id": Key,
+            "customer_id": "CUST-001",
+            "product_id": "PROD-001",
+            "total_amount": 10.0,
+            "quantity": 1,
+        }
+        return {"Body": BytesIO(json.dumps(record).encode("utf-8"))}
+
+    mock_s3.get_object.side_effect = get_object
+    mock_s3.put_object.return_value = {"ETag": "mock-etag"}
+
+    keys = [f"uploads/orders_{i}.jsonl" for i in range(8)]
+    event = {
+        "Records": [
+            {"s3": {"bucket": {"name": "landing"}, "object": {"key": key}}}
+            for key in keys
+        ]
+    }
+    with tempfile.TemporaryDirectory() as catalog_dir:
+        catalog = PartitionCatalog(os.path.join(catalog_dir, "catalog.db"))
+        with patch("lambda_function._catalog", catalog):
+            response = lambda_handler(event, MockContext())
+        assert response["statusCode"] == 200, response["body"]
+        recorded = catalog.files("bronze", "orders")
+        written = {call.kwargs["Key"] for call in mock_s3.put_object.call_args_list}
+        assert {entry["key"] for entry in recorded} == written
+        assert len(written) == 8
+        catalog.close()
+    print("✓ 8 objects written by 4 threads, all recorded in the catalog")
+    print()
+
+
+@patch("lambda_function.s3_client")
+def test_api_compressed_and_ndjson_bodies(mock_s3):
+    """Test gzip/base64 JSON and NDJSON API bodies (S3 mocked)"""
+    print("Testing compressed and NDJSON API bodies...")
+
+    mock_s3.put_object.return_value = {"ETag": "mock-etag"}
+    records = [
+        {
+            "order_id": f"ORD-{i:03d}",
+            "customer_id": "CUST-001",
+            "product_id": "PROD-001",
+            "total_amount": 10.0,
+            "quantity": 1,
+        }
+        for i in range(3)
+    ]
+
+    # gzip + base64, as API Gateway delivers binary bodies
+    compressed = gzip.compress(
+        json.dumps({"data_type": "order", "records": records}).encode("utf-8")
+    )
+    event = {
+        "body": base64.b64encode(compressed).decode("ascii"),
+        "isBase64Encoded": True,
+        "headers": {"Content-Encoding": "gzip"},
+    }
+    response = lambda_handler(event, MockContext())
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["valid_records"] == 3
+
+    # Gzipped NDJSON, data type from the query string
+    ndjson = "\n".join(json.dumps(r) for r in records) + "\n"
+    event = {
+        "body": base64.b64encode(gzip.compress(ndjson.encode("utf-8"))).decode(),
+        "isBase64Encoded": True,
+        "headers": {"content-type": "application/x-ndjson"},
+        "queryStringParameters": {"data_type": "order"},
+    }
+    response = lambda_handler(event, MockContext())
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["valid_records"] == 3
+
+    # Corrupt compressed body
+    event = {
+        "body": base64.b64encode(b"\x1f\x8bnot-gzip").decode(),
+        "isBase64Encoded": True,
+    }
+    response = lambda_handler(event, MockContext())
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"])["error"] == "Invalid body encoding"
+    print("✓ gzip, base64 and NDJSON bodies accepted; corrupt body rejected")
+    print()
+
+
+@patch("request_decoding.MAX_DECODED_BYTES", 4096)
+@patch("lambda_function.STREAM_CHUNK_ROWS", 2)
+@patch("lambda_function.s3_client")
+def test_api_bodies_are_bounded_and_streamed(mock_s3):
+    """Test oversized bodies get a 413 and NDJSON is written in batches"""
+    print("Testing bounded and streamed API bodies...")
+
+    mock_s3.put_object.return_value = {"ETag": "mock-etag"}
+    records = [
+        {
+            "order_id": f"ORD-{i:03d}",
+            "customer_id": "CUST-001",
+            "product_id": "PROD-001",
+            "total_amount": 10.0,
+            "quantity": 1,
+        }
+        for i in range(5)
+    ]
+    ndjson = ("\n".join(json.dumps(r) for r in records) + "\n").encode("utf-8")
+    event = {
+        "body": base64.b64encode(gzip.compress(ndjson)).decode(),
+        "isBase64Encoded": True,
+        "headers": {"content-type": "application/x-ndjson"},
+        "queryStringParameters": {"data_type": "order"},
+    }
+    response = lambda_handler(event, MockContext())
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert body["valid_records"] == 5 and len(body["parts"]) == 3
+    assert mock_s3.put_object.call_count == 3
+
+    # A small gzip body that expands past the limit
+    bomb = gzip.compress(b"\n" * 1_000_000)
+    assert len(bomb) < 4096
+    event["body"] = base64.b64encode(bomb).decode()
+    response = lambda_handler(event, MockContext())
+    assert response["statusCode"] == 413
+    assert json.loads(response["body"])["error"] == "Body too large"
+    print("✓ NDJSON written 2 records at a time; expanding body rejected")
+    print()
+
+
+@patch("lambda_function.DEDUP_SNAPSHOT_SECONDS", 0)
+@patch("lambda_function.DEDUP_ENABLED", True)
+@patch("lambda_function._idempotency_store", None)
+@patch("lambda_function._seen_indexes", {})
+@patch("lambda_function.s3_client")
+def test_idempotent_and_duplicate_suppression(mock_s3):
+    """Test idempotency keys and the seen-ID index (S3 mocked in memory)"""
+    from botocore.exceptions import ClientError
+
+    print("Testing ingestion-time deduplication...")
+
+    objects = {}
+
+    def get_object(Bucket, Key):
+        if Key not in objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": BytesIO(objects[Key])}
+
+    def put_object(Bucket, Key, Body, **kwargs):
+        objects[Key] = Body
+        return {"ETag": "mock-etag"}
+
+    mock_s3.get_object.side_effect = get_object
+    mock_s3.put_object.side_effect = put_object
+
+    def api_event(order_ids, idempotency_key):
+        records = [
+            {
+                "order_id": order_id,
+                "customer_id": "CUST-001",
+                "product_id": "PROD-001",
+                "total_amount": 10.0,
+                "quantity": 1,
+            }
+            for order_id in order_ids
+        ]
+        return {
+            "body": json.dumps({"data_type": "order", "records": records}),
+            "headers": {"Idempotency-Key": idempotency_key},
+        }
+
+    first = lambda_handler(api_event(["O-1", "O-2", "O-2"], "req-1"), MockContext())
+    assert json.loads(first["body"])["duplicate_records"] == 1
+    bronze_files = [k for k in objects if k.startswith("orders/")]
+    assert len(bronze_files) == 1
+
+    # Client retry with the same key replays the original response
+    retry = lambda_handler(api_event(["O-1", "O-2", "O-2"], "req-1"), MockContext())
+    assert retry == first
+    assert len([k for k in objects if k.startswith("orders/")]) == 1
+
+    # New request overlapping an already-ingested ID
+    second = lambda_handler(api_event(["O-2", "O-3"], "req-2"), MockContext())
+    assert json.loads(second["body"])["duplicate_records"] == 1
+    assert "_dedup_index/order.bloom" in objects
+    print("✓ Retries replayed, duplicate IDs never written twice")
+    print()
+
+
+@patch("lambda_function.S3_MAX_CONCURRENCY", 4)
+@patch("lambda_function.DEDUP_SNAPSHOT_SECONDS", 0)
+@patch("lambda_function.DEDUP_ENABLED", True)
+@patch("lambda_function._seen_indexes", {})
+@patch("lambda_function.s3_client")
+def test_concurrent_objects_never_write_an_id_twice(mock_s3):
+    """Test worker threads reserve IDs between the seen check and the write"""
+    from botocore.exceptions import ClientError
+
+    print("Testing deduplication across worker threads...")
+
+    lines = "\n".join(
+        json.dumps(
+            {
+                "order_id": f"ORD-{i:04d}",
+                "customer_id": "CUST-001",
+                "product_id": "PROD-001",
+                "total_amount": 10.0,
+                "quantity": 1,
+            }
+        )
+        for i in range(2000)
+    ).encode("utf-8")
+    # Every worker checks its IDs before any of them has written
+    barrier = threading.Barrier(4, timeout=10)
+    written = []
+    objects = {}
+
+    def get_object(Bucket, Key):
+        if Key.startswith("uploads/"):
+            barrier.wait()
+            return {"Body": BytesIO(lines)}
+        if Key not in objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": BytesIO(objects[Key])}
+
+    def put_object(Bucket, Key, Body, **kwargs):
+        objects[Key] = Body
+        if Key.startswith("orders/"):
+            written.append(int(kwargs["Metadata"]["record_count"]))
+        return {"ETag": "mock-etag"}
+
+    mock_s3.get_object.side_effect = get_object
+    mock_s3.put_object.side_effect = put_object
+
+    keys = [f"uploads/orders_{i}.jsonl" for i in range(8)]
+    event = {
+        "Records": [
+            {"s3": {"bucket": {"name": "landing"}, "object": {"key": key}}}
+            for key in keys
+        ]
+    }
+    response = lambda_handler(event, MockContext())
+
+    assert response["statusCode"] == 200, response["body"]
+    assert sum(written) == 2000
+    files = json.loads(response["body"])["files"]
+    assert sum(f["duplicate_count"] for f in files) == 7 * 2000
+    print("✓ 8 copies of 2,000 orders on 4 threads wrote 2,000 rows")
+    print()
+
+
+@patch("lambda_function.DEDUP_ENABLED", True)
+@patch("lambda_function._seen_indexes", {})
+@patch("lambda_function.s3_client")
+def test_order_updates_are_not_duplicates(mock_s3):
+    """Test a changed order (same order_id) is kept; a re-delivery is not"""
+    print("Testing deduplication of order versions...")
+
+    mock_s3.put_object.return_value = {"ETag": "mock-etag"}
+
+    def invoke(status):
+        record = {
+            "order_id": "ORD-001",
+            "customer_id": "CUST-001",
+            "product_id": "PROD-001",
+            "total_amount": 10.0,
+            "quantity": 1,
+            "status": status,
+        }
+        response = lambda_handler(
+            {"data_type": "order", "records": [record]}, MockContext()
+        )
+        return json.loads(response["body"])["duplicate_records"]
+
+    with patch("lambda_function.read_bronze_object", return_value=None):
+        assert invoke("pending") == 0
+        assert invoke("shipped") == 0
+        assert invoke("shipped") == 1
+    print("✓ Status change ingested, exact re-delivery dropped")
+    print()
+
+
+@patch("lambda_function.s3_client")
+def test_spool_batches_api_calls(mock_s3):
+    """Test API batches are spooled and flushed as one object (S3 mocked)"""
+    print("Testing ingestion spool...")
+
+    mock_s3.put_object.return_value = {"ETag": "mock-etag"}
+
+    def api_event(start):
+        records = [
+            {
+                "order_id": f"ORD-{i:03d}",
+                "customer_id": "CUST-001",
+                "product_id": "PROD-001",
+                "total_amount": 10.0,
+                "quantity": 1,
+            }
+            for i in range(start, start + 3)
+        ]
+        return {"body": json.dumps({"data_type": "order", "records": records})}
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        with patch("lambda_function._spool", IngestionSpool(spool_dir, max_rows=5)):
+            response = lambda_handler(api_event(0), MockContext())
+        assert response["statusCode"] == 200
+        assert json.loads(response["body"])["s3_location"] is None
+        assert not mock_s3.put_object.called
+
+        # A fresh spool over the same directory simulates a recycled container
+        with patch("lambda_function._spool", IngestionSpool(spool_dir, max_rows=5)):
+            response = lambda_handler(api_event(3), MockContext())
+        assert json.loads(response["body"])["s3_location"].startswith("s3://")
+        assert mock_s3.put_object.call_count == 1
+        metadata = mock_s3.put_object.call_args.kwargs["Metadata"]
+        assert metadata["record_count"] == "6"
+        assert os.listdir(spool_dir) == [".lock"]
+
+    print("✓ Two API calls flushed as one 6-record bronze object")
+    print()
+
+
 if __name__ == "__main__":
     print("=" * 60)
     print("Lambda Function Local Tests (No AWS Calls)")
@@ -192,9 +775,22 @@ if __name__ == "__main__":
 
     try:
         test_validation()
+        test_validation_error_messages()
         test_enrichment()
+        test_enrichment_counts_unparsed_dates()
         test_different_data_types()
         test_full_lambda_handler()
+        test_s3_event_streams_in_chunks()
+        test_streaming_reads_bounded_blocks()
+        test_s3_event_concurrent_objects()
+        test_s3_event_concurrency_is_bounded()
+        test_s3_event_concurrent_objects_with_catalog()
+        test_api_compressed_and_ndjson_bodies()
+        test_api_bodies_are_bounded_and_streamed()
+        test_idempotent_and_duplicate_suppression()
+        test_concurrent_objects_never_write_an_id_twice()
+        test_order_updates_are_not_duplicates()
+        test_spool_batches_api_calls()
 
         print("=" * 60)
         print("✅ ALL TESTS PASSED!")
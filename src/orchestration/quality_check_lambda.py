@@ -3,14 +3,19 @@
 Data quality validation Lambda
 """
 import os
+import sys
 
-import boto3
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+)
+
+from object_store import open_store  # noqa: E402
 
 
 def lambda_handler(event, context):
     """Run data quality checks on gold layer"""
 
-    s3 = boto3.client("s3")
+    store = open_store()
     gold_bucket = os.getenv("GOLD_BUCKET")
 
     checks = {
@@ -21,7 +26,7 @@ def lambda_handler(event, context):
 
     results = []
     for table, check_func in checks.items():
-        result = check_func(s3, gold_bucket, table)
+        result = check_func(store, gold_bucket, table)
         results.append(result)
 
     # If any check fails, raise exception
@@ -31,7 +36,7 @@ def lambda_handler(event, context):
     return {"statusCode": 200, "checks": results}
 
 
-def check_daily_sales(s3, bucket, table):
+def check_daily_sales(store, bucket, table):
     """Validate daily sales data"""
     # Download latest file
     # Check: no null values in revenue
@@ -40,14 +45,14 @@ def check_daily_sales(s3, bucket, table):
     return {"table": table, "passed": True, "rows": 100}
 
 
-def check_customer_ltv(s3, bucket, table):
+def check_customer_ltv(store, bucket, table):
     """Validate customer lifetime value data"""
     # Check: no null customer IDs
     # Check: LTV values are positive
     return {"table": table, "passed": True, "rows": 100}
 
 
-def check_products(s3, bucket, table):
+def check_products(store, bucket, table):
     """Validate product performance data"""
     # Check: no null product IDs
     # Check: revenue values are non-negative
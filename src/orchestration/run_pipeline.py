@@ -106,6 +106,15 @@ def run_local_pipeline():
         print("✅ Silver → Gold complete")
         print()
 
+        # Step 3: Merge small bronze/silver files
+        print("Step 3: Small-file compaction")
+        print("-" * 60)
+        from compact_partitions import main as compact_partitions
+
+        compact_partitions()
+        print("✅ Compaction complete")
+        print()
+
         print("=" * 60)
         print("✅ Pipeline completed successfully!")
         print("=" * 60)
@@ -0,0 +1,71 @@
+"""
+Arrow compute versions of the silver string and timestamp cleaning steps
+
+Each function takes a pandas Series and returns a Series backed by an Arrow
+array (``pd.ArrowDtype``), so the data never goes through Python objects:
+- ``lower_strip``: ``.str.lower().str.strip()``
+- ``digits_only``: ``.astype(str).str.replace(r"[^0-9]", "", regex=True)``
+- ``timestamp_parts``: ``.dt.date``, ``.dt.hour`` and ``.dt.dayofweek`` as
+  ``date32`` and integer columns
+
+Values are the ones the pandas expressions produce, so the conformed silver
+table is identical. Inputs the kernels don't handle the same way (object
+columns holding non-strings, time zone aware timestamps) use the pandas
+expression instead.
+"""
+
+from typing import Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def _strings(values: pd.Series) -> Optional[pa.Array]:
+    """Arrow string array of the values, or None if they aren't all strings"""
+    try:
+        array = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    if pa.types.is_null(array.type):
+        return array.cast(pa.string())
+    return array if pa.types.is_string(array.type) else None
+
+
+def _series(array: pa.Array, like: pd.Series) -> pd.Series:
+    return pd.Series(
+        pd.arrays.ArrowExtensionArray(array), index=like.index, name=like.name
+    )
+
+
+def lower_strip(values: pd.Series) -> pd.Series:
+    """Lowercase and trim surrounding whitespace; nulls stay null"""
+    array = _strings(values)
+    if array is None:
+        return values.str.lower().str.strip()
+    return _series(pc.utf8_trim_whitespace(pc.utf8_lower(array)), values)
+
+
+def digits_only(values: pd.Series) -> pd.Series:
+    """Keep only the digits 0-9; nulls become empty strings"""
+    array = _strings(values)
+    if array is None:
+        return values.astype(str).str.replace(r"[^0-9]", "", regex=True)
+    # pandas turns a null into "None"/"nan" first, neither has a digit
+    digits = pc.replace_substring_regex(array, pattern="[^0-9]", replacement="")
+    return _series(pc.fill_null(digits, ""), values)
+
+
+def timestamp_parts(
+    timestamps: pd.Series,
+) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """Date, hour and day of week (Monday=0) of a datetime64 Series"""
+    if not pd.api.types.is_datetime64_dtype(timestamps.dtype):
+        # Time zone aware: keep the local calendar pandas uses
+        return timestamps.dt.date, timestamps.dt.hour, timestamps.dt.dayofweek
+    array = pa.array(timestamps, from_pandas=True)
+    return (
+        _series(pc.cast(array, pa.date32()), timestamps),
+        _series(pc.hour(array), timestamps),
+        _series(pc.day_of_week(array), timestamps),
+    )
@@ -0,0 +1,106 @@
+"""
+Cleaning backend benchmark for bronze → silver
+
+Times transform_customers and transform_events on synthetic bronze data with
+CLEANING_BACKEND=pandas and =arrow, and checks both conform to the same
+silver table. No AWS calls are made.
+
+Usage:
+    python src/processing/benchmark_cleaning.py [--rows 1000000] [--runs 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import transform_bronze_to_silver  # noqa: E402
+from pipeline_logging import get_logger  # noqa: E402
+from schema_registry import conform_dataframe  # noqa: E402
+
+EVENT_TYPES = ["page_view", "product_view", "add_to_cart", "purchase", "unknown"]
+
+
+def make_customers(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    ids = rng.integers(0, rows, rows)
+    emails = pd.Series([f"  User{i}@Example.COM " for i in ids], dtype=object)
+    emails[rng.random(rows) < 0.05] = None
+    phones = pd.Series([f"+1 ({i % 1000:03d}) 555-{i % 10000:04d}" for i in ids])
+    phones[rng.random(rows) < 0.05] = None
+    return pd.DataFrame(
+        {
+            "customer_id": [f"CUST-{i:08d}" for i in range(rows)],
+            "email": emails,
+            "phone": phones,
+            "date_of_birth": pd.Timestamp("1950-01-01")
+            + pd.to_timedelta(rng.integers(0, 20000, rows), unit="D"),
+        }
+    )
+
+
+def make_events(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    timestamps = pd.Timestamp("2025-01-01") + pd.to_timedelta(
+        rng.integers(0, 90 * 86400 * 1000, rows), unit="ms"
+    )
+    return pd.DataFrame(
+        {
+            "event_id": [f"EVT-{i:09d}" for i in range(rows)],
+            "customer_id": np.where(rng.random(rows) < 0.3, None, "CUST-1"),
+            "session_id": "SESS-1",
+            "event_type": rng.choice(EVENT_TYPES, rows),
+            "event_timestamp": timestamps,
+        }
+    )
+
+
+def time_backend(backend, transform, df, runs):
+    transform_bronze_to_silver.CLEANING_BACKEND = backend
+    timings, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = transform(df.copy())
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cleaning backends")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    # Keep the per-call transform logging out of the timings
+    get_logger(transform_bronze_to_silver.__name__).disabled = True
+
+    rng = np.random.default_rng(0)
+    cases = [
+        ("customers", transform_bronze_to_silver.transform_customers, make_customers),
+        ("events", transform_bronze_to_silver.transform_events, make_events),
+    ]
+
+    print(f"{'dataset':<12}{'pandas (s)':>12}{'arrow (s)':>12}{'speedup':>10}")
+    for data_type, transform, make in cases:
+        df = make(args.rows, rng)
+        pandas_seconds, expected = time_backend("pandas", transform, df, args.runs)
+        arrow_seconds, actual = time_backend("arrow", transform, df, args.runs)
+
+        dataset = f"{data_type}_clean"
+        if not conform_dataframe(actual, "silver", dataset).equals(
+            conform_dataframe(expected, "silver", dataset)
+        ):
+            raise SystemExit(f"✗ {data_type}: backends produced different output")
+        print(
+            f"{data_type:<12}{pandas_seconds:>12.2f}{arrow_seconds:>12.2f}"
+            f"{pandas_seconds / arrow_seconds:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
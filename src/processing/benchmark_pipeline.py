@@ -0,0 +1,131 @@
+"""
+End-to-end pipeline throughput benchmark, without AWS
+
+Writes synthetic orders to bronze through the ingestion Lambda's writer,
+runs the incremental bronze → silver transform and the silver → gold
+aggregations, all against one local-directory (or in-memory) object store,
+and reports the time and rows/second of each stage.
+
+Bronze → silver holds the order keys of the whole input in memory (and the
+in-memory path every row), so large runs want --streaming; gold loads the
+order columns it aggregates. 100M rows needs a machine with tens of GB.
+
+Usage:
+    python src/processing/benchmark_pipeline.py [--rows 1000000] \\
+        [--rows-per-file 100000] [--store local:/tmp/lakehouse] [--streaming]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ingestion")
+)
+
+import lambda_function  # noqa: E402
+import transform_bronze_to_silver  # noqa: E402
+import transform_silver_to_gold  # noqa: E402
+from object_store import open_store  # noqa: E402
+from schema_registry import VOCABULARIES  # noqa: E402
+
+
+def make_orders(start: int, rows: int, rng: np.random.Generator) -> pa.Table:
+    """Bronze-shaped orders with IDs start..start+rows"""
+    order_dates = np.datetime64("2025-01-01") + rng.integers(
+        0, 90 * 86400, rows
+    ).astype("timedelta64[s]")
+    quantity = rng.integers(1, 5, rows, dtype=np.int32)
+    unit_price = np.round(rng.uniform(5, 500, rows), 2)
+    return pa.table(
+        {
+            "order_id": [f"ORD-{i:010d}" for i in range(start, start + rows)],
+            "customer_id": [f"CUST-{i:07d}" for i in rng.integers(0, 10**6, rows)],
+            "product_id": [f"PROD-{i:05d}" for i in rng.integers(0, 10**4, rows)],
+            "order_date": pa.array(order_dates, pa.timestamp("s")),
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total_amount": np.round(unit_price * quantity, 2),
+            "payment_method": rng.choice(VOCABULARIES["payment_method"], rows),
+            "status": rng.choice(VOCABULARIES["status"], rows),
+        }
+    )
+
+
+def use_store(url: str):
+    """Point every pipeline stage at one shared store"""
+    store = open_store(url)
+    lambda_function.OBJECT_STORE = url
+    lambda_function._store = store
+    transform_bronze_to_silver.store = store
+    transform_silver_to_gold.store = store
+    return store
+
+
+def timed(stage, rows, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    print(f"{stage:<16}{rows:>14,}{seconds:>12.2f}{rows / seconds:>16,.0f}")
+    return result
+
+
+def ingest(rows: int, rows_per_file: int) -> int:
+    rng = np.random.default_rng(0)
+    for number, start in enumerate(range(0, rows, rows_per_file)):
+        table = make_orders(start, min(rows_per_file, rows - start), rng)
+        lambda_function.write_to_s3(table, "order", batch_id=f"{number:06d}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--rows-per-file", type=int, default=100_000)
+    parser.add_argument(
+        "--store",
+        help="local:<directory> or memory (default: a temporary directory)",
+    )
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--no-dedup", action="store_true")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.store is None:
+        scratch = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+        args.store = f"local:{scratch}"
+    use_store(args.store)
+
+    transform_bronze_to_silver.STREAMING = args.streaming
+    transform_bronze_to_silver.CROSS_FILE_DEDUP = not args.no_dedup
+    # Keep the per-file logging out of the timings
+    logging.disable(logging.INFO)
+
+    print(f"{'stage':<16}{'rows':>14}{'seconds':>12}{'rows/second':>16}")
+    try:
+        timed("ingest", args.rows, ingest, args.rows, args.rows_per_file)
+        ok = timed(
+            "bronze → silver",
+            args.rows,
+            transform_bronze_to_silver.process_incremental,
+            "orders",
+        )
+        if not ok:
+            raise SystemExit("✗ bronze → silver failed")
+        timed("silver → gold", args.rows, transform_silver_to_gold.main)
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch)
+
+
+if __name__ == "__main__":
+    main()
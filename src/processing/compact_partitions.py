@@ -0,0 +1,519 @@
+"""
+Small-file compaction for bronze and silver partitions
+
+Ingestion writes one small Parquet object per batch, so partitions pile up
+files whose per-file overhead dominates scans. This job merges a
+partition's small files into ~COMPACTION_TARGET_MB files with large row
+groups, in write order (so "keep last" deduplication is unaffected).
+
+Each partition is swapped with a manifest in ``_manifests/compaction/``:
+1. a ``pending`` manifest lists the input files
+2. outputs are written as ``compacted-<run id>-NNNN.parquet`` under
+   ``_staging/compaction/``, outside every table location
+3. the manifest is rewritten as ``committed`` with the outputs (the commit)
+4. outputs are copied (server-side) into the partition
+5. the partition catalog swaps inputs for outputs in one transaction
+6. inputs are deleted in one request, then the staged outputs and manifest
+A run that dies before step 3 is rolled back (staged outputs deleted) by the
+next one; after it, rolled forward (steps 4-6 finished).
+
+S3 cannot swap objects atomically, so between steps 4 and 6 a partition
+holds both the inputs and the outputs. Staging keeps that window to a few
+copy and delete requests instead of the whole merge, but Athena and Glue,
+which list S3 directly, count the partition's rows twice if they query it
+then. A ``committed`` manifest under ``_manifests/compaction/`` marks such a
+partition; schedule compaction outside Athena query windows, or have the
+querying job wait while one exists (``swaps_in_progress``).
+
+Pipeline readers go through the catalog or the manifests, and only files
+they are done with are compacted, so none sees a file disappear or its
+rows twice:
+- bronze: files the incremental bronze → silver run has consumed; readers
+  skip compacted objects once they have a watermark
+- silver: files older than the latest run (read_latest reads it) and, once
+  incremental gold has state, orders files its watermark has passed
+- neither: files modified in the last COMPACTION_MIN_AGE_MINUTES
+
+Usage:
+    python src/processing/compact_partitions.py [--layer bronze] \\
+        [--dataset orders] [--target-mb 128] [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+)
+
+from object_store import ObjectNotFound, open_store  # noqa: E402
+from partition_catalog import COMPACTED_PREFIX, is_compacted, open_catalog  # noqa: E402
+from pipeline_logging import get_logger, log_summary  # noqa: E402
+from schema_registry import conform_table  # noqa: E402
+from streaming import ParquetStreamWriter, open_parquet  # noqa: E402
+from watermark import WatermarkManifest  # noqa: E402
+
+logger = get_logger(__name__)
+
+# Object storage (S3 unless OBJECT_STORE selects a local or in-memory backend)
+store = open_store()
+
+# Environment variables
+BRONZE_BUCKET = os.getenv("BRONZE_BUCKET", "ecommerce-analytics-dev-bronze")
+SILVER_BUCKET = os.getenv("SILVER_BUCKET", "ecommerce-analytics-dev-silver")
+GOLD_BUCKET = os.getenv("GOLD_BUCKET", "ecommerce-analytics-dev-gold")
+
+# Partition catalog (None unless CATALOG_PATH is set: fall back to listings);
+# claims the buckets it indexes so a second catalog fails loudly
+catalog = open_catalog(store=store, buckets=[BRONZE_BUCKET, SILVER_BUCKET])
+
+TARGET_MB = float(os.getenv("COMPACTION_TARGET_MB", "128"))
+ROW_GROUP_ROWS = int(os.getenv("COMPACTION_ROW_GROUP_ROWS", "1000000"))
+MIN_FILES = int(os.getenv("COMPACTION_MIN_FILES", "2"))
+MIN_AGE_MINUTES = float(os.getenv("COMPACTION_MIN_AGE_MINUTES", "60"))
+COMPACTION_MANIFEST_PREFIX = os.getenv(
+    "COMPACTION_MANIFEST_PREFIX", "_manifests/compaction/"
+)
+COMPACTION_STAGING_PREFIX = os.getenv(
+    "COMPACTION_STAGING_PREFIX", "_staging/compaction/"
+)
+
+# Bronze → silver watermarks (see transform_bronze_to_silver.py)
+MANIFEST_PREFIX = os.getenv("MANIFEST_PREFIX", "_manifests/bronze_to_silver/")
+WATERMARK_GRACE_SECONDS = float(os.getenv("WATERMARK_GRACE_SECONDS", "3600"))
+
+# Incremental silver → gold state (see transform_silver_to_gold.py) and the
+# silver dataset it reads
+GOLD_STATE_PREFIX = os.getenv("GOLD_STATE_PREFIX", "_state/")
+GOLD_STATE_DATASET = "orders_clean"
+
+DATA_TYPES = ["customers", "products", "orders", "events"]
+LAYERS = {
+    "bronze": (BRONZE_BUCKET, DATA_TYPES),
+    "silver": (SILVER_BUCKET, [f"{data_type}_clean" for data_type in DATA_TYPES]),
+}
+
+
+def list_objects(bucket, prefix):
+    """All objects under a prefix"""
+    return list(store.list(bucket, prefix))
+
+
+def dataset_objects(layer, bucket, dataset):
+    """Parquet objects of a dataset, from the catalog when there is one"""
+    if catalog is not None:
+        objects = catalog.files(layer, dataset)
+    else:
+        objects = list_objects(bucket, f"{dataset}/")
+    return [obj for obj in objects if obj["Key"].endswith(".parquet")]
+
+
+def consumed_filter(layer, dataset, objects):
+    """Predicate for objects every reader of the layer is done with"""
+    if layer == "bronze":
+        manifest = load_watermark(dataset)
+        if manifest.watermark is None:
+            logger.info("%s has not been processed incrementally yet", dataset)
+            return lambda obj: False
+        return lambda obj: not manifest.is_new(obj)
+
+    # Silver: the latest run's files, named alike, are left for readers of
+    # the latest run (read_latest), and incremental gold reads the orders
+    # files past its watermark
+    gold = load_gold_watermark() if dataset == GOLD_STATE_DATASET else None
+    if gold is not None and gold.watermark is None:
+        logger.info("%s has not been merged into gold state yet", dataset)
+        return lambda obj: False
+    merged = (lambda obj: not gold.is_new(obj)) if gold else (lambda obj: True)
+
+    runs = [obj for obj in objects if not is_compacted(obj["Key"])]
+    if not runs:
+        return merged
+    latest = max(runs, key=lambda obj: (obj["LastModified"], obj["Key"]))
+    latest_name = latest["Key"].rsplit("/", 1)[-1]
+    return lambda obj: obj["Key"].rsplit("/", 1)[-1] != latest_name and merged(obj)
+
+
+def load_watermark(data_type):
+    """The bronze → silver watermark manifest of a data type"""
+    try:
+        data = store.get(SILVER_BUCKET, f"{MANIFEST_PREFIX}{data_type}.json")
+    except ObjectNotFound:
+        return WatermarkManifest(grace_seconds=WATERMARK_GRACE_SECONDS)
+    return WatermarkManifest.from_json(data, grace_seconds=WATERMARK_GRACE_SECONDS)
+
+
+def load_gold_watermark():
+    """
+    The silver watermark of the incremental gold state, or None when gold
+    has no state (it only runs in full mode)
+    """
+    try:
+        data = store.get(GOLD_BUCKET, f"{GOLD_STATE_PREFIX}manifest.json")
+    except ObjectNotFound:
+        return None
+    watermark = json.loads(data).get("watermark")
+    if not watermark:
+        return WatermarkManifest(grace_seconds=WATERMARK_GRACE_SECONDS)
+    return WatermarkManifest.from_json(
+        json.dumps(watermark), grace_seconds=WATERMARK_GRACE_SECONDS
+    )
+
+
+def plan_partitions(layer, bucket, dataset, target_bytes, now=None):
+    """
+    Small files to merge, grouped by partition directory
+
+    Returns:
+        dict of partition directory -> objects (oldest first); partitions
+        with fewer than MIN_FILES eligible files are left alone
+    """
+    now = now or datetime.now(timezone.utc)
+    objects = dataset_objects(layer, bucket, dataset)
+    consumed = consumed_filter(layer, dataset, objects)
+    settled = now - timedelta(minutes=MIN_AGE_MINUTES)
+
+    partitions = defaultdict(list)
+    for obj in objects:
+        small = (obj.get("Size") or 0) < target_bytes / 2
+        if small and obj["LastModified"] <= settled and consumed(obj):
+            partitions[obj["Key"].rsplit("/", 1)[0]].append(obj)
+
+    return {
+        partition: sorted(files, key=lambda obj: (obj["LastModified"], obj["Key"]))
+        for partition, files in sorted(partitions.items())
+        if len(files) >= MIN_FILES
+    }
+
+
+def manifest_key_for(partition, run_id):
+    return f"{COMPACTION_MANIFEST_PREFIX}{partition}/{run_id}.json"
+
+
+def put_manifest(bucket, manifest):
+    store.put(
+        bucket,
+        manifest_key_for(manifest["partition"], manifest["run_id"]),
+        json.dumps(manifest, indent=2).encode("utf-8"),
+        content_type="application/json",
+    )
+
+
+def output_schema(layer, dataset, parquet_files):
+    """
+    Schema of the merged file: every input's (conformed) columns
+
+    Returns None when inputs disagree on a column's type in a way Arrow
+    cannot promote.
+    """
+    schemas = []
+    for parquet_file in parquet_files:
+        schema = parquet_file.schema_arrow
+        empty = conform_table(schema.empty_table(), layer, dataset, fill_missing=False)
+        schemas.append(empty.schema.remove_metadata())
+    try:
+        return pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        logger.warning("Cannot merge schemas: %s", e)
+        return None
+
+
+def read_input(layer, dataset, bucket, key):
+    table = pq.read_table(BytesIO(store.get(bucket, key)))
+    return conform_table(table, layer, dataset, fill_missing=False)
+
+
+class OutputFiles:
+    """Rolls merged rows over ~target-sized compacted files"""
+
+    def __init__(self, bucket, partition, run_id, schema, rows_per_file):
+        self.bucket = bucket
+        self.partition = partition
+        self.run_id = run_id
+        self.schema = schema
+        self.rows_per_file = rows_per_file
+        self.outputs = []
+        self.writer = None
+
+    def write(self, table):
+        if self.writer is None:
+            self.writer = ParquetStreamWriter(schema=self.schema)
+        self.writer.write(table.unify_dictionaries())
+        if self.writer.num_rows >= self.rows_per_file:
+            self.flush()
+
+    def flush(self):
+        if self.writer is None:
+            return
+        with self.writer:
+            size = self.writer.finish()
+            name = f"{COMPACTED_PREFIX}{self.run_id}-{len(self.outputs):04d}.parquet"
+            key = f"{self.partition}/{name}"
+            # Staged outside the table until the compaction commits
+            staged_key = f"{COMPACTION_STAGING_PREFIX}{key}"
+            store.upload_file(self.writer.file, self.bucket, staged_key)
+            self.outputs.append(
+                {
+                    "key": key,
+                    "staged_key": staged_key,
+                    "size_bytes": size,
+                    "row_count": self.writer.num_rows,
+                    "stats": self.writer.stats,
+                }
+            )
+        self.writer = None
+
+
+def write_outputs(layer, dataset, bucket, partition, run_id, inputs, target_bytes):
+    """Merge the inputs in order into compacted files; returns their entries"""
+    keys = [obj["Key"] for obj in inputs]
+    # Footers only: schemas and row counts
+    footers = [open_parquet(store, bucket, key) for key in keys]
+    schema = output_schema(layer, dataset, footers)
+    if schema is None:
+        return None
+
+    total_rows = sum(parquet_file.metadata.num_rows for parquet_file in footers)
+    total_bytes = sum(obj.get("Size") or 0 for obj in inputs)
+    bytes_per_row = max(total_bytes / max(total_rows, 1), 1)
+    files = OutputFiles(
+        bucket, partition, run_id, schema, max(int(target_bytes / bytes_per_row), 1)
+    )
+
+    pending, pending_rows = [], 0
+    for key in keys:
+        table = read_input(layer, dataset, bucket, key)
+        pending.append(table)
+        pending_rows += table.num_rows
+        # One large row group per write
+        if pending_rows >= ROW_GROUP_ROWS:
+            files.write(pa.concat_tables(pending, promote_options="permissive"))
+            pending, pending_rows = [], 0
+    if pending:
+        files.write(pa.concat_tables(pending, promote_options="permissive"))
+    files.flush()
+    return files.outputs
+
+
+def compact_partition(layer, dataset, bucket, partition, inputs, target_bytes):
+    """
+    Replace a partition's small files with compacted ones
+
+    Returns:
+        number of output files (0 if the partition was skipped)
+    """
+    run_id = f"{datetime.now(timezone.utc):%Y%m%d_%H%M%S}-{uuid.uuid4().hex[:8]}"
+    manifest = {
+        "version": 1,
+        "state": "pending",
+        "run_id": run_id,
+        "layer": layer,
+        "dataset": dataset,
+        "partition": partition,
+        "inputs": [obj["Key"] for obj in inputs],
+        # Rows of the outputs are as old as the newest input
+        "data_time": max(obj["LastModified"] for obj in inputs).isoformat(),
+        "outputs": [],
+    }
+    put_manifest(bucket, manifest)
+
+    outputs = write_outputs(
+        layer, dataset, bucket, partition, run_id, inputs, target_bytes
+    )
+    if outputs is None:
+        rollback(bucket, manifest)
+        return 0
+
+    manifest["state"] = "committed"
+    manifest["outputs"] = [
+        {key: value for key, value in output.items() if key != "stats"}
+        for output in outputs
+    ]
+    put_manifest(bucket, manifest)
+
+    finish(bucket, manifest, {output["key"]: output["stats"] for output in outputs})
+    logger.info(
+        "Compacted %d files into %d in s3://%s/%s",
+        len(inputs),
+        len(outputs),
+        bucket,
+        partition,
+    )
+    return len(outputs)
+
+
+def publish(bucket, manifest):
+    """Copy a committed compaction's staged outputs into the partition"""
+    for output in manifest["outputs"]:
+        staged_key = output.get("staged_key")
+        if staged_key is None:
+            continue
+        try:
+            store.copy(bucket, staged_key, output["key"])
+        except ObjectNotFound:
+            # Published and cleaned up by an interrupted finish
+            store.size(bucket, output["key"])
+
+
+def swaps_in_progress(bucket):
+    """Partitions holding both compaction inputs and outputs right now"""
+    partitions = []
+    for obj in list_objects(bucket, COMPACTION_MANIFEST_PREFIX):
+        manifest = json.loads(store.get(bucket, obj["Key"]))
+        if manifest["state"] == "committed":
+            partitions.append(manifest["partition"])
+    return partitions
+
+
+def finish(bucket, manifest, stats=None):
+    """
+    Steps after the commit: publish the outputs, catalog swap, delete the
+    inputs, then the staged outputs and the manifest
+    """
+    publish(bucket, manifest)
+    if catalog is not None:
+        written_at = datetime.fromisoformat(manifest["data_time"])
+        catalog.replace(
+            manifest["layer"],
+            manifest["inputs"],
+            [
+                {
+                    "dataset": manifest["dataset"],
+                    "bucket": bucket,
+                    "key": output["key"],
+                    "size_bytes": output["size_bytes"],
+                    "row_count": output["row_count"],
+                    "stats": (stats or {}).get(output["key"]),
+                    "written_at": written_at,
+                }
+                for output in manifest["outputs"]
+            ],
+        )
+    store.delete(bucket, manifest["inputs"])
+    store.delete(
+        bucket,
+        [
+            output["staged_key"]
+            for output in manifest["outputs"]
+            if "staged_key" in output
+        ]
+        + [manifest_key_for(manifest["partition"], manifest["run_id"])],
+    )
+
+
+def rollback(bucket, manifest):
+    """Undo an uncommitted compaction: delete its outputs and manifest"""
+    prefix = f"{manifest['partition']}/{COMPACTED_PREFIX}{manifest['run_id']}-"
+    outputs = [
+        obj["Key"]
+        for output_prefix in (f"{COMPACTION_STAGING_PREFIX}{prefix}", prefix)
+        for obj in list_objects(bucket, output_prefix)
+    ]
+    store.delete(
+        bucket, outputs + [manifest_key_for(manifest["partition"], manifest["run_id"])]
+    )
+    logger.warning(
+        "Rolled back compaction %s of %s (%d outputs removed)",
+        manifest["run_id"],
+        manifest["partition"],
+        len(outputs),
+    )
+
+
+def recover(bucket):
+    """Finish or roll back compactions interrupted by an earlier run"""
+    recovered = 0
+    for obj in list_objects(bucket, COMPACTION_MANIFEST_PREFIX):
+        manifest = json.loads(store.get(bucket, obj["Key"]))
+        if manifest["state"] == "committed":
+            logger.warning(
+                "Finishing compaction %s of %s",
+                manifest["run_id"],
+                manifest["partition"],
+            )
+            finish(bucket, manifest)
+        else:
+            rollback(bucket, manifest)
+        recovered += 1
+    return recovered
+
+
+def compact_layer(layer, datasets=None, target_mb=TARGET_MB, dry_run=False):
+    """
+    Compact every eligible partition of a layer
+
+    Returns:
+        dict with partitions, input files and output files
+    """
+    bucket, all_datasets = LAYERS[layer]
+    target_bytes = target_mb * 1024 * 1024
+    totals = {"partitions": 0, "input_files": 0, "output_files": 0}
+
+    if not dry_run:
+        recover(bucket)
+
+    for dataset in datasets or all_datasets:
+        for partition, inputs in plan_partitions(
+            layer, bucket, dataset, target_bytes
+        ).items():
+            logger.info("%s: %d small files", partition, len(inputs))
+            if dry_run:
+                continue
+            outputs = compact_partition(
+                layer, dataset, bucket, partition, inputs, target_bytes
+            )
+            if outputs:
+                totals["partitions"] += 1
+                totals["input_files"] += len(inputs)
+                totals["output_files"] += outputs
+    return totals
+
+
+def main(
+    layers=("bronze", "silver"), datasets=None, target_mb=TARGET_MB, dry_run=False
+):
+    """Compact the given layers; returns the totals per layer"""
+    logger.info("%s\nSmall-file Compaction\n%s", "=" * 60, "=" * 60)
+    start = time.perf_counter()
+
+    results = {}
+    for layer in layers:
+        results[layer] = compact_layer(layer, datasets, target_mb, dry_run)
+
+    log_summary(
+        logger,
+        "compaction",
+        dry_run=dry_run,
+        wall_seconds=round(time.perf_counter() - start, 2),
+        **{
+            f"{layer}_{name}": value
+            for layer, totals in results.items()
+            for name, value in totals.items()
+        },
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Small-file compaction")
+    parser.add_argument("--layer", choices=sorted(LAYERS), action="append")
+    parser.add_argument("--dataset", action="append")
+    parser.add_argument("--target-mb", type=float, default=TARGET_MB)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    main(
+        layers=args.layer or ("bronze", "silver"),
+        datasets=args.dataset,
+        target_mb=args.target_mb,
+        dry_run=args.dry_run,
+    )
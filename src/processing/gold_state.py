@@ -0,0 +1,238 @@
+"""
+Persisted aggregate state for incremental silver → gold runs
+
+Instead of re-aggregating every order each run, gold keeps partial
+aggregates that new silver rows are merged into:
+- ``AggregateState``: rows keyed by one or more columns whose measures
+  combine by "sum", "min" or "max"; merging a delta only touches (loads and
+  rewrites) the partitions its keys fall in
+- a ledger of each order's last contribution, so a changed order is
+  retracted (merged with negated measures) before its new version is added
+
+State is split into partition files: by month for date-keyed aggregates
+and the ledger (month of the order), by key hash otherwise. ``GoldState``
+tracks the current file of every partition in one manifest, together with
+the silver watermark. A run writes
+its changed partitions to new files and then replaces the manifest, so a
+failed run leaves the previous state and watermark untouched and is simply
+retried.
+"""
+
+import json
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from key_index import hash_values
+
+Partitioner = Callable[[pd.DataFrame], pd.Series]
+
+MANIFEST_NAME = "manifest.json"
+
+# Layout of the state files; a state written with another layout is rebuilt
+# by deleting the state prefix (the next run then merges all of silver)
+STATE_VERSION = 2
+
+
+def by_month(column: str) -> Partitioner:
+    """Partition rows by the ``year=/month=`` of a date column"""
+
+    def partition_of(df: pd.DataFrame) -> pd.Series:
+        dates = pd.to_datetime(df[column])
+        return (
+            "year="
+            + dates.dt.year.astype(str)
+            + "/month="
+            + dates.dt.month.astype(str).str.zfill(2)
+        )
+
+    return partition_of
+
+
+def by_hash(column: str, buckets: int) -> Partitioner:
+    """Partition rows into ``bucket=NNN`` by a hash of a key column"""
+
+    def partition_of(df: pd.DataFrame) -> pd.Series:
+        bucket = pd.Series(hash_values(df[column]) % buckets, index=df.index)
+        return "bucket=" + bucket.astype(str).str.zfill(3)
+
+    return partition_of
+
+
+class AggregateState:
+    """
+    Keyed partial aggregates, split over partition files loaded on first use
+
+    ``measures`` maps each column to how two partial values combine. Rows
+    whose ``count`` measure merges to zero (e.g. a day whose only order was
+    retracted) are dropped. Without measures the state is a ledger: a row
+    replaces the stored row with the same key.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key: List[str],
+        partition_of: Partitioner,
+        measures: Optional[Dict[str, str]] = None,
+        count: Optional[str] = None,
+    ):
+        self.name = name
+        self.key = key
+        self.partition_of = partition_of
+        self.measures = measures
+        self.count = count
+        self.load: Callable[[str], Optional[pd.DataFrame]] = lambda partition: None
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self.dirty: Set[str] = set()
+
+    def partition(self, partition: str) -> Optional[pd.DataFrame]:
+        """Stored rows of one partition, or None"""
+        if partition not in self._frames:
+            self._frames[partition] = self.load(partition)
+        return self._frames[partition]
+
+    def _grouped(self, rows: pd.DataFrame):
+        if rows.empty:
+            return []
+        return rows.groupby(self.partition_of(rows).to_numpy(), sort=True)
+
+    def merge(self, partial: pd.DataFrame) -> Set[str]:
+        """Combine partial aggregates into the state; returns partitions changed"""
+        changed = set()
+        for partition, rows in self._grouped(partial):
+            current = self.partition(partition)
+            if current is not None and len(current):
+                rows = pd.concat([current, rows], ignore_index=True)
+            combined = (
+                rows.groupby(self.key, sort=True)
+                .agg(self.measures)
+                .reset_index()[self.key + list(self.measures)]
+            )
+            if self.count is not None:
+                combined = combined[combined[self.count] != 0]
+            self._frames[partition] = combined.reset_index(drop=True)
+            changed.add(partition)
+        self.dirty |= changed
+        return changed
+
+    def upsert(self, rows: pd.DataFrame) -> None:
+        """Replace stored rows by key (ledger states)"""
+        for partition, group in self._grouped(rows):
+            current = self.partition(partition)
+            if current is not None and len(current):
+                group = pd.concat([current, group], ignore_index=True)
+            self._frames[partition] = group.drop_duplicates(
+                self.key, keep="last"
+            ).reset_index(drop=True)
+            self.dirty.add(partition)
+
+    def lookup(self, keys: pd.DataFrame) -> pd.DataFrame:
+        """
+        Stored rows for the keys in ``keys``, searched in the partitions
+        ``keys`` falls in (so it needs the partitioning columns too)
+        """
+        found = []
+        for partition, group in self._grouped(keys):
+            current = self.partition(partition)
+            if current is not None and len(current):
+                matches = group[self.key].drop_duplicates()
+                found.append(current.merge(matches, on=self.key))
+        if not found:
+            return pd.DataFrame(columns=list(keys.columns))
+        return pd.concat(found, ignore_index=True)
+
+    def frame(self, partitions: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Stored rows of the given partitions (default: every loaded one)"""
+        names = sorted(self._frames) if partitions is None else partitions
+        frames = [self.partition(name) for name in names]
+        frames = [frame for frame in frames if frame is not None and len(frame)]
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+
+class GoldState:
+    """
+    Every aggregate state of gold plus the silver watermark, versioned by a
+    manifest of partition files
+
+    ``load``/``save``/``delete`` read, write and remove objects by name
+    relative to the state prefix (e.g. S3 GET/PUT/DeleteObjects).
+    """
+
+    def __init__(
+        self,
+        states: List[AggregateState],
+        load: Callable[[str], Optional[bytes]],
+        save: Callable[[str, bytes], None],
+        delete: Callable[[List[str]], None],
+    ):
+        self.states = {state.name: state for state in states}
+        self._load = load
+        self._save = save
+        self._delete = delete
+
+        manifest = load(MANIFEST_NAME)
+        manifest = json.loads(manifest) if manifest else {}
+        if manifest and manifest.get("version") != STATE_VERSION:
+            raise ValueError(
+                f"Gold state has layout version {manifest.get('version')}, "
+                f"expected {STATE_VERSION}: delete it to rebuild"
+            )
+        self.files: Dict[str, str] = manifest.get("files", {})
+        self.watermark: Optional[Dict] = manifest.get("watermark")
+        for state in states:
+            state.load = self._loader(state.name)
+
+    def _loader(self, name: str) -> Callable[[str], Optional[pd.DataFrame]]:
+        def load(partition: str) -> Optional[pd.DataFrame]:
+            key = self.files.get(f"{name}/{partition}")
+            data = self._load(key) if key else None
+            if data is None:
+                return None
+            return pq.read_table(BytesIO(data)).to_pandas()
+
+        return load
+
+    def partitions(self, name: str) -> List[str]:
+        """Every stored or changed partition of a state"""
+        prefix = f"{name}/"
+        stored = {path[len(prefix) :] for path in self.files if path.startswith(prefix)}
+        return sorted(stored | self.states[name].dirty)
+
+    def commit(self, run_id: str, watermark: Dict) -> None:
+        """
+        Write changed partitions to new files, then switch the manifest to
+        them and the new watermark in one PUT; superseded files go last
+        """
+        superseded = []
+        for name, state in self.states.items():
+            for partition in sorted(state.dirty):
+                path = f"{name}/{partition}"
+                frame = state.partition(partition)
+                buffer = BytesIO()
+                pq.write_table(
+                    pa.Table.from_pandas(frame, preserve_index=False),
+                    buffer,
+                    compression="snappy",
+                )
+                key = f"{path}/{run_id}.parquet"
+                self._save(key, buffer.getvalue())
+                if self.files.get(path, key) != key:
+                    superseded.append(self.files[path])
+                self.files[path] = key
+            state.dirty = set()
+
+        self.watermark = watermark
+        manifest = {
+            "version": STATE_VERSION,
+            "watermark": watermark,
+            "files": self.files,
+        }
+        self._save(MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+        if superseded:
+            self._delete(superseded)
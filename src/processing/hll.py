@@ -0,0 +1,175 @@
+"""
+Mergeable HyperLogLog sketches for distinct counts in gold
+
+An exact distinct count (``nunique``) can't be combined: the customers of
+Monday plus those of Tuesday isn't the customers of both days. A
+HyperLogLog sketch can: it is a fixed array of ``2^precision`` one-byte
+registers, two sketches merge by taking the register-wise maximum, and the
+merged sketch estimates the distinct count of the union. Gold stores one
+serialized sketch per row next to the exact count, so a weekly, monthly or
+any-range distinct count is a merge of O(days) sketches instead of a
+rescan of O(rows) silver records.
+
+At the default precision (14: 16,384 registers, 16 KB before compression)
+the standard error is ~0.8%. Values are hashed with the same 64-bit hash as
+the silver key index; sketches built at different precisions don't merge.
+
+Usage:
+    sketches = sketch_by(orders, orders["order_date"].dt.date, "customer_id")
+    HyperLogLog.merge_all(sketches).count()
+"""
+
+import zlib
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from key_index import hash_values
+
+PRECISION = 14
+
+# Serialized form: magic, format version, precision, zlib-compressed registers
+MAGIC = b"HLL"
+FORMAT_VERSION = 1
+
+
+def _validate(precision: int) -> None:
+    if not 4 <= precision <= 18:
+        raise ValueError(f"HyperLogLog precision must be 4-18, got {precision}")
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Bit length of each uint64, exact (float64 only holds 53 bits)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+
+def _positions(values: pd.Series, precision: int):
+    """
+    Register index and rank of each non-null value: the first ``precision``
+    bits of the hash pick the register, the rank is the position of the
+    first 1 bit in the rest
+    """
+    hashes = hash_values(values[values.notna()])
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    rank = (64 - precision) - _bit_length(rest) + 1
+    return index, rank.astype(np.uint8), values.notna().to_numpy()
+
+
+class HyperLogLog:
+    """One sketch: ``2^precision`` registers holding the highest rank seen"""
+
+    def __init__(
+        self, precision: int = PRECISION, registers: Optional[np.ndarray] = None
+    ):
+        _validate(precision)
+        self.precision = precision
+        if registers is None:
+            registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.registers = registers
+
+    @classmethod
+    def of(cls, values: pd.Series, precision: int = PRECISION) -> "HyperLogLog":
+        """Sketch of the non-null values of a Series"""
+        sketch = cls(precision)
+        sketch.add(values)
+        return sketch
+
+    def add(self, values: pd.Series) -> None:
+        """Add the non-null values of a Series"""
+        index, rank, _ = _positions(values, self.precision)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: Union["HyperLogLog", bytes]) -> None:
+        """Union another sketch (or its serialized form) into this one"""
+        if isinstance(other, (bytes, bytearray)):
+            other = HyperLogLog.from_bytes(other)
+        if other.precision != self.precision:
+            raise ValueError(
+                f"Can't merge sketches of precision {other.precision} and "
+                f"{self.precision}"
+            )
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    @classmethod
+    def merge_all(
+        cls, sketches: Iterable[Union["HyperLogLog", bytes, None]]
+    ) -> Optional["HyperLogLog"]:
+        """Union of the sketches (None entries skipped), or None if there are none"""
+        merged = None
+        for sketch in sketches:
+            if sketch is None:
+                continue
+            if isinstance(sketch, (bytes, bytearray)):
+                sketch = cls.from_bytes(sketch)
+            if merged is None:
+                merged = cls(sketch.precision, sketch.registers.copy())
+            else:
+                merged.merge(sketch)
+        return merged
+
+    def count(self) -> int:
+        """Estimated number of distinct values added"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype(int)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small range: linear counting over the empty registers
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        header = MAGIC + bytes([FORMAT_VERSION, self.precision])
+        return header + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        if data[:3] != MAGIC or data[3] != FORMAT_VERSION:
+            raise ValueError("Not a serialized HyperLogLog sketch")
+        precision = data[4]
+        _validate(precision)
+        registers = np.frombuffer(zlib.decompress(data[5:]), dtype=np.uint8)
+        if len(registers) != 1 << precision:
+            raise ValueError("Corrupt HyperLogLog sketch: wrong register count")
+        return cls(precision, registers.copy())
+
+
+def sketch_by(
+    df: pd.DataFrame, by, column: str, precision: int = PRECISION
+) -> pd.Series:
+    """
+    Serialized sketch of ``column`` per group of ``by`` (anything
+    ``groupby`` accepts), built in one vectorized pass over all groups
+    """
+    _validate(precision)
+    grouped = df.groupby(by, sort=True)
+    groups = grouped.ngroup().to_numpy()
+    keys = grouped.size().index
+    index, rank, present = _positions(df[column], precision)
+    # Rows with a null group key are in no group (-1)
+    placed = groups[present] >= 0
+
+    size = 1 << precision
+    registers = np.zeros((len(keys), size), dtype=np.uint8)
+    flat = groups[present][placed] * size + index[placed]
+    np.maximum.at(registers.reshape(-1), flat, rank[placed])
+
+    sketches = [HyperLogLog(precision, row).to_bytes() for row in registers]
+    return pd.Series(sketches, index=keys, name=f"{column}_sketch")
+
+
+def rollup_distinct(df: pd.DataFrame, by, sketch_column: str) -> pd.Series:
+    """
+    Estimated distinct count per group of ``by`` from the serialized
+    sketches of the rows in it, e.g. gold daily rows rolled up to weeks
+    """
+
+    def count(sketches: pd.Series) -> int:
+        merged = HyperLogLog.merge_all(sketches)
+        return merged.count() if merged is not None else 0
+
+    return df.groupby(by, sort=True)[sketch_column].agg(count)
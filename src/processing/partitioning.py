@@ -0,0 +1,63 @@
+"""
+Event-time partitioning of silver and gold outputs
+
+Rows are split by the calendar day (or month) of their own event time, not
+the time the job ran, so date-filtered Athena queries prune partitions and
+late records land next to the records of the same day. Rows without a
+usable event time go to the run's partition.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+DAY = ("year", "month", "day")
+MONTH = ("year", "month")
+
+# Event time of the silver data types partitioned by it (the others use the
+# day the job ran)
+SILVER_EVENT_TIME = {"orders": "order_date", "events": "event_timestamp"}
+
+
+def partition_path(values: Dict[str, int]) -> str:
+    """Hive-style path of partition values, e.g. ``year=2025/month=01/day=27``"""
+    parts = [f"year={values['year']}"]
+    parts += [
+        f"{name}={values[name]:02d}" for name in ("month", "day") if name in values
+    ]
+    return "/".join(parts)
+
+
+def _values(moment, levels: Sequence[str]) -> Dict[str, int]:
+    return {level: getattr(moment, level) for level in levels}
+
+
+def split_by_event_time(
+    df: pd.DataFrame,
+    column: Optional[str],
+    levels: Sequence[str] = DAY,
+    run_time: Optional[datetime] = None,
+) -> List[Tuple[Dict[str, int], pd.DataFrame]]:
+    """
+    Rows grouped by the year/month[/day] of ``column``, oldest partition first
+
+    Without the column (or when ``column`` is None) everything goes to the
+    partition of ``run_time``.
+    """
+    run_time = run_time or datetime.now()
+    if df.empty:
+        return []
+    if column is None or column not in df.columns:
+        return [(_values(run_time, levels), df)]
+
+    event_time = pd.to_datetime(df[column], errors="coerce", utc=True)
+    event_time = event_time.dt.tz_convert(None)
+    period = "D" if "day" in levels else "M"
+    periods = event_time.dt.to_period(period)
+    fallback = pd.Period(run_time, freq=period)
+
+    return [
+        (_values(value, levels), rows)
+        for value, rows in df.groupby(periods.fillna(fallback), sort=True)
+    ]
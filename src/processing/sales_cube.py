@@ -0,0 +1,260 @@
+"""
+Pre-aggregated sales cube: order measures by date × category ×
+payment_method × status × device
+
+Dashboards slice revenue by any mix of these dimensions. Instead of
+scanning silver orders joined to products for every slice, gold keeps the
+additive measures (orders, units, revenue) at the finest grain plus a few
+rollups (grouping sets), and ``slice_cube`` answers a slice by summing the
+smallest materialized grouping set that has every dimension it needs:
+a few hundred rows per day instead of every order.
+
+Rows of a grouping set have the dimensions it rolls up set to null and a
+``grouping_id`` bitmask like SQL's GROUPING(): bit ``i`` (from the left,
+in ``DIMENSIONS`` order) is set when dimension ``i`` is rolled up. Missing
+dimension values are "unknown", so null only ever means "all".
+
+``load_cube`` reads the gold partitions of a date range back for slicing.
+
+Orders carry no device: an order takes the device of the customer's last
+clickstream event at most ``timeout_minutes`` before it.
+"""
+
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from partition_catalog import partition_bounds, partition_values
+
+DIMENSIONS = ["order_date", "category", "payment_method", "status", "device_type"]
+MEASURES = ["orders", "units_sold", "revenue"]
+
+# Materialized grouping sets: the finest grain, then rollups by date and one
+# dimension, and by date alone
+GROUPING_SETS = [
+    DIMENSIONS,
+    ["order_date", "category"],
+    ["order_date", "payment_method"],
+    ["order_date", "status"],
+    ["order_date", "device_type"],
+    ["order_date"],
+]
+
+UNKNOWN = "unknown"
+
+
+def grouping_id(dimensions: Sequence[str]) -> int:
+    """SQL GROUPING() bitmask of the dimensions rolled up"""
+    bits = 0
+    for dimension in DIMENSIONS:
+        bits = (bits << 1) | (dimension not in dimensions)
+    return bits
+
+
+def _last_event_before(
+    event_codes: np.ndarray,
+    event_seconds: np.ndarray,
+    order_codes: np.ndarray,
+    order_seconds: np.ndarray,
+) -> np.ndarray:
+    """
+    Index of each order's latest event of the same customer at or before
+    it (-1 if none): events and orders are sorted together by (customer,
+    time, events first) and every order takes the last event preceding it
+    """
+    events = len(event_codes)
+    codes = np.concatenate([event_codes, order_codes])
+    seconds = np.concatenate([event_seconds, order_seconds])
+    is_order = np.arange(len(codes)) >= events
+
+    # As in sessionization, one packed int64 key sorts several times faster
+    # than a lexsort, when it fits
+    offsets = seconds - seconds.min()
+    time_bits = int(offsets.max()).bit_length() + 1
+    if time_bits + int(codes.max()).bit_length() > 63:
+        order = np.lexsort((is_order, seconds, codes))
+    else:
+        order = np.argsort((codes << time_bits) | (offsets << 1) | is_order)
+
+    positions = np.where(is_order[order], -1, np.arange(len(order)))
+    last = np.maximum.accumulate(positions)
+    sorted_codes = codes[order]
+    same = (last >= 0) & (sorted_codes[np.maximum(last, 0)] == sorted_codes)
+
+    found = np.full(len(order_codes), -1, dtype=np.int64)
+    orders = is_order[order]
+    found[order[orders] - events] = np.where(
+        same[orders], order[np.maximum(last[orders], 0)], -1
+    )
+    return found
+
+
+def attribute_devices(
+    orders: pd.DataFrame, events: Optional[pd.DataFrame], timeout_minutes: float
+) -> pd.Series:
+    """Device of each order: the customer's last event before it, or unknown"""
+    devices = np.full(len(orders), UNKNOWN, dtype=object)
+    if events is None or "device_type" not in events.columns:
+        return pd.Series(devices, index=orders.index)
+
+    event_times = pd.to_datetime(events["event_timestamp"])
+    usable = (
+        events["customer_id"].notna()
+        & event_times.notna()
+        & events["device_type"].notna()
+    ).to_numpy()
+    order_times = pd.to_datetime(orders["order_date"])
+    placed = (orders["customer_id"].notna() & order_times.notna()).to_numpy()
+    if not usable.any() or not placed.any():
+        return pd.Series(devices, index=orders.index)
+
+    # One code space for the customers of both sides
+    codes, _ = pd.factorize(
+        pd.concat(
+            [
+                events["customer_id"][usable].astype(object),
+                orders["customer_id"][placed].astype(object),
+            ],
+            ignore_index=True,
+        )
+    )
+    event_codes = codes[: usable.sum()].astype(np.int64)
+    order_codes = codes[usable.sum() :].astype(np.int64)
+    event_seconds = event_times[usable].to_numpy("datetime64[s]").view("int64")
+    order_seconds = order_times[placed].to_numpy("datetime64[s]").view("int64")
+
+    found = _last_event_before(event_codes, event_seconds, order_codes, order_seconds)
+    recent = found >= 0
+    recent[recent] = (
+        order_seconds[recent] - event_seconds[found[recent]] <= timeout_minutes * 60
+    )
+    event_devices = events["device_type"][usable].astype(object).to_numpy()
+    placed_devices = devices[placed]
+    placed_devices[recent] = event_devices[found[recent]]
+    devices[placed] = placed_devices
+    return pd.Series(devices, index=orders.index)
+
+
+def build_cube(
+    orders: pd.DataFrame,
+    products: Optional[pd.DataFrame] = None,
+    events: Optional[pd.DataFrame] = None,
+    timeout_minutes: float = 30,
+) -> pd.DataFrame:
+    """
+    Every grouping set of ``GROUPING_SETS`` over the orders
+
+    Returns:
+        DataFrame with the DIMENSIONS, grouping_id and the MEASURES
+    """
+    facts = pd.DataFrame(
+        {
+            "order_date": pd.to_datetime(orders["order_date"]).dt.normalize(),
+            "payment_method": orders["payment_method"].astype(object),
+            "status": orders["status"].astype(object),
+            "device_type": attribute_devices(orders, events, timeout_minutes),
+            "quantity": orders["quantity"],
+            "total_amount": orders["total_amount"],
+        }
+    )
+    if products is not None:
+        categories = products.drop_duplicates("product_id", keep="last").set_index(
+            "product_id"
+        )["category"]
+        facts["category"] = orders["product_id"].map(categories).astype(object)
+    else:
+        facts["category"] = None
+    facts = facts[facts["order_date"].notna()]
+    facts[DIMENSIONS[1:]] = facts[DIMENSIONS[1:]].fillna(UNKNOWN)
+
+    finest = (
+        facts.groupby(DIMENSIONS, sort=True)
+        .agg(
+            orders=("total_amount", "size"),
+            units_sold=("quantity", "sum"),
+            revenue=("total_amount", "sum"),
+        )
+        .reset_index()
+    )
+    finest["order_date"] = finest["order_date"].dt.date
+
+    # Rollups sum the finest grain, not the orders again
+    sets = []
+    for dimensions in GROUPING_SETS:
+        rows = finest
+        if dimensions != DIMENSIONS:
+            rows = finest.groupby(dimensions, sort=True)[MEASURES].sum().reset_index()
+        sets.append(rows.assign(grouping_id=grouping_id(dimensions)))
+    cube = pd.concat(sets, ignore_index=True)
+    return cube[DIMENSIONS + ["grouping_id"] + MEASURES]
+
+
+def slice_cube(
+    cube: pd.DataFrame,
+    by: Sequence[str] = (),
+    where: Optional[Dict[str, object]] = None,
+    start_date=None,
+    end_date=None,
+) -> pd.DataFrame:
+    """
+    Measures grouped by ``by`` over the orders matching ``where`` (a value
+    or list of values per dimension) and ``start_date``/``end_date``
+    (inclusive order dates), answered from the smallest grouping set
+    holding every dimension involved
+
+    Returns:
+        DataFrame with ``by``, the MEASURES and avg_order_value
+    """
+    where = where or {}
+    needed = set(by) | set(where) | {"order_date"}
+    unknown = needed - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Not cube dimensions: {sorted(unknown)}")
+    dimensions: List[str] = min(
+        (dims for dims in GROUPING_SETS if needed <= set(dims)), key=len
+    )
+
+    rows = cube[cube["grouping_id"] == grouping_id(dimensions)]
+    if start_date is not None:
+        rows = rows[rows["order_date"] >= start_date]
+    if end_date is not None:
+        rows = rows[rows["order_date"] <= end_date]
+    for dimension, values in where.items():
+        if isinstance(values, (list, tuple, set)):
+            rows = rows[rows[dimension].isin(values)]
+        else:
+            rows = rows[rows[dimension] == values]
+
+    if by:
+        result = rows.groupby(list(by), sort=True)[MEASURES].sum().reset_index()
+    else:
+        result = pd.DataFrame([rows[MEASURES].sum()])
+    result = result.astype({"orders": "int64", "units_sold": "int64"})
+    result["avg_order_value"] = result["revenue"] / result["orders"]
+    return result
+
+
+def load_cube(store, bucket: str, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    The gold sales_cube rows of the month partitions overlapping
+    ``start_date``/``end_date`` (inclusive; ``slice_cube`` filters the days)
+    """
+    start = start_date.isoformat() if start_date is not None else None
+    end = end_date.isoformat() if end_date is not None else None
+    frames = []
+    for obj in store.list(bucket, "sales_cube/"):
+        key = obj["Key"]
+        if not key.endswith(".parquet"):
+            continue
+        first, last = partition_bounds(partition_values(key))
+        if first is not None and (
+            (end is not None and first > end) or (start is not None and last < start)
+        ):
+            continue
+        frames.append(pq.read_table(BytesIO(store.get(bucket, key))).to_pandas())
+    if not frames:
+        return pd.DataFrame(columns=DIMENSIONS + ["grouping_id"] + MEASURES)
+    return pd.concat(frames, ignore_index=True)
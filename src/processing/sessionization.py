@@ -0,0 +1,171 @@
+"""
+Sort-based sessionization of clickstream events
+
+Events are ordered by (session, time) with one argsort over integer codes
+packed into a single key, then every per-session measure is a NumPy ``reduceat`` over the
+contiguous runs of that order, so the whole summary is a single pass
+whatever the number of sessions:
+- a session is a run of events sharing ``session_id`` (or, when that is
+  missing, ``customer_id``) with no gap longer than the inactivity timeout;
+  a session ID idle for longer is split, numbered by ``session_seq``
+- funnel flags record whether the session reached cart, checkout and
+  purchase; the device is the one of the session's first event
+
+Events without a time or an identity can't be placed and are dropped.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# Silver event columns sessionization reads
+SESSION_COLUMNS = [
+    "session_id",
+    "customer_id",
+    "event_type",
+    "event_timestamp",
+    "device_type",
+]
+
+SESSION_TIMEOUT_MINUTES = 30
+
+# Event types counted, and the funnel stages flagged, per session
+COUNTED_EVENTS = {"page_views": "page_view", "product_views": "product_view"}
+FUNNEL_STAGES = {
+    "reached_cart": "add_to_cart",
+    "reached_checkout": "checkout_start",
+    "purchased": "purchase",
+}
+
+
+def _lookup(values: pd.Series, order: np.ndarray, reduce) -> pd.Series:
+    """
+    One value per session: ``reduce`` maps the sorted integer codes of
+    ``values`` (-1 for missing) to one code per session
+    """
+    codes, uniques = pd.factorize(values)
+    picked = reduce(codes[order])
+    if len(uniques) == 0:
+        return pd.Series([None] * len(picked), dtype=object)
+    labels = np.asarray(uniques, dtype=object).take(np.maximum(picked, 0))
+    return pd.Series(np.where(picked >= 0, labels, None), dtype=object)
+
+
+def _session_order(identity_codes: np.ndarray, millis: np.ndarray) -> np.ndarray:
+    """
+    Permutation sorting events by identity, then time
+
+    Both fit in one int64 key for any realistic run (2^63 ms-identities:
+    e.g. a year of events across 100M sessions), which a single unstable
+    argsort orders several times faster than a two-key lexsort.
+    """
+    offsets = millis - millis.min()
+    time_bits = int(offsets.max()).bit_length()
+    identity_bits = int(identity_codes.max()).bit_length()
+    if time_bits + identity_bits > 63:
+        return np.lexsort((millis, identity_codes))
+    key = (identity_codes.astype(np.int64) << time_bits) | offsets
+    return np.argsort(key)
+
+
+def _is(values: pd.Series, value: str) -> np.ndarray:
+    """Boolean mask of ``values == value``, comparing codes for categoricals"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        if value not in categories:
+            return np.zeros(len(values), dtype=bool)
+        return values.cat.codes.to_numpy() == categories.get_loc(value)
+    return (values == value).to_numpy(dtype=bool, na_value=False)
+
+
+def _empty_summary() -> pd.DataFrame:
+    columns: List[str] = (
+        ["session_id", "session_seq", "customer_id", "session_start", "session_end"]
+        + ["duration_seconds", "event_count"]
+        + list(COUNTED_EVENTS)
+        + list(FUNNEL_STAGES)
+        + ["device_type"]
+    )
+    return pd.DataFrame(columns=columns)
+
+
+def summarize_sessions(
+    events: pd.DataFrame, timeout_minutes: float = SESSION_TIMEOUT_MINUTES
+) -> pd.DataFrame:
+    """
+    One row per session, ordered by session ID and start time
+
+    Returns:
+        DataFrame with session_id, session_seq, customer_id, session_start,
+        session_end, duration_seconds, event_count, page_views,
+        product_views, reached_cart, reached_checkout, purchased and
+        device_type
+    """
+    times = pd.to_datetime(events["event_timestamp"], errors="coerce", utc=True)
+    times = times.dt.tz_convert(None)
+    identity = events["session_id"]
+    if "customer_id" in events.columns:
+        identity = identity.where(identity.notna(), events["customer_id"])
+    placed = (times.notna() & identity.notna()).to_numpy()
+    if not placed.any():
+        return _empty_summary()
+
+    events = events[placed]
+    identity = identity[placed]
+    # Silver timestamps have millisecond precision
+    millis = times[placed].to_numpy("datetime64[ms]").view("int64")
+    identity_codes, identity_values = pd.factorize(identity)
+
+    order = _session_order(identity_codes, millis)
+    identity_codes = identity_codes[order]
+    millis = millis[order]
+
+    # A new session starts at a new identity or after an inactivity gap
+    boundary = np.empty(len(order), dtype=bool)
+    boundary[0] = True
+    new_identity = identity_codes[1:] != identity_codes[:-1]
+    idle = np.diff(millis) > timeout_minutes * 60 * 1000
+    boundary[1:] = new_identity | idle
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], len(order)) - 1
+
+    # session_seq: 1 for an identity's first session, 2 after its first split
+    first_of_identity = np.ones(len(order), dtype=bool)
+    first_of_identity[1:] = new_identity
+    run = np.cumsum(boundary)
+    identity_first_run = np.maximum.accumulate(np.where(first_of_identity, run, 0))
+    session_seq = (run - identity_first_run + 1)[starts]
+
+    session_start = millis[starts]
+    session_end = millis[ends]
+    summary = {
+        "session_id": np.asarray(identity_values, dtype=object)[identity_codes[starts]],
+        "session_seq": session_seq.astype(np.int32),
+    }
+    if "customer_id" in events.columns:
+        # Any customer the session identified as (the highest code)
+        summary["customer_id"] = _lookup(
+            events["customer_id"],
+            order,
+            lambda codes: np.maximum.reduceat(codes, starts),
+        )
+    summary["session_start"] = session_start.view("datetime64[ms]")
+    summary["session_end"] = session_end.view("datetime64[ms]")
+    summary["duration_seconds"] = (session_end - session_start) / 1000
+    summary["event_count"] = ends - starts + 1
+
+    event_types = events["event_type"]
+    for name, event_type in COUNTED_EVENTS.items():
+        mask = _is(event_types, event_type)[order]
+        summary[name] = np.add.reduceat(mask.astype(np.int64), starts)
+    for name, event_type in FUNNEL_STAGES.items():
+        summary[name] = np.logical_or.reduceat(
+            _is(event_types, event_type)[order], starts
+        )
+
+    if "device_type" in events.columns:
+        summary["device_type"] = _lookup(
+            events["device_type"], order, lambda codes: codes[starts]
+        )
+    return pd.DataFrame(summary)
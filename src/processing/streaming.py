@@ -0,0 +1,279 @@
+"""
+Row-group streaming helpers for bronze → silver
+
+Memory stays bounded by the batch size instead of the file size:
+- ``open_parquet`` reads a stored object through ranged GETs, so only the
+  footer and the column chunks being decoded are fetched
+- ``keep_last_masks`` makes a first pass over just the primary key column to
+  find, across every input file, the last occurrence of each key (the same
+  rows ``drop_duplicates(keep="last")`` keeps on the concatenated input)
+- ``iter_kept_batches`` yields record batches with the duplicates removed
+- ``ParquetStreamWriter`` appends batches to a local temporary Parquet file
+  that is uploaded once complete
+- ``read_pruned`` reads only some columns, and only the row groups whose
+  min/max statistics can match a range predicate
+"""
+
+import io
+import logging
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from partition_catalog import table_stats
+from schema_registry import cast_column
+
+logger = logging.getLogger(__name__)
+
+READ_BUFFER_BYTES = 1024 * 1024
+
+
+class RangeReader(io.RawIOBase):
+    """Seekable, read-only file object over a stored object using ranged GETs"""
+
+    def __init__(self, store, bucket: str, key: str, size: Optional[int] = None):
+        self.store = store
+        self.bucket = bucket
+        self.key = key
+        if size is None:
+            size = store.size(bucket, key)
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size or len(buffer) == 0:
+            return 0
+        end = min(self.position + len(buffer), self.size)
+        data = self.store.get_range(self.bucket, self.key, self.position, end)
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def open_parquet(store, bucket: str, key: str) -> pq.ParquetFile:
+    """Open a stored Parquet object for batch-at-a-time reading"""
+    reader = io.BufferedReader(RangeReader(store, bucket, key), READ_BUFFER_BYTES)
+    return pq.ParquetFile(reader)
+
+
+def keep_last_masks(
+    files: List[pq.ParquetFile], key_column: str
+) -> List[Optional[np.ndarray]]:
+    """
+    Per-file boolean masks of rows holding the last occurrence of their key
+
+    Only the key column is read. Files without the key column get None
+    (keep every row); rows with a null key are kept, as pandas does.
+    """
+    keys, sizes = [], []
+    for parquet_file in files:
+        if key_column in parquet_file.schema_arrow.names:
+            column = parquet_file.read(columns=[key_column]).column(key_column)
+            keys.append(column.to_pandas())
+            sizes.append(len(column))
+        else:
+            sizes.append(None)
+
+    if not keys:
+        return [None] * len(files)
+
+    keep = ~pd.concat(keys, ignore_index=True).duplicated(keep="last").to_numpy()
+
+    masks, offset = [], 0
+    for size in sizes:
+        if size is None:
+            masks.append(None)
+            continue
+        masks.append(keep[offset : offset + size])
+        offset += size
+    return masks
+
+
+def iter_kept_batches(
+    files: List[pq.ParquetFile],
+    masks: List[Optional[np.ndarray]],
+    batch_rows: int,
+) -> Iterator[pa.RecordBatch]:
+    """Record batches of every file with the masked-out rows removed"""
+    for parquet_file, mask in zip(files, masks):
+        offset = 0
+        for batch in parquet_file.iter_batches(batch_size=batch_rows):
+            rows = batch.num_rows
+            if mask is not None:
+                batch = batch.filter(pa.array(mask[offset : offset + rows]))
+            offset += rows
+            if batch.num_rows:
+                yield batch
+
+
+def row_groups_overlapping(
+    metadata: pq.FileMetaData, column: str, low: Any, high: Any
+) -> List[int]:
+    """
+    Row groups whose ``column`` min/max overlaps [low, high)
+
+    Row groups without statistics for the column are kept.
+    """
+    selected = []
+    for index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(index)
+        stats = None
+        for position in range(row_group.num_columns):
+            chunk = row_group.column(position)
+            if chunk.path_in_schema == column:
+                stats = chunk.statistics
+                break
+        if stats is None or not stats.has_min_max:
+            selected.append(index)
+        elif stats.max >= low and stats.min < high:
+            selected.append(index)
+    return selected
+
+
+def read_pruned(
+    parquet_file: pq.ParquetFile,
+    columns: Optional[List[str]] = None,
+    predicate: Optional[Tuple[str, Any, Any]] = None,
+) -> pa.Table:
+    """
+    Read a subset of a Parquet file
+
+    Args:
+        columns: columns to decode (those missing from the file are skipped);
+            None reads all
+        predicate: ``(column, low, high)`` keeping rows with low <= value <
+            high; row groups that cannot match are not fetched or decoded
+    """
+    names = parquet_file.schema_arrow.names
+    if columns is not None:
+        columns = [name for name in columns if name in names]
+    if predicate is None or predicate[0] not in names:
+        return parquet_file.read(columns=columns)
+
+    column, low, high = predicate
+    row_groups = row_groups_overlapping(parquet_file.metadata, column, low, high)
+    read_columns = None if columns is None else sorted(set(columns) | {column})
+    table = parquet_file.read_row_groups(row_groups, columns=read_columns)
+
+    values = table.column(column)
+    low_scalar = pa.scalar(low, type=values.type)
+    high_scalar = pa.scalar(high, type=values.type)
+    mask = pc.and_(pc.greater_equal(values, low_scalar), pc.less(values, high_scalar))
+    table = table.filter(mask)
+    return table if columns is None else table.select(columns)
+
+
+def merge_stats(
+    total: Dict[str, Tuple[Any, Any]], batch: Dict[str, Tuple[Any, Any]]
+) -> None:
+    """Fold one batch's column min/max into running totals"""
+    for column, (low, high) in batch.items():
+        if column in total:
+            current_low, current_high = total[column]
+            total[column] = (min(current_low, low), max(current_high, high))
+        else:
+            total[column] = (low, high)
+
+
+class ParquetStreamWriter:
+    """
+    Incremental Parquet writer backed by a temporary file
+
+    The file schema is ``schema`` if given, else the first batch's; batches
+    are cast to it and missing columns are filled with nulls. A Parquet file
+    has one schema, so columns a later batch adds can't be written: they are
+    dropped with a warning naming them, and counted in ``dropped_columns``.
+    Batches conformed to the schema registry (with missing registered
+    columns filled) only ever differ in unregistered columns.
+    """
+
+    def __init__(self, compression: str = "snappy", schema: Optional[pa.Schema] = None):
+        self.compression = compression
+        self.file = tempfile.TemporaryFile()
+        self.writer: Optional[pq.ParquetWriter] = None
+        self.schema: Optional[pa.Schema] = schema
+        self.num_rows = 0
+        self.stats: Dict[str, Tuple[Any, Any]] = {}
+        # Rows of each column dropped because the file schema lacks it
+        self.dropped_columns: Dict[str, int] = {}
+
+    def _open(self, table: pa.Table) -> None:
+        if self.schema is None:
+            # An all-null column in the first batch must still accept values later
+            fields = [
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ]
+            self.schema = pa.schema(fields)
+        self.writer = pq.ParquetWriter(
+            self.file, self.schema, compression=self.compression
+        )
+
+    def _align(self, table: pa.Table) -> pa.Table:
+        extra = [name for name in table.column_names if name not in self.schema.names]
+        for name in extra:
+            if name not in self.dropped_columns:
+                logger.warning(
+                    "Column %s is not in the file schema, fixed by an earlier "
+                    "batch; dropping it",
+                    name,
+                )
+            self.dropped_columns[name] = (
+                self.dropped_columns.get(name, 0) + table.num_rows
+            )
+        columns = []
+        for field in self.schema:
+            if field.name in table.column_names:
+                column = table.column(field.name)
+                if not pa.types.is_null(column.type):
+                    columns.append(cast_column(column, field.type))
+                    continue
+            columns.append(pa.nulls(table.num_rows, field.type))
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+    def write(self, table: pa.Table) -> None:
+        if self.writer is None:
+            self._open(table)
+        table = self._align(table)
+        self.writer.write_table(table)
+        self.num_rows += table.num_rows
+        merge_stats(self.stats, table_stats(table))
+
+    def finish(self) -> int:
+        """Close the Parquet file and rewind it; returns its size in bytes"""
+        if self.writer is not None:
+            self.writer.close()
+        size = self.file.tell()
+        self.file.seek(0)
+        return size
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "ParquetStreamWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
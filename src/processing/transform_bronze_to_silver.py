@@ -3,34 +3,114 @@ Bronze to Silver Transformation
 Cleans and validates raw data
 """
 
+import argparse
+import logging
+import multiprocessing
 import pandas as pd
-import boto3
+import pyarrow as pa
+import pyarrow.parquet as pq
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import os
-from io import BytesIO
-
-# AWS clients
-s3 = boto3.client("s3")
+import sys
+from io import BytesIO, StringIO
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+)
+
+import arrow_kernels  # noqa: E402
+from glue_partitions import open_registrar  # noqa: E402
+from partition_catalog import is_compacted, open_catalog, table_stats  # noqa: E402
+from pipeline_logging import get_logger, log_summary  # noqa: E402
+from key_index import KeyIndex, fingerprint_table, hash_values  # noqa: E402
+from object_store import ObjectNotFound, open_store  # noqa: E402
+from schema_registry import (  # noqa: E402
+    VOCABULARIES,
+    categorize,
+    conform_dataframe,
+    conform_table,
+    get_columns,
+)
+from streaming import (  # noqa: E402
+    ParquetStreamWriter,
+    iter_kept_batches,
+    keep_last_masks,
+    open_parquet,
+)
+from partitioning import (  # noqa: E402
+    SILVER_EVENT_TIME,
+    partition_path,
+    split_by_event_time,
+)
+from watermark import WatermarkManifest  # noqa: E402
+
+logger = get_logger(__name__)
+
+# Object storage (S3 unless OBJECT_STORE selects a local or in-memory backend)
+store = open_store()
+
+# Glue partition registration (None unless GLUE_DATABASE is set)
+glue_partitions = open_registrar()
 
 # Environment variables
 BRONZE_BUCKET = os.getenv("BRONZE_BUCKET", "ecommerce-analytics-dev-bronze")
 SILVER_BUCKET = os.getenv("SILVER_BUCKET", "ecommerce-analytics-dev-silver")
 
+# Partition catalog (None unless CATALOG_PATH is set: fall back to listings);
+# claims the buckets it indexes so a second catalog fails loudly
+catalog = open_catalog(store=store, buckets=[BRONZE_BUCKET, SILVER_BUCKET])
+
+# "incremental" processes every new bronze object once; "latest" only the newest
+PROCESSING_MODE = os.getenv("PROCESSING_MODE", "incremental")
+MANIFEST_PREFIX = os.getenv("MANIFEST_PREFIX", "_manifests/bronze_to_silver/")
+WATERMARK_GRACE_SECONDS = float(os.getenv("WATERMARK_GRACE_SECONDS", "3600"))
+
+# Incremental runs drop records already in silver with the same version
+CROSS_FILE_DEDUP = os.getenv("CROSS_FILE_DEDUP", "true").lower() == "true"
+KEY_INDEX_PREFIX = os.getenv("KEY_INDEX_PREFIX", "_key_index/")
+
+# Streaming mode: transform record batches so memory is bounded by batch size
+STREAMING = os.getenv("BRONZE_TO_SILVER_STREAMING", "false").lower() == "true"
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "65536"))
+
+# "arrow" runs the string and timestamp cleaning with Arrow compute kernels
+CLEANING_BACKEND = os.getenv("CLEANING_BACKEND", "pandas")
+
+# Data types processed concurrently; 1 keeps the sequential in-process run
+BRONZE_TO_SILVER_WORKERS = int(os.getenv("BRONZE_TO_SILVER_WORKERS", "1"))
+
+
+def categorize_columns(df):
+    """Store controlled-vocabulary columns as categoricals"""
+    for column, vocabulary in VOCABULARIES.items():
+        if column in df.columns:
+            df[column] = categorize(df[column], vocabulary)
+    return df
+
 
 def transform_customers(df):
     """Transform customer data"""
-    print(f"Transforming {len(df)} customer records...")
+    logger.info("Transforming %d customer records...", len(df))
 
     # Remove duplicates
     df = df.drop_duplicates(subset=["customer_id"], keep="last")
+    df = categorize_columns(df)
 
     # Standardize email
     if "email" in df.columns:
-        df["email"] = df["email"].str.lower().str.strip()
+        if CLEANING_BACKEND == "arrow":
+            df["email"] = arrow_kernels.lower_strip(df["email"])
+        else:
+            df["email"] = df["email"].str.lower().str.strip()
 
     # Standardize phone
     if "phone" in df.columns:
-        df["phone"] = df["phone"].astype(str).str.replace(r"[^0-9]", "", regex=True)
+        if CLEANING_BACKEND == "arrow":
+            df["phone"] = arrow_kernels.digits_only(df["phone"])
+        else:
+            df["phone"] = df["phone"].astype(str).str.replace(r"[^0-9]", "", regex=True)
 
     # Calculate age
     if "date_of_birth" in df.columns:
@@ -47,16 +127,17 @@ def transform_customers(df):
     )
     df["dq_has_phone"] = df["phone"].notna() if "phone" in df.columns else False
 
-    print(f"✓ Cleaned to {len(df)} unique customers")
+    logger.info("✓ Cleaned to %d unique customers", len(df))
     return df
 
 
 def transform_products(df):
     """Transform product data"""
-    print(f"Transforming {len(df)} product records...")
+    logger.info("Transforming %d product records...", len(df))
 
     # Remove duplicates
     df = df.drop_duplicates(subset=["product_id"], keep="last")
+    df = categorize_columns(df)
 
     # Ensure positive prices
     if "base_price" in df.columns:
@@ -81,13 +162,13 @@ def transform_products(df):
         df["inventory_quantity"] > 0 if "inventory_quantity" in df.columns else False
     )
 
-    print(f"✓ Cleaned to {len(df)} unique products")
+    logger.info("✓ Cleaned to %d unique products", len(df))
     return df
 
 
 def transform_orders(df):
     """Transform order data"""
-    print(f"Transforming {len(df)} order records...")
+    logger.info("Transforming %d order records...", len(df))
 
     # Remove duplicates
     df = df.drop_duplicates(subset=["order_id"], keep="last")
@@ -97,6 +178,7 @@ def transform_orders(df):
         df = df[df["total_amount"] > 0]
     if "quantity" in df.columns:
         df = df[df["quantity"] > 0]
+    df = categorize_columns(df)
 
     # Parse dates
     if "order_date" in df.columns:
@@ -120,152 +202,532 @@ def transform_orders(df):
     # Data quality
     df["dq_has_customer"] = df["customer_id"].notna()
     df["dq_has_product"] = df["product_id"].notna()
-    df["dq_valid_status"] = df["status"].isin(
-        ["pending", "confirmed", "shipped", "delivered", "cancelled"]
-    )
+    df["dq_valid_status"] = df["status"].isin(VOCABULARIES["status"])
 
-    print(f"✓ Cleaned to {len(df)} valid orders")
+    logger.info("✓ Cleaned to %d valid orders", len(df))
     return df
 
 
 def transform_events(df):
     """Transform event data"""
-    print(f"Transforming {len(df)} event records...")
+    logger.info("Transforming %d event records...", len(df))
 
     # Remove duplicates
     df = df.drop_duplicates(subset=["event_id"], keep="last")
+    df = categorize_columns(df)
 
     # Parse timestamp
     if "event_timestamp" in df.columns:
         df["event_timestamp"] = pd.to_datetime(df["event_timestamp"], errors="coerce")
 
         # Extract components
-        df["event_date"] = df["event_timestamp"].dt.date
-        df["event_hour"] = df["event_timestamp"].dt.hour
-        df["event_dayofweek"] = df["event_timestamp"].dt.dayofweek
+        if CLEANING_BACKEND == "arrow":
+            parts = arrow_kernels.timestamp_parts(df["event_timestamp"])
+            df["event_date"], df["event_hour"], df["event_dayofweek"] = parts
+        else:
+            df["event_date"] = df["event_timestamp"].dt.date
+            df["event_hour"] = df["event_timestamp"].dt.hour
+            df["event_dayofweek"] = df["event_timestamp"].dt.dayofweek
 
     # Categorize
     df["is_anonymous"] = df["customer_id"].isna()
 
     # Data quality
     df["dq_has_session"] = df["session_id"].notna()
-    df["dq_valid_event_type"] = df["event_type"].isin(
-        [
-            "page_view",
-            "product_view",
-            "add_to_cart",
-            "remove_from_cart",
-            "checkout_start",
-            "purchase",
-        ]
-    )
+    df["dq_valid_event_type"] = df["event_type"].isin(VOCABULARIES["event_type"])
 
-    print(f"✓ Cleaned to {len(df)} valid events")
+    logger.info("✓ Cleaned to %d valid events", len(df))
     return df
 
 
-def process_data_type(data_type, bronze_key):
-    """Process one data type"""
-    print(f"\n{'='*60}")
-    print(f"Processing: {data_type}")
-    print(f"{'='*60}")
+def read_bronze(bronze_keys):
+    """Load one or more bronze Parquet objects into a single DataFrame"""
+    frames = []
+    for bronze_key in bronze_keys:
+        logger.info("Downloading from s3://%s/%s", BRONZE_BUCKET, bronze_key)
+        buffer = BytesIO(store.get(BRONZE_BUCKET, bronze_key))
+        frames.append(pd.read_parquet(buffer))
+
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+TRANSFORMS = {
+    "customers": (transform_customers, "customer_id"),
+    "products": (transform_products, "product_id"),
+    "orders": (transform_orders, "order_id"),
+    "events": (transform_events, "event_id"),
+}
+
+
+def process_data_type(data_type, bronze_keys, dedup=False):
+    """
+    Process one data type
+
+    ``bronze_keys`` is one key or a list of keys, cleaned together and
+    written as a single silver file. With ``dedup`` records whose key is
+    already in silver with the same (or a newer) version are dropped.
+
+    Returns:
+        True if the silver file was written
+    """
+    logger.info("\n%s\nProcessing: %s\n%s", "=" * 60, data_type, "=" * 60)
+
+    if isinstance(bronze_keys, str):
+        bronze_keys = [bronze_keys]
+
+    if data_type not in TRANSFORMS:
+        logger.warning("Unknown data type: %s", data_type)
+        return False
 
     try:
-        # Download from bronze - FIX: Use BytesIO
-        print(f"Downloading from s3://{BRONZE_BUCKET}/{bronze_key}")
-        response = s3.get_object(Bucket=BRONZE_BUCKET, Key=bronze_key)
-
-        # Read into BytesIO buffer first
-        buffer = BytesIO(response["Body"].read())
-        df = pd.read_parquet(buffer)
-
-        print(f"Loaded {len(df)} records")
-
-        # Transform based on type
-        if data_type == "customers":
-            df_clean = transform_customers(df)
-        elif data_type == "products":
-            df_clean = transform_products(df)
-        elif data_type == "orders":
-            df_clean = transform_orders(df)
-        elif data_type == "events":
-            df_clean = transform_events(df)
+        key_index = open_key_index(data_type) if dedup else None
+        if STREAMING:
+            input_records, output_records = stream_data_type(
+                data_type, bronze_keys, key_index
+            )
         else:
-            print(f"Unknown data type: {data_type}")
-            return
-
-        # Write to silver
-        now = datetime.now()
-        silver_key = (
-            f"{data_type}_clean/"
-            f"year={now.year}/"
-            f"month={now.month:02d}/"
-            f"day={now.day:02d}/"
-            f"{data_type}_clean_{now.strftime('%Y%m%d_%H%M%S')}.parquet"
+            input_records, output_records = transform_in_memory(
+                data_type, bronze_keys, key_index
+            )
+        if key_index is not None:
+            # Only once the silver file is written
+            key_index.save()
+
+        logger.info("✓ Wrote %d cleaned records to silver layer", output_records)
+
+        # Counted summary for the batch
+        log_summary(
+            logger,
+            f"{data_type} bronze → silver",
+            input_files=len(bronze_keys),
+            input_records=input_records,
+            output_records=output_records,
+            records_removed=input_records - output_records,
+            quality_score=(
+                f"{output_records / input_records * 100:.1f}%"
+                if input_records
+                else "n/a"
+            ),
         )
+        return True
 
-        print(f"Writing to s3://{SILVER_BUCKET}/{silver_key}")
+    except Exception as e:
+        logger.exception("Error processing %s: %s", data_type, e)
+        return False
+
+
+def transform_in_memory(data_type, bronze_keys, key_index=None):
+    """
+    Load every bronze file into one DataFrame, clean it and write it
+
+    Returns:
+        (input records, output records)
+    """
+    df = read_bronze(bronze_keys)
+    logger.info("Loaded %d records from %d files", len(df), len(bronze_keys))
+
+    transform, _ = TRANSFORMS[data_type]
+    df_clean = drop_unchanged(transform(df), data_type, key_index)
+    if len(df_clean):
+        write_silver(data_type, df_clean)
+    else:
+        logger.info("Nothing new to write for %s", data_type)
+    return len(df), len(df_clean)
+
+
+def stream_data_type(data_type, bronze_keys, key_index=None):
+    """
+    Clean bronze files batch by batch with bounded memory
+
+    Duplicates are resolved up front from the key column alone, keeping the
+    last occurrence across all files like the in-memory path; each batch is
+    then transformed, split by event day and appended to one silver Parquet
+    file per day.
+
+    Returns:
+        (input records, output records)
+    """
+    transform, key_column = TRANSFORMS[data_type]
+    files = [open_parquet(store, BRONZE_BUCKET, key) for key in bronze_keys]
+    input_records = sum(parquet_file.metadata.num_rows for parquet_file in files)
+    logger.info(
+        "Streaming %d records from %d files in batches of %d",
+        input_records,
+        len(files),
+        STREAM_BATCH_ROWS,
+    )
+
+    masks = keep_last_masks(files, key_column)
+    run_time = datetime.now()
+    writers = {}
+    try:
+        for batch in iter_kept_batches(files, masks, STREAM_BATCH_ROWS):
+            df_clean = drop_unchanged(
+                transform(batch.to_pandas()), data_type, key_index
+            )
+            partitions = split_by_event_time(
+                df_clean, SILVER_EVENT_TIME.get(data_type), run_time=run_time
+            )
+            for values, rows in partitions:
+                path = partition_path(values)
+                if path not in writers:
+                    writers[path] = ParquetStreamWriter()
+                writers[path].write(
+                    conform_dataframe(rows, "silver", f"{data_type}_clean")
+                )
+
+        for path, writer in sorted(writers.items()):
+            upload_stream(data_type, writer, silver_key_for(data_type, path, run_time))
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return input_records, sum(writer.num_rows for writer in writers.values())
+
+
+def upload_stream(data_type, writer, silver_key):
+    """Upload one finished streamed silver file and catalog it"""
+    size = writer.finish()
+    if not writer.num_rows:
+        return
+    logger.info("Uploading to s3://%s/%s", SILVER_BUCKET, silver_key)
+    store.upload_file(writer.file, SILVER_BUCKET, silver_key)
+    register_silver(
+        data_type,
+        silver_key,
+        size_bytes=size,
+        row_count=writer.num_rows,
+        stats=writer.stats,
+    )
 
-        # Convert to parquet bytes
-        parquet_buffer = BytesIO()
-        df_clean.to_parquet(parquet_buffer, index=False, compression="snappy")
-        parquet_buffer.seek(0)
 
-        s3.put_object(
-            Bucket=SILVER_BUCKET, Key=silver_key, Body=parquet_buffer.getvalue()
+def open_key_index(data_type):
+    """Cross-file key index of one data type, persisted in the silver bucket"""
+    prefix = f"{KEY_INDEX_PREFIX}{data_type}/"
+
+    def load(name):
+        try:
+            return store.get(SILVER_BUCKET, prefix + name)
+        except ObjectNotFound:
+            return None
+
+    def save(name, data):
+        store.put(SILVER_BUCKET, prefix + name, data)
+
+    return KeyIndex(load, save)
+
+
+def drop_unchanged(df_clean, data_type, key_index):
+    """
+    Drop records whose key already reached silver with the same content
+
+    A record is kept if its key is new, or its content (the bronze fields)
+    changed and it was ingested no earlier than the stored version. Rows
+    without a key are always kept.
+
+    A changed record is appended as a new version: silver is a version log,
+    and readers keep each key's latest version (see schema_registry).
+    """
+    _, key_column = TRANSFORMS[data_type]
+    if key_index is None or key_column not in df_clean.columns or df_clean.empty:
+        return df_clean
+
+    has_key = df_clean[key_column].notna().to_numpy()
+    keyed = df_clean[has_key]
+    content = [
+        name
+        for name, _ in get_columns("bronze", data_type)
+        if not name.startswith("_") and name in keyed.columns
+    ]
+    now = pd.Timestamp.now(tz="UTC")
+    if "_ingestion_timestamp" in keyed.columns:
+        ingested_at = pd.to_datetime(
+            keyed["_ingestion_timestamp"], errors="coerce", utc=True
+        ).fillna(now)
+    else:
+        ingested_at = pd.Series(now, index=keyed.index)
+
+    # Fingerprint registry-typed values: pandas dtypes vary between batches
+    conformed = conform_table(
+        pa.Table.from_pandas(keyed[content], preserve_index=False),
+        "bronze",
+        data_type,
+        fill_missing=False,
+    )
+
+    keep = ~has_key
+    keep[has_key] = key_index.upsert(
+        hash_values(keyed[key_column]),
+        fingerprint_table(conformed),
+        ingested_at.dt.as_unit("ms").astype("int64").to_numpy(),
+    )
+    if not keep.all():
+        logger.info("Dropped %d records already in silver", int((~keep).sum()))
+    return df_clean[keep]
+
+
+def silver_key_for(data_type, partition=None, run_time=None):
+    """
+    Silver object key in a ``year=/month=/day=`` partition
+
+    Every file of one run is named after the run time, whatever partition
+    it lands in, so readers can pick up a run's output as a whole.
+    """
+    now = run_time or datetime.now()
+    if partition is None:
+        partition = partition_path(
+            {"year": now.year, "month": now.month, "day": now.day}
         )
+    return (
+        f"{data_type}_clean/"
+        f"{partition}/"
+        f"{data_type}_clean_{now.strftime('%Y%m%d_%H%M%S')}.parquet"
+    )
 
-        print(f"✓ Wrote {len(df_clean)} cleaned records to silver layer")
 
-        # Print summary
-        print("\nSummary:")
-        print(f"  Input records: {len(df)}")
-        print(f"  Output records: {len(df_clean)}")
-        print(f"  Records removed: {len(df) - len(df_clean)}")
-        print(f"  Quality score: {len(df_clean)/len(df)*100:.1f}%")
+def register_silver(data_type, silver_key, **metadata):
+    """Record a written silver object in the catalog and its Glue partition"""
+    if catalog is not None:
+        catalog.record(
+            "silver", f"{data_type}_clean", SILVER_BUCKET, silver_key, **metadata
+        )
+    if glue_partitions is not None:
+        glue_partitions.register(f"{data_type}_clean", SILVER_BUCKET, silver_key)
 
-    except Exception as e:
-        print(f"Error processing {data_type}: {e}")
-        import traceback
 
-        traceback.print_exc()
+def write_silver(data_type, df_clean):
+    """
+    Write a cleaned DataFrame to the silver layer, one file per event day
 
+    Returns:
+        The silver keys written
+    """
+    run_time = datetime.now()
+    partitions = split_by_event_time(
+        df_clean, SILVER_EVENT_TIME.get(data_type), run_time=run_time
+    )
 
-def main():
-    """Main processing function"""
-    print("=" * 60)
-    print("Bronze → Silver Transformation")
-    print("=" * 60)
+    silver_keys = []
+    for values, rows in partitions:
+        silver_key = silver_key_for(data_type, partition_path(values), run_time)
+        logger.info(
+            "Writing %d records to s3://%s/%s", len(rows), SILVER_BUCKET, silver_key
+        )
 
-    data_types = ["customers", "products", "orders", "events"]
+        # Convert to parquet bytes, typed by the schema registry
+        parquet_buffer = BytesIO()
+        table = conform_dataframe(rows, "silver", f"{data_type}_clean")
+        pq.write_table(table, parquet_buffer, compression="snappy")
+        body = parquet_buffer.getvalue()
+
+        store.put(SILVER_BUCKET, silver_key, body)
+        register_silver(
+            data_type,
+            silver_key,
+            size_bytes=len(body),
+            row_count=table.num_rows,
+            stats=table_stats(table),
+        )
+        silver_keys.append(silver_key)
+    return silver_keys
 
-    for data_type in data_types:
-        try:
-            # List files in bronze
-            prefix = f"{data_type}/"
-            response = s3.list_objects_v2(Bucket=BRONZE_BUCKET, Prefix=prefix)
 
-            if "Contents" not in response:
-                print(f"\nNo files found for {data_type}")
-                continue
+def list_bronze_objects(prefix, start_after=None):
+    """All bronze Parquet objects under a prefix"""
+    return [
+        obj
+        for obj in store.list(BRONZE_BUCKET, prefix, start_after or "")
+        if obj["Key"].endswith(".parquet")
+    ]
 
-            # Get most recent file
-            files = sorted(
-                response["Contents"], key=lambda x: x["LastModified"], reverse=True
-            )
-            latest_file = files[0]["Key"]
 
-            # Process it
-            process_data_type(data_type, latest_file)
+def manifest_key(data_type):
+    return f"{MANIFEST_PREFIX}{data_type}.json"
 
+
+def load_manifest(data_type):
+    """Load the data type's watermark manifest, or start an empty one"""
+    try:
+        data = store.get(SILVER_BUCKET, manifest_key(data_type))
+    except ObjectNotFound:
+        return WatermarkManifest(grace_seconds=WATERMARK_GRACE_SECONDS)
+    return WatermarkManifest.from_json(data, grace_seconds=WATERMARK_GRACE_SECONDS)
+
+
+def save_manifest(data_type, manifest):
+    store.put(
+        SILVER_BUCKET,
+        manifest_key(data_type),
+        manifest.to_json(),
+        content_type="application/json",
+    )
+
+
+def process_incremental(data_type):
+    """
+    Process every bronze object that arrived since the last run
+
+    The manifest only advances after the silver file is written, so a
+    failed run is retried in full by the next one.
+
+    Returns:
+        False if processing failed
+    """
+    prefix = f"{data_type}/"
+    manifest = load_manifest(data_type)
+    if catalog is not None:
+        candidates = catalog.files("bronze", data_type, since=manifest.cutoff())
+    else:
+        candidates = list_bronze_objects(prefix, manifest.start_after(prefix))
+    if manifest.watermark is not None:
+        # Compaction only merges consumed files: its outputs hold no new rows
+        candidates = [obj for obj in candidates if not is_compacted(obj["Key"])]
+    new_objects = manifest.new_objects(candidates)
+
+    if not new_objects:
+        logger.info("\nNo new files for %s", data_type)
+        return True
+
+    logger.info("\n%d new files for %s", len(new_objects), data_type)
+    keys = [obj["Key"] for obj in new_objects]
+    if not process_data_type(data_type, keys, dedup=CROSS_FILE_DEDUP):
+        return False
+    manifest.advance(new_objects)
+    save_manifest(data_type, manifest)
+    return True
+
+
+def process_latest(data_type):
+    """Process only the most recent bronze object (previous behavior)"""
+    if catalog is not None:
+        latest = catalog.latest("bronze", data_type)
+    else:
+        files = list_bronze_objects(f"{data_type}/")
+        files = [obj for obj in files if not is_compacted(obj["Key"])]
+        latest = max(files, key=lambda x: x["LastModified"]) if files else None
+
+    if latest is None:
+        logger.info("\nNo files found for %s", data_type)
+        return True
+
+    return process_data_type(data_type, latest["Key"])
+
+
+def run_data_type(data_type, capture=False):
+    """
+    Run one data type and report how it went
+
+    With ``capture`` the log output is collected and returned instead of
+    printed, so parallel workers don't interleave their lines.
+
+    Returns:
+        dict with data_type, ok, error, seconds and (captured) output
+    """
+    root = logging.getLogger()
+    saved_handlers = root.handlers[:]
+    buffer = StringIO()
+    if capture:
+        handler = logging.StreamHandler(buffer)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root.handlers = [handler]
+
+    start = time.perf_counter()
+    error = None
+    try:
+        if PROCESSING_MODE == "latest":
+            ok = process_latest(data_type)
+        else:
+            ok = process_incremental(data_type)
+    except Exception as e:
+        logger.error("Error with %s: %s", data_type, e)
+        ok, error = False, f"{type(e).__name__}: {e}"
+    finally:
+        root.handlers = saved_handlers
+
+    return {
+        "data_type": data_type,
+        "ok": ok,
+        "error": error,
+        "seconds": round(time.perf_counter() - start, 2),
+        "output": buffer.getvalue(),
+    }
+
+
+def run_parallel(data_types, workers):
+    """Run data types in a process pool; worker logs are printed per type"""
+    # spawn: boto3 clients and SQLite connections must not cross a fork (and
+    # workers can't share a memory object store: use OBJECT_STORE=local:...)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {
+            data_type: pool.submit(run_data_type, data_type, True)
+            for data_type in data_types
+        }
+
+    results = []
+    for data_type, future in futures.items():
+        try:
+            result = future.result()
         except Exception as e:
-            print(f"Error with {data_type}: {e}")
-            continue
+            # The worker itself died (e.g. out of memory)
+            result = {
+                "data_type": data_type,
+                "ok": False,
+                "error": f"{type(e).__name__}: {e}",
+                "seconds": None,
+                "output": "",
+            }
+        logger.info("\n----- %s -----\n%s", data_type, result["output"].rstrip())
+        results.append(result)
+    return results
+
+
+def main(workers=BRONZE_TO_SILVER_WORKERS):
+    """
+    Main processing function
+
+    ``workers`` > 1 runs the data types concurrently in separate processes
+    (local/batch runs; Lambda has no shared memory for a process pool).
+    """
+    logger.info("%s\nBronze → Silver Transformation\n%s", "=" * 60, "=" * 60)
+
+    data_types = ["customers", "products", "orders", "events"]
+    start = time.perf_counter()
+
+    if workers > 1:
+        results = run_parallel(data_types, min(workers, len(data_types)))
+    else:
+        results = [run_data_type(data_type) for data_type in data_types]
+
+    failed = [r for r in results if not r["ok"]]
+    for result in failed:
+        logger.error(
+            "❌ %s failed: %s", result["data_type"], result["error"] or "see log above"
+        )
 
-    print("\n" + "=" * 60)
-    print("✅ Bronze → Silver transformation complete!")
-    print("=" * 60)
+    log_summary(
+        logger,
+        "bronze → silver run",
+        workers=workers,
+        succeeded=len(results) - len(failed),
+        failed=len(failed),
+        wall_seconds=round(time.perf_counter() - start, 2),
+        **{r["data_type"]: f"{r['seconds']}s" for r in results},
+    )
+
+    logger.info(
+        "\n%s\n✅ Bronze → Silver transformation complete!\n%s", "=" * 60, "=" * 60
+    )
+    return results
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Bronze → Silver Transformation")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BRONZE_TO_SILVER_WORKERS,
+        help="Data types processed concurrently (default: sequential)",
+    )
+    main(parser.parse_args().workers)
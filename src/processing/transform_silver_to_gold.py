@@ -3,23 +3,126 @@ Silver to Gold Transformation
 Creates aggregated analytics tables
 """
 
+import argparse
+import json
 import pandas as pd
-import boto3
-from datetime import datetime
+import pyarrow.parquet as pq
+from datetime import date, datetime, timedelta
 import os
+import sys
+import uuid
 from io import BytesIO
 
-# AWS clients
-s3 = boto3.client("s3")
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+)
+
+from glue_partitions import open_registrar  # noqa: E402
+from partition_catalog import (  # noqa: E402
+    is_compacted,
+    open_catalog,
+    partition_bounds,
+    partition_values,
+)
+from gold_state import AggregateState, GoldState, by_hash, by_month  # noqa: E402
+from hll import sketch_by  # noqa: E402
+from sales_cube import build_cube  # noqa: E402
+from object_store import ObjectNotFound, open_store  # noqa: E402
+from pipeline_logging import get_logger, log_summary  # noqa: E402
+from schema_registry import (  # noqa: E402
+    PRIMARY_KEYS,
+    VERSION_COLUMN,
+    conform_dataframe,
+)
+from partitioning import (  # noqa: E402
+    MONTH,
+    SILVER_EVENT_TIME,
+    partition_path,
+    split_by_event_time,
+)
+from sessionization import SESSION_COLUMNS, summarize_sessions  # noqa: E402
+from streaming import open_parquet, read_pruned  # noqa: E402
+from watermark import WatermarkManifest  # noqa: E402
+
+logger = get_logger(__name__)
+
+# Object storage (S3 unless OBJECT_STORE selects a local or in-memory backend)
+store = open_store()
+
+# Glue partition registration (None unless GLUE_DATABASE is set)
+glue_partitions = open_registrar()
 
 # Environment variables
 SILVER_BUCKET = os.getenv("SILVER_BUCKET", "ecommerce-analytics-dev-silver")
 GOLD_BUCKET = os.getenv("GOLD_BUCKET", "ecommerce-analytics-dev-gold")
 
+# Partition catalog (None unless CATALOG_PATH is set: fall back to listings);
+# claims the buckets it indexes so a second catalog fails loudly
+catalog = open_catalog(store=store, buckets=[SILVER_BUCKET, GOLD_BUCKET])
+
+# "incremental" merges only new silver orders into persisted aggregate state
+GOLD_PROCESSING_MODE = os.getenv("GOLD_PROCESSING_MODE", "full")
+GOLD_STATE_PREFIX = os.getenv("GOLD_STATE_PREFIX", "_state/")
+GOLD_STATE_BUCKETS = int(os.getenv("GOLD_STATE_BUCKETS", "64"))
+WATERMARK_GRACE_SECONDS = float(os.getenv("WATERMARK_GRACE_SECONDS", "3600"))
+
+# Inactivity after which a session ID's later events start a new session
+SESSION_TIMEOUT_MINUTES = float(os.getenv("SESSION_TIMEOUT_MINUTES", "30"))
+
+# Gold tables partitioned by the month of their own date column; the others
+# are snapshots, written to the month the job ran
+EVENT_TIME_COLUMNS = {
+    "daily_sales_summary": "order_date",
+    "conversion_funnel": "event_date",
+    "sales_cube": "order_date",
+    "session_summary": "session_start",
+}
+
+# Silver columns each aggregation reads; only these are fetched and decoded
+AGGREGATION_COLUMNS = {
+    "daily_sales_summary": [
+        "order_id",
+        "customer_id",
+        "order_date",
+        "total_amount",
+        "quantity",
+    ],
+    "customer_lifetime_value": [
+        "order_id",
+        "customer_id",
+        "order_date",
+        "total_amount",
+    ],
+    "product_performance": ["order_id", "product_id", "quantity", "total_amount"],
+    "sales_cube": [
+        "customer_id",
+        "product_id",
+        "order_date",
+        "payment_method",
+        "status",
+        "quantity",
+        "total_amount",
+    ],
+}
+ORDER_COLUMNS = sorted(set().union(*AGGREGATION_COLUMNS.values()))
+PRODUCT_COLUMNS = ["product_id", "product_name", "category", "current_price", "cost"]
+
+# Event columns the sales cube reads to attribute orders to devices
+CUBE_EVENT_COLUMNS = ["customer_id", "event_timestamp", "device_type"]
+
+# Event types of the conversion funnel, in stage order
+FUNNEL_EVENT_TYPES = [
+    "page_view",
+    "product_view",
+    "add_to_cart",
+    "checkout_start",
+    "purchase",
+]
+
 
 def create_daily_sales_summary(orders_df):
     """Aggregate daily sales metrics"""
-    print("Creating daily sales summary...")
+    logger.info("Creating daily sales summary...")
 
     summary = (
         orders_df.groupby(orders_df["order_date"].dt.date)
@@ -47,13 +150,17 @@ def create_daily_sales_summary(orders_df):
         summary["total_units_sold"] / summary["total_orders"]
     ).round(2)
 
-    print(f"✓ Created {len(summary)} daily summaries")
+    # Mergeable form of unique_customers, for rollups over any range of days
+    sketches = sketch_by(orders_df, orders_df["order_date"].dt.date, "customer_id")
+    summary["customers_sketch"] = summary["order_date"].map(sketches)
+
+    logger.info("✓ Created %d daily summaries", len(summary))
     return summary
 
 
 def create_customer_ltv(orders_df):
     """Calculate customer lifetime value"""
-    print("Calculating customer lifetime value...")
+    logger.info("Calculating customer lifetime value...")
 
     ltv = (
         orders_df.groupby("customer_id")
@@ -68,7 +175,14 @@ def create_customer_ltv(orders_df):
         "first_order_date",
         "last_order_date",
     ]
+    ltv = finish_customer_ltv(ltv)
 
+    logger.info("✓ Calculated LTV for %d customers", len(ltv))
+    return ltv
+
+
+def finish_customer_ltv(ltv):
+    """Derived LTV columns and segments from per-customer totals and dates"""
     ltv["avg_order_value"] = (ltv["lifetime_value"] / ltv["total_orders"]).round(2)
     ltv["days_as_customer"] = (ltv["last_order_date"] - ltv["first_order_date"]).dt.days
     ltv["days_since_last_order"] = (datetime.now() - ltv["last_order_date"]).dt.days
@@ -79,14 +193,12 @@ def create_customer_ltv(orders_df):
         bins=[0, 100, 500, 1000, float("inf")],
         labels=["Low", "Medium", "High", "VIP"],
     )
-
-    print(f"✓ Calculated LTV for {len(ltv)} customers")
     return ltv
 
 
 def create_product_performance(orders_df, products_df):
     """Aggregate product performance"""
-    print("Creating product performance metrics...")
+    logger.info("Creating product performance metrics...")
 
     performance = (
         orders_df.groupby("product_id")
@@ -95,7 +207,14 @@ def create_product_performance(orders_df, products_df):
     )
 
     performance.columns = ["product_id", "times_ordered", "units_sold", "total_revenue"]
+    performance = finish_product_performance(performance, products_df)
+
+    logger.info("✓ Analyzed %d products", len(performance))
+    return performance
 
+
+def finish_product_performance(performance, products_df):
+    """Product details, profit and rank added to per-product totals"""
     # Add product details
     if products_df is not None and len(products_df) > 0:
         cols_to_merge = ["product_id", "product_name", "category"]
@@ -125,98 +244,826 @@ def create_product_performance(orders_df, products_df):
     ).round(2)
 
     performance["revenue_rank"] = performance["total_revenue"].rank(ascending=False)
-
-    print(f"✓ Analyzed {len(performance)} products")
     return performance
 
 
-def write_to_gold(df, table_name):
-    """Write dataframe to gold layer"""
+def create_session_summary(events_df):
+    """Summarize clickstream sessions (see sessionization.py)"""
+    logger.info("Creating session summary...")
+
+    sessions = summarize_sessions(events_df, SESSION_TIMEOUT_MINUTES)
+
+    logger.info(
+        "✓ Summarized %d sessions from %d events", len(sessions), len(events_df)
+    )
+    return sessions
+
+
+def create_conversion_funnel(events_df):
+    """
+    Daily funnel: events and unique sessions per funnel event type, with a
+    sessions sketch so any range of days can be rolled up (see hll.py)
+    """
+    logger.info("Creating conversion funnel...")
+
+    events = events_df[events_df["event_type"].isin(FUNNEL_EVENT_TYPES)]
+    events = events.assign(
+        event_date=pd.to_datetime(events["event_timestamp"]).dt.date,
+        event_type=events["event_type"].astype(object),
+    )
+    by = ["event_date", "event_type"]
+    funnel = (
+        events.groupby(by)
+        .agg(
+            total_events=("event_type", "size"),
+            unique_sessions=("session_id", "nunique"),
+        )
+        .reset_index()
+    )
+    funnel["sessions_sketch"] = (
+        sketch_by(events, by, "session_id")
+        .reindex(pd.MultiIndex.from_frame(funnel[by]))
+        .to_numpy()
+    )
+
+    # Share of the day's sessions (of any event type) reaching each stage
+    day_sessions = (
+        events_df.assign(
+            event_date=pd.to_datetime(events_df["event_timestamp"]).dt.date
+        )
+        .groupby("event_date")["session_id"]
+        .nunique()
+    )
+    funnel["session_conversion_rate"] = (
+        funnel["unique_sessions"] / funnel["event_date"].map(day_sessions) * 100
+    ).round(2)
+    funnel["stage_order"] = funnel["event_type"].map(
+        {event_type: stage for stage, event_type in enumerate(FUNNEL_EVENT_TYPES, 1)}
+    )
+
+    logger.info("✓ Created %d daily funnel stages", len(funnel))
+    return funnel.sort_values(["event_date", "stage_order"], ignore_index=True)
+
+
+def create_sales_cube(orders_df, products_df, events_df):
+    """Additive order measures by date × category × payment × status × device"""
+    logger.info("Creating sales cube...")
+
+    cube = build_cube(orders_df, products_df, events_df, SESSION_TIMEOUT_MINUTES)
+
+    logger.info("✓ Created %d sales cube rows", len(cube))
+    return cube
+
+
+def write_to_gold(df, table_name, replace=False):
+    """
+    Write dataframe to gold layer, one file per year/month partition
+
+    With ``replace`` the other files of each partition written are removed,
+    so the partition holds only this write.
+    """
     now = datetime.now()
-    key = (
-        f"{table_name}/"
-        f"year={now.year}/"
-        f"month={now.month:02d}/"
-        f"{table_name}_{now.strftime('%Y%m%d')}.parquet"
+    partitions = split_by_event_time(
+        df, EVENT_TIME_COLUMNS.get(table_name), MONTH, run_time=now
     )
 
-    print(f"Writing to s3://{GOLD_BUCKET}/{key}")
+    for values, rows in partitions:
+        key = (
+            f"{table_name}/"
+            f"{partition_path(values)}/"
+            f"{table_name}_{now.strftime('%Y%m%d')}.parquet"
+        )
+
+        put_gold_file(rows, table_name, key)
+        if replace:
+            remove_other_files(table_name, key)
+
+    logger.info("✓ Wrote %d records to gold layer", len(df))
+
+
+def put_gold_file(rows, table_name, key):
+    """Write one gold object, typed by the schema registry, and register it"""
+    logger.info("Writing to s3://%s/%s", GOLD_BUCKET, key)
 
-    # Write to BytesIO buffer
     buffer = BytesIO()
-    df.to_parquet(buffer, index=False, compression="snappy")
-    buffer.seek(0)
+    table = conform_dataframe(rows, "gold", table_name)
+    pq.write_table(table, buffer, compression="snappy")
+    body = buffer.getvalue()
+
+    store.put(GOLD_BUCKET, key, body)
+
+    if catalog is not None:
+        catalog.record_table("gold", table_name, GOLD_BUCKET, key, table, len(body))
+    if glue_partitions is not None:
+        glue_partitions.register(table_name, GOLD_BUCKET, key)
+
+
+def gold_files(prefix):
+    """Keys of the gold Parquet objects under a prefix"""
+    return {
+        obj["Key"]
+        for obj in store.list(GOLD_BUCKET, prefix)
+        if obj["Key"].endswith(".parquet")
+    }
+
+
+def delete_gold_files(keys, partition):
+    if not keys:
+        return
+    store.delete(GOLD_BUCKET, sorted(keys))
+    if catalog is not None:
+        catalog.replace("gold", sorted(keys), [])
+    logger.info("Removed %d superseded files of %s", len(keys), partition)
+
+
+def remove_other_files(table_name, key):
+    """Delete the files of a gold partition other than ``key``"""
+    partition = key.rsplit("/", 1)[0] + "/"
+    delete_gold_files(gold_files(partition) - {key}, partition)
+
+
+def write_bucketed_snapshot(table_name, buckets, changed, build):
+    """
+    Write a snapshot table as one file per state bucket in the run month's
+    partition, rewriting only the ``changed`` buckets
+
+    Every bucket is written (and other files removed) when the partition
+    doesn't hold exactly one file per bucket yet: a new month, or files of
+    a full run. ``build(bucket)`` returns the bucket's rows.
+
+    Returns:
+        number of bucket files written
+    """
+    now = datetime.now()
+    partition = (
+        f"{table_name}/{partition_path({'year': now.year, 'month': now.month})}/"
+    )
+    keys = {
+        bucket: f"{partition}{table_name}_{bucket.replace('=', '_')}.parquet"
+        for bucket in buckets
+    }
+    existing = gold_files(partition)
+    complete = existing == set(keys.values())
+
+    written = 0
+    for bucket in sorted(changed if complete else buckets):
+        rows = build(bucket)
+        if rows is not None:
+            put_gold_file(rows, table_name, keys[bucket])
+            written += 1
+    if not complete:
+        delete_gold_files(existing - set(keys.values()), partition)
+    return written
 
-    s3.put_object(Bucket=GOLD_BUCKET, Key=key, Body=buffer.getvalue())
 
-    print(f"✓ Wrote {len(df)} records to gold layer")
+def get_latest_files(prefix):
+    """
+    Keys of the most recent silver run under a prefix
 
+    A run writes one file per event-time partition, all with the same name,
+    so this is every object named like the newest one.
+    """
+    if catalog is not None:
+        return [obj["Key"] for obj in catalog.latest_run("silver", prefix.rstrip("/"))]
 
-def get_latest_file(prefix):
-    """Get most recent file from S3"""
-    response = s3.list_objects_v2(Bucket=SILVER_BUCKET, Prefix=prefix)
-    if "Contents" not in response:
+    objects = list(store.list(SILVER_BUCKET, prefix))
+    # Compacted files only hold runs older than the latest one
+    objects = [
+        obj
+        for obj in objects
+        if obj["Key"].endswith(".parquet") and not is_compacted(obj["Key"])
+    ]
+    if not objects:
+        return []
+
+    latest = max(objects, key=lambda obj: (obj["LastModified"], obj["Key"]))
+    name = latest["Key"].rsplit("/", 1)[-1]
+    return sorted(obj["Key"] for obj in objects if obj["Key"].endswith("/" + name))
+
+
+def partition_overlaps(key, start, end):
+    """Whether a key's event-time partition can hold dates in [start, end)"""
+    first, last = partition_bounds(partition_values(key))
+    if first is None:
+        return True
+    return first < end.isoformat() and last >= start.isoformat()
+
+
+def read_latest(prefix, columns=None, start_date=None, end_date=None):
+    """
+    The most recent silver run under a prefix as one DataFrame, or None
+
+    Only ``columns`` (None: all) are fetched and decoded, through ranged
+    reads. With a date range, rows are limited to event dates in
+    [start_date, end_date): partitions outside it are skipped and so are row
+    groups whose min/max event time can't match.
+    """
+    dataset = prefix.rstrip("/")
+    event_time = SILVER_EVENT_TIME.get(dataset.removesuffix("_clean"))
+    predicate = None
+    keys = get_latest_files(prefix)
+    if event_time and (start_date or end_date):
+        start = start_date or date.min
+        end = end_date or date.max
+        keys = [key for key in keys if partition_overlaps(key, start, end)]
+        predicate = (
+            event_time,
+            datetime.combine(start, datetime.min.time()),
+            datetime.combine(end, datetime.min.time()),
+        )
+
+    frames = []
+    for key in keys:
+        parquet_file = open_parquet(store, SILVER_BUCKET, key)
+        table = read_pruned(parquet_file, columns, predicate)
+        frames.append(table.to_pandas())
+    if not frames:
         return None
-    files = sorted(response["Contents"], key=lambda x: x["LastModified"], reverse=True)
-    return files[0]["Key"]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def silver_files_between(prefix, start, end):
+    """
+    Keys of every silver object (all runs, compacted or not) whose
+    event-time partition can hold dates in [start, end)
+    """
+    dataset = prefix.rstrip("/")
+    if catalog is not None:
+        objects = catalog.in_range("silver", dataset, start, end - timedelta(days=1))
+    else:
+        objects = store.list(SILVER_BUCKET, prefix)
+    return sorted(
+        obj["Key"]
+        for obj in objects
+        if obj["Key"].endswith(".parquet")
+        and partition_overlaps(obj["Key"], start, end)
+    )
+
+
+def read_silver_range(prefix, columns, start=None, end=None):
+    """
+    Rows of every silver run with event dates in [start, end), or None
+
+    A missing bound leaves that side open (and datasets without an event
+    time are read whole). Unlike read_latest this spans all runs, so rows
+    sent more than once (e.g. a changed order) appear once per version.
+    """
+    event_time = SILVER_EVENT_TIME.get(prefix.rstrip("/").removesuffix("_clean"))
+    predicate = None
+    if event_time and (start or end):
+        predicate = (
+            event_time,
+            datetime.combine(start or date.min, datetime.min.time()),
+            datetime.combine(end or date.max, datetime.min.time()),
+        )
+    frames = [
+        read_pruned(
+            open_parquet(store, SILVER_BUCKET, key), columns, predicate
+        ).to_pandas()
+        for key in silver_files_between(prefix, start or date.min, end or date.max)
+    ]
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def latest_versions(rows, entity):
+    """
+    Each key's latest version (by VERSION_COLUMN) among rows with a key
+
+    Silver appends a changed record as a new row, so every silver reader
+    keeps only the latest one before aggregating.
+    """
+    key_column = PRIMARY_KEYS[entity]
+    rows = rows[rows[key_column].notna()]
+    rows = rows.sort_values(VERSION_COLUMN, kind="stable", na_position="first")
+    return rows.drop_duplicates(key_column, keep="last")
+
+
+def latest_order_versions(orders):
+    """Each order's latest version among rows with an ID"""
+    return latest_versions(orders, "orders")
 
 
-def main():
-    """Main aggregation function"""
-    print("=" * 60)
-    print("Silver → Gold Transformation")
-    print("=" * 60)
+def read_silver_versions(prefix, columns, start=None, end=None):
+    """
+    The latest version of each key across every silver run, limited to
+    event dates in [start, end) like read_silver_range, or None
+
+    A run's silver files are only a delta, so full aggregations read all
+    runs rather than read_latest.
+    """
+    entity = prefix.rstrip("/").removesuffix("_clean")
+    extra = [PRIMARY_KEYS[entity], VERSION_COLUMN]
+    rows = read_silver_range(
+        prefix,
+        columns + [column for column in extra if column not in columns],
+        start,
+        end,
+    )
+    return None if rows is None else latest_versions(rows, entity)
+
+
+def whole_months(start_date, end_date):
+    """
+    [start, end) covering whole months from ``start_date``'s month through
+    ``end_date``'s (inclusive), open where a date is None
+    """
+    start = start_date.replace(day=1) if start_date else None
+    end = None
+    if end_date:
+        end = (pd.Period(end_date, freq="M") + 1).start_time.date()
+    return start, end
+
+
+def month_ranges(dates):
+    """[first day, first day of next month) of each month in a date Series"""
+    starts = pd.to_datetime(dates).dropna().dt.to_period("M").unique()
+    return [
+        (month.start_time.date(), (month + 1).start_time.date())
+        for month in sorted(starts)
+    ]
+
+
+def build_sales_cube_months(orders_df, products_df):
+    """
+    The sales cube of every month the orders fall in, from all silver
+    orders of those months
+
+    Cube partitions are replaced whole (their rows are sums), while a run's
+    silver files are only a delta: each month is rebuilt from every silver
+    run's orders (latest version of each) and events, the events starting
+    a session timeout before the month for device attribution.
+    """
+    cubes = []
+    for start, end in month_ranges(orders_df["order_date"]):
+        orders = read_silver_range(
+            "orders_clean/",
+            AGGREGATION_COLUMNS["sales_cube"] + ["order_id", VERSION_COLUMN],
+            start,
+            end,
+        )
+        if orders is None:
+            continue
+        events_start = datetime.combine(start, datetime.min.time()) - timedelta(
+            minutes=SESSION_TIMEOUT_MINUTES
+        )
+        events = read_silver_range(
+            "events_clean/",
+            CUBE_EVENT_COLUMNS + ["event_id", VERSION_COLUMN],
+            events_start.date(),
+            end,
+        )
+        if events is not None:
+            events = latest_versions(events, "events")
+        cubes.append(
+            create_sales_cube(latest_order_versions(orders), products_df, events)
+        )
+    if not cubes:
+        return None
+    return pd.concat(cubes, ignore_index=True)
+
+
+def open_gold_state():
+    """Aggregate state of the incremental mode, persisted in the gold bucket"""
+    states = [
+        # Ledger of each order's aggregated version, to retract on change.
+        # By order month, so a delta only loads the months it falls in: an
+        # order's versions are assumed to keep the month of its order_date
+        AggregateState("orders", ["order_id"], by_month("order_date")),
+        AggregateState(
+            "daily",
+            ["order_date"],
+            by_month("order_date"),
+            {"total_orders": "sum", "total_revenue": "sum", "total_units_sold": "sum"},
+            count="total_orders",
+        ),
+        AggregateState(
+            "daily_customers",
+            ["order_date", "customer_id"],
+            by_month("order_date"),
+            {"orders": "sum"},
+            count="orders",
+        ),
+        AggregateState(
+            "customers",
+            ["customer_id"],
+            by_hash("customer_id", GOLD_STATE_BUCKETS),
+            {"total_orders": "sum", "lifetime_value": "sum"},
+            count="total_orders",
+        ),
+        # First/last order per customer and month, bucketed like customers;
+        # retractions are corrected from the ledger (see merge_orders)
+        AggregateState(
+            "customer_months",
+            ["customer_id", "order_month"],
+            by_hash("customer_id", GOLD_STATE_BUCKETS),
+            {"orders": "sum", "first_order_date": "min", "last_order_date": "max"},
+            count="orders",
+        ),
+        AggregateState(
+            "products",
+            ["product_id"],
+            by_hash("product_id", GOLD_STATE_BUCKETS),
+            {"times_ordered": "sum", "units_sold": "sum", "total_revenue": "sum"},
+            count="times_ordered",
+        ),
+    ]
+
+    def load(name):
+        try:
+            return store.get(GOLD_BUCKET, GOLD_STATE_PREFIX + name)
+        except ObjectNotFound:
+            return None
+
+    def save(name, data):
+        store.put(GOLD_BUCKET, GOLD_STATE_PREFIX + name, data)
+
+    def delete(names):
+        store.delete(GOLD_BUCKET, [GOLD_STATE_PREFIX + name for name in names])
+
+    return GoldState(states, load, save, delete)
+
+
+def new_silver_orders(manifest):
+    """Silver orders objects written since the incremental run's watermark"""
+    if catalog is not None:
+        candidates = catalog.files("silver", "orders_clean", since=manifest.cutoff())
+    else:
+        candidates = list(store.list(SILVER_BUCKET, "orders_clean/"))
+    # Compacted files are new too: they may hold rows of runs not merged yet
+    # (rows already merged are skipped as stale versions by merge_orders)
+    candidates = [obj for obj in candidates if obj["Key"].endswith(".parquet")]
+    return manifest.new_objects(candidates)
+
+
+def order_partials(delta, previous):
+    """
+    Partial aggregates of new order versions minus the versions previously
+    merged (``previous``, from the ledger)
+    """
+    rows = pd.concat(
+        [
+            frame
+            for frame in (previous.assign(sign=-1), delta.assign(sign=1))
+            if len(frame)
+        ],
+        ignore_index=True,
+    )
+    rows["order_date"] = pd.to_datetime(rows["order_date"])
+    rows["order_day"] = rows["order_date"].dt.date
+    rows["revenue"] = rows["total_amount"] * rows["sign"]
+    rows["units"] = rows["quantity"] * rows["sign"]
+
+    daily = rows.groupby("order_day").agg(
+        total_orders=("sign", "sum"),
+        total_revenue=("revenue", "sum"),
+        total_units_sold=("units", "sum"),
+    )
+    daily_customers = rows.groupby(["order_day", "customer_id"]).agg(
+        orders=("sign", "sum")
+    )
+    customers = rows.groupby("customer_id").agg(
+        total_orders=("sign", "sum"), lifetime_value=("revenue", "sum")
+    )
+    rows["order_month"] = rows["order_date"].dt.to_period("M").dt.start_time
+    added = rows[rows["sign"] > 0]
+    customer_months = (
+        rows.groupby(["customer_id", "order_month"])
+        .agg(orders=("sign", "sum"))
+        .join(
+            added.groupby(["customer_id", "order_month"]).agg(
+                first_order_date=("order_date", "min"),
+                last_order_date=("order_date", "max"),
+            )
+        )
+    )
+    products = rows.groupby("product_id").agg(
+        times_ordered=("sign", "sum"),
+        units_sold=("units", "sum"),
+        total_revenue=("revenue", "sum"),
+    )
+    return {
+        "daily": daily.rename_axis("order_date").reset_index(),
+        "daily_customers": daily_customers.rename_axis(
+            ["order_date", "customer_id"]
+        ).reset_index(),
+        "customers": customers.reset_index(),
+        "customer_months": customer_months.reset_index(),
+        "products": products.reset_index(),
+    }
+
+
+def merge_orders(state, delta):
+    """
+    Merge a delta of silver orders into the state
+
+    Returns:
+        The daily partitions (months) the delta changed
+    """
+    ledger = state.states["orders"]
+    previous = ledger.lookup(delta)
+    if VERSION_COLUMN in previous.columns and len(previous):
+        # Versions no newer than the merged one (e.g. re-read from a
+        # compacted file) change nothing
+        merged = (
+            delta[["order_id"]]
+            .merge(previous[["order_id", VERSION_COLUMN]], on="order_id", how="left")[
+                VERSION_COLUMN
+            ]
+            .to_numpy()
+        )
+        stale = pd.notna(merged) & (delta[VERSION_COLUMN].to_numpy() <= merged)
+        delta = delta[~stale]
+        previous = previous[previous["order_id"].isin(delta["order_id"])]
+    if delta.empty:
+        return set()
+    months = set()
+    for name, partial in order_partials(delta, previous).items():
+        changed = state.states[name].merge(partial)
+        if name == "daily":
+            months = changed
+    ledger.upsert(delta)
+    correct_customer_months(state, previous)
+    return months
+
+
+def correct_customer_months(state, previous):
+    """
+    Recompute first/last order dates of the (customer, month) pairs that
+    lost an order version: min/max can't be un-merged. The pairs' orders
+    are all in ledger partitions the lookup already loaded.
+    """
+    previous = previous[previous["customer_id"].notna()]
+    if previous.empty:
+        return
+    ledger = state.states["orders"]
+    orders = ledger.frame(sorted(set(ledger.partition_of(previous))))
+    if orders is None:
+        return
+    orders = orders.assign(order_date=pd.to_datetime(orders["order_date"]))
+    orders["order_month"] = orders["order_date"].dt.to_period("M").dt.start_time
+    pairs = previous.assign(
+        order_month=pd.to_datetime(previous["order_date"]).dt.to_period("M")
+    )
+    pairs["order_month"] = pairs["order_month"].dt.start_time
+    pairs = pairs[["customer_id", "order_month"]].drop_duplicates()
+
+    corrected = (
+        orders.merge(pairs, on=["customer_id", "order_month"])
+        .groupby(["customer_id", "order_month"])
+        .agg(
+            orders=("order_id", "size"),
+            first_order_date=("order_date", "min"),
+            last_order_date=("order_date", "max"),
+        )
+        .reset_index()
+    )
+    if len(corrected):
+        state.states["customer_months"].upsert(corrected)
+
+
+def daily_sales_from_state(state, months):
+    """daily_sales_summary rows of the given months, from the state"""
+    daily = state.states["daily"].frame(sorted(months))
+    if daily is None:
+        return None
+    pairs = state.states["daily_customers"].frame(sorted(months))
+    if pairs is not None:
+        unique_customers = pairs.groupby("order_date").size()
+        sketches = sketch_by(pairs, "order_date", "customer_id")
+    else:
+        unique_customers = pd.Series(dtype="int64")
+        sketches = pd.Series(dtype=object)
+    daily["unique_customers"] = (
+        daily["order_date"].map(unique_customers).fillna(0).astype("int64")
+    )
+    daily["customers_sketch"] = daily["order_date"].map(sketches)
+    daily["order_date"] = pd.to_datetime(daily["order_date"])
+    daily["avg_order_value"] = daily["total_revenue"] / daily["total_orders"]
+    daily["avg_units_per_order"] = (
+        daily["total_units_sold"] / daily["total_orders"]
+    ).round(2)
+    return daily
+
+
+def customer_ltv_from_state(state, bucket):
+    """customer_lifetime_value rows of one state bucket"""
+    totals = state.states["customers"].partition(bucket)
+    months = state.states["customer_months"].partition(bucket)
+    if totals is None or months is None:
+        return None
+    dates = months.groupby("customer_id").agg(
+        first_order_date=("first_order_date", "min"),
+        last_order_date=("last_order_date", "max"),
+    )
+    ltv = totals.join(dates, on="customer_id")
+    for column in ["first_order_date", "last_order_date"]:
+        ltv[column] = pd.to_datetime(ltv[column])
+    return finish_customer_ltv(ltv)
+
+
+def product_performance_from_state(state, bucket, products_df):
+    """product_performance rows of one state bucket"""
+    performance = state.states["products"].partition(bucket)
+    if performance is None:
+        return None
+    performance = finish_product_performance(performance.copy(), products_df)
+    # A rank needs every bucket: rank at query time instead
+    performance["revenue_rank"] = float("nan")
+    return performance
+
+
+def main_incremental():
+    """
+    Merge silver orders written since the last run into the persisted
+    aggregates and rewrite the gold partitions they change
+
+    Cost follows the size of the delta, not the history: only the state
+    partitions its order months and keys fall in are loaded and rewritten,
+    and of the customer and product snapshots only the files of the state
+    buckets it changed. Untouched buckets keep their ``days_since_last_order``
+    as of their last rewrite, and ``revenue_rank`` is left null (every
+    bucket is rewritten at the start of each month). The watermark moves
+    with the state, so a failed run is retried in full.
+    """
+    logger.info(
+        "%s\nSilver → Gold Transformation (incremental)\n%s", "=" * 60, "=" * 60
+    )
+
+    state = open_gold_state()
+    manifest = (
+        WatermarkManifest.from_json(
+            json.dumps(state.watermark), grace_seconds=WATERMARK_GRACE_SECONDS
+        )
+        if state.watermark
+        else WatermarkManifest(grace_seconds=WATERMARK_GRACE_SECONDS)
+    )
+    new_objects = new_silver_orders(manifest)
+    if not new_objects:
+        logger.info("No new silver orders")
+        return
+
+    keys = [obj["Key"] for obj in new_objects]
+    frames = [
+        read_pruned(
+            open_parquet(store, SILVER_BUCKET, key), ORDER_COLUMNS + [VERSION_COLUMN]
+        ).to_pandas()
+        for key in keys
+    ]
+    delta = pd.concat(frames, ignore_index=True)
+    # Files are oldest first, but a compacted file can hold versions older
+    # than a run listed before it
+    delta = latest_order_versions(delta)
+    if delta.empty:
+        logger.info("No orders with an ID in %d new files", len(keys))
+        return
+    logger.info("✓ Loaded %d changed orders from %d files", len(delta), len(keys))
+
+    months = merge_orders(state, delta)
+
+    daily_sales = daily_sales_from_state(state, months)
+    if daily_sales is not None:
+        write_to_gold(daily_sales, "daily_sales_summary", replace=True)
+
+    customer_buckets = write_bucketed_snapshot(
+        "customer_lifetime_value",
+        state.partitions("customers"),
+        state.states["customers"].dirty | state.states["customer_months"].dirty,
+        lambda bucket: customer_ltv_from_state(state, bucket),
+    )
+
+    products_df = read_silver_versions("products_clean/", PRODUCT_COLUMNS)
+    product_buckets = write_bucketed_snapshot(
+        "product_performance",
+        state.partitions("products"),
+        state.states["products"].dirty,
+        lambda bucket: product_performance_from_state(state, bucket, products_df),
+    )
+
+    manifest.advance(new_objects)
+    run_id = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+    state.commit(run_id, json.loads(manifest.to_json()))
+
+    log_summary(
+        logger,
+        "silver → gold incremental run",
+        input_files=len(keys),
+        changed_orders=len(delta),
+        months_rewritten=len(months),
+        customer_buckets_rewritten=customer_buckets,
+        product_buckets_rewritten=product_buckets,
+    )
+
+
+def main(start_date=None, end_date=None, mode=None):
+    """
+    Main aggregation function
+
+    Aggregates every silver run (latest version of each key) and replaces
+    the gold partitions it writes, so re-running never duplicates rows.
+    ``start_date``/``end_date`` (inclusive) limit the orders and events
+    aggregated to the months those dates fall in: gold partitions are
+    monthly and are replaced whole. ``mode`` (default GOLD_PROCESSING_MODE)
+    "incremental" runs main_incremental instead, which takes no range.
+    """
+    if (mode or GOLD_PROCESSING_MODE) == "incremental":
+        return main_incremental()
+
+    logger.info("%s\nSilver → Gold Transformation\n%s", "=" * 60, "=" * 60)
 
     try:
-        print("\nLoading silver layer data...")
+        logger.info("\nLoading silver layer data...")
+
+        start, end = whole_months(start_date, end_date)
 
         # Load orders
-        orders_key = get_latest_file("orders_clean/")
-        if orders_key:
-            response = s3.get_object(Bucket=SILVER_BUCKET, Key=orders_key)
-            buffer = BytesIO(response["Body"].read())
-            orders_df = pd.read_parquet(buffer)
-            print(f"✓ Loaded {len(orders_df)} orders")
+        orders_df = read_silver_versions("orders_clean/", ORDER_COLUMNS, start, end)
+        if orders_df is not None:
+            logger.info("✓ Loaded %d orders", len(orders_df))
         else:
-            print("❌ No orders found in silver layer")
+            logger.error("❌ No orders found in silver layer")
             return
 
         # Load products (optional)
-        products_key = get_latest_file("products_clean/")
-        products_df = None
-        if products_key:
-            response = s3.get_object(Bucket=SILVER_BUCKET, Key=products_key)
-            buffer = BytesIO(response["Body"].read())
-            products_df = pd.read_parquet(buffer)
-            print(f"✓ Loaded {len(products_df)} products")
+        products_df = read_silver_versions("products_clean/", PRODUCT_COLUMNS)
+        if products_df is not None:
+            logger.info("✓ Loaded %d products", len(products_df))
+
+        # Load events (optional)
+        events_df = read_silver_versions("events_clean/", SESSION_COLUMNS, start, end)
+        if events_df is not None:
+            logger.info("✓ Loaded %d events", len(events_df))
 
         # Create aggregations
-        print("\n" + "=" * 60)
-        print("Creating Aggregations")
-        print("=" * 60 + "\n")
+        logger.info("\n%s\nCreating Aggregations\n%s\n", "=" * 60, "=" * 60)
 
         # Daily sales
         daily_sales = create_daily_sales_summary(orders_df)
-        write_to_gold(daily_sales, "daily_sales_summary")
+        write_to_gold(daily_sales, "daily_sales_summary", replace=True)
 
         # Customer LTV
         customer_ltv = create_customer_ltv(orders_df)
-        write_to_gold(customer_ltv, "customer_lifetime_value")
+        write_to_gold(customer_ltv, "customer_lifetime_value", replace=True)
 
         # Product performance
         product_perf = create_product_performance(orders_df, products_df)
-        write_to_gold(product_perf, "product_performance")
+        write_to_gold(product_perf, "product_performance", replace=True)
 
-        print("\n" + "=" * 60)
-        print("✅ Silver → Gold transformation complete!")
-        print("=" * 60)
+        # Sales cube (whole partitions: rows are sums, not appendable)
+        sales_cube = build_sales_cube_months(orders_df, products_df)
+        if sales_cube is not None:
+            write_to_gold(sales_cube, "sales_cube", replace=True)
 
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
+        # Sessions
+        session_summary = (
+            create_session_summary(events_df) if events_df is not None else None
+        )
+        if session_summary is not None:
+            write_to_gold(session_summary, "session_summary", replace=True)
 
-        traceback.print_exc()
+        # Funnel
+        conversion_funnel = (
+            create_conversion_funnel(events_df) if events_df is not None else None
+        )
+        if conversion_funnel is not None:
+            write_to_gold(conversion_funnel, "conversion_funnel", replace=True)
+
+        log_summary(
+            logger,
+            "silver → gold",
+            orders=len(orders_df),
+            products=len(products_df) if products_df is not None else 0,
+            daily_sales_summary=len(daily_sales),
+            customer_lifetime_value=len(customer_ltv),
+            product_performance=len(product_perf),
+            sales_cube=len(sales_cube) if sales_cube is not None else 0,
+            session_summary=(
+                len(session_summary) if session_summary is not None else 0
+            ),
+            conversion_funnel=(
+                len(conversion_funnel) if conversion_funnel is not None else 0
+            ),
+        )
+
+        logger.info(
+            "\n%s\n✅ Silver → Gold transformation complete!\n%s", "=" * 60, "=" * 60
+        )
+
+    except Exception as e:
+        logger.exception("❌ Error: %s", e)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Silver → Gold Transformation")
+    parser.add_argument("--start-date", type=date.fromisoformat)
+    parser.add_argument("--end-date", type=date.fromisoformat)
+    parser.add_argument(
+        "--mode",
+        choices=["full", "incremental"],
+        default=GOLD_PROCESSING_MODE,
+        help="full: aggregate the latest silver run; incremental: merge new "
+        "silver orders into the persisted state",
+    )
+    args = parser.parse_args()
+    main(start_date=args.start_date, end_date=args.end_date, mode=args.mode)
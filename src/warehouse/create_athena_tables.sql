@@ -1,6 +1,6 @@
 -- Create Athena Tables for Gold Layer
+-- Generated by src/common/schema_registry.py: edit the registry, not this file
 
--- Daily Sales Summary
 CREATE EXTERNAL TABLE IF NOT EXISTS daily_sales_summary (
     order_date DATE,
     total_orders BIGINT,
@@ -8,7 +8,8 @@ CREATE EXTERNAL TABLE IF NOT EXISTS daily_sales_summary (
     total_revenue DOUBLE,
     avg_order_value DOUBLE,
     total_units_sold BIGINT,
-    avg_units_per_order DOUBLE
+    avg_units_per_order DOUBLE,
+    customers_sketch BINARY
 )
 PARTITIONED BY (
     year INT,
@@ -17,7 +18,6 @@ PARTITIONED BY (
 STORED AS PARQUET
 LOCATION 's3://ecommerce-analytics-dev-gold-396913733976/daily_sales_summary/';
 
--- Customer Lifetime Value
 CREATE EXTERNAL TABLE IF NOT EXISTS customer_lifetime_value (
     customer_id STRING,
     total_orders BIGINT,
@@ -36,7 +36,6 @@ PARTITIONED BY (
 STORED AS PARQUET
 LOCATION 's3://ecommerce-analytics-dev-gold-396913733976/customer_lifetime_value/';
 
--- Product Performance
 CREATE EXTERNAL TABLE IF NOT EXISTS product_performance (
     product_id STRING,
     times_ordered BIGINT,
@@ -58,13 +57,54 @@ PARTITIONED BY (
 STORED AS PARQUET
 LOCATION 's3://ecommerce-analytics-dev-gold-396913733976/product_performance/';
 
--- Conversion Funnel
+CREATE EXTERNAL TABLE IF NOT EXISTS session_summary (
+    session_id STRING,
+    session_seq INT,
+    customer_id STRING,
+    session_start TIMESTAMP,
+    session_end TIMESTAMP,
+    duration_seconds DOUBLE,
+    event_count BIGINT,
+    page_views BIGINT,
+    product_views BIGINT,
+    reached_cart BOOLEAN,
+    reached_checkout BOOLEAN,
+    purchased BOOLEAN,
+    device_type STRING
+)
+PARTITIONED BY (
+    year INT,
+    month INT
+)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-analytics-dev-gold-396913733976/session_summary/';
+
+CREATE EXTERNAL TABLE IF NOT EXISTS sales_cube (
+    order_date DATE,
+    category STRING,
+    payment_method STRING,
+    status STRING,
+    device_type STRING,
+    grouping_id INT,
+    orders BIGINT,
+    units_sold BIGINT,
+    revenue DOUBLE
+)
+PARTITIONED BY (
+    year INT,
+    month INT
+)
+STORED AS PARQUET
+LOCATION 's3://ecommerce-analytics-dev-gold-396913733976/sales_cube/';
+
 CREATE EXTERNAL TABLE IF NOT EXISTS conversion_funnel (
+    event_date DATE,
     event_type STRING,
     total_events BIGINT,
     unique_sessions BIGINT,
     session_conversion_rate DOUBLE,
-    stage_order INT
+    stage_order INT,
+    sessions_sketch BINARY
 )
 PARTITIONED BY (
     year INT,
@@ -73,8 +113,14 @@ PARTITIONED BY (
 STORED AS PARQUET
 LOCATION 's3://ecommerce-analytics-dev-gold-396913733976/conversion_funnel/';
 
--- Add partitions
 MSCK REPAIR TABLE daily_sales_summary;
+
 MSCK REPAIR TABLE customer_lifetime_value;
+
 MSCK REPAIR TABLE product_performance;
+
+MSCK REPAIR TABLE session_summary;
+
+MSCK REPAIR TABLE sales_cube;
+
 MSCK REPAIR TABLE conversion_funnel;
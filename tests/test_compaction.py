@@ -0,0 +1,172 @@
+"""
+Tests for small-file compaction
+"""
+
+import json
+import sys
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+sys.path.append("src/processing")
+
+import compact_partitions  # noqa: E402
+import transform_bronze_to_silver  # noqa: E402
+import transform_silver_to_gold  # noqa: E402
+from object_store import S3Store  # noqa: E402
+from test_incremental import FakeS3, put_orders  # noqa: E402
+from test_incremental_gold import put_silver_orders  # noqa: E402
+
+BRONZE = transform_bronze_to_silver.BRONZE_BUCKET
+PARTITION = "orders/year=2025/month=01/day=27"
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(transform_bronze_to_silver, "store", S3Store(fake))
+    monkeypatch.setattr(compact_partitions, "store", S3Store(fake))
+    monkeypatch.setattr(compact_partitions, "MIN_AGE_MINUTES", 0)
+    return fake
+
+
+def bronze_keys(fake):
+    return sorted(key for bucket, key in fake.objects if bucket == BRONZE)
+
+
+def test_consumed_bronze_files_are_merged_in_order(fake_s3):
+    """Test consumed files become one file and are not reprocessed"""
+    put_orders(fake_s3, "order_1", ["O1", "O2"], total_amount=1.0)
+    put_orders(fake_s3, "order_2", ["O2", "O3"], total_amount=2.0)
+    transform_bronze_to_silver.process_incremental("orders")
+    put_orders(fake_s3, "order_3", ["O4"])
+
+    totals = compact_partitions.compact_layer("bronze", ["orders"])
+    assert totals == {"partitions": 1, "input_files": 2, "output_files": 1}
+
+    keys = bronze_keys(fake_s3)
+    compacted = [key for key in keys if "/compacted-" in key]
+    assert len(compacted) == 1 and f"{PARTITION}/order_3.parquet" in keys
+    body = fake_s3.objects[(BRONZE, compacted[0])][0]
+    merged = pd.read_parquet(BytesIO(body))
+    assert merged["order_id"].tolist() == ["O1", "O2", "O2", "O3"]
+    assert merged["total_amount"].tolist() == [1.0, 1.0, 2.0, 2.0]
+
+    # Manifest removed; only the unconsumed file is new to the next run
+    assert not [key for key in keys if key.startswith("_manifests/")]
+    fake_s3.objects = {k: v for k, v in fake_s3.objects.items() if "clean" not in k[1]}
+    transform_bronze_to_silver.process_incremental("orders")
+    silver = fake_s3.silver_keys()
+    body = fake_s3.objects[(transform_bronze_to_silver.SILVER_BUCKET, silver[0])][0]
+    assert pd.read_parquet(BytesIO(body))["order_id"].tolist() == ["O4"]
+
+
+def put_manifest(fake, state, outputs=()):
+    manifest = {
+        "version": 1,
+        "state": state,
+        "run_id": "r1",
+        "layer": "bronze",
+        "dataset": "orders",
+        "partition": PARTITION,
+        "inputs": [f"{PARTITION}/order_1.parquet"],
+        "data_time": "2025-01-27T10:00:01+00:00",
+        "outputs": list(outputs),
+    }
+    fake.put_object(
+        Bucket=BRONZE,
+        Key=compact_partitions.manifest_key_for(PARTITION, "r1"),
+        Body=json.dumps(manifest).encode(),
+    )
+
+
+def test_interrupted_compactions_are_rolled_back_or_forward(fake_s3):
+    """Test pending manifests undo their outputs and committed ones finish"""
+    put_orders(fake_s3, "order_1", ["O1"])
+    output = f"{PARTITION}/compacted-r1-0000.parquet"
+    staged = f"{compact_partitions.COMPACTION_STAGING_PREFIX}{output}"
+    fake_s3.put_object(Bucket=BRONZE, Key=staged, Body=b"partial")
+
+    put_manifest(fake_s3, "pending")
+    assert compact_partitions.recover(BRONZE) == 1
+    assert bronze_keys(fake_s3) == [f"{PARTITION}/order_1.parquet"]
+
+    fake_s3.put_object(Bucket=BRONZE, Key=staged, Body=b"complete")
+    put_manifest(
+        fake_s3,
+        "committed",
+        [{"key": output, "staged_key": staged, "size_bytes": 8, "row_count": 1}],
+    )
+    assert compact_partitions.swaps_in_progress(BRONZE) == [PARTITION]
+    assert compact_partitions.recover(BRONZE) == 1
+    assert bronze_keys(fake_s3) == [output]
+    assert fake_s3.objects[(BRONZE, output)][0] == b"complete"
+    assert compact_partitions.swaps_in_progress(BRONZE) == []
+
+
+def test_outputs_stay_out_of_the_partition_until_committed(fake_s3, monkeypatch):
+    """Test a listing of the partition never shows a merge in progress"""
+    put_orders(fake_s3, "order_1", ["O1"])
+    put_orders(fake_s3, "order_2", ["O2"])
+    transform_bronze_to_silver.process_incremental("orders")
+
+    seen = []
+    finish = compact_partitions.finish
+
+    def listing_then_finish(bucket, manifest, stats=None):
+        seen.append([key for key in bronze_keys(fake_s3) if key.startswith("orders/")])
+        finish(bucket, manifest, stats)
+
+    monkeypatch.setattr(compact_partitions, "finish", listing_then_finish)
+    compact_partitions.compact_layer("bronze", ["orders"])
+
+    assert seen == [[f"{PARTITION}/order_1.parquet", f"{PARTITION}/order_2.parquet"]]
+    assert [key for key in bronze_keys(fake_s3) if not key.startswith("orders/")] == []
+
+
+def test_silver_orders_wait_for_the_gold_watermark(fake_s3, monkeypatch):
+    """Test incremental gold's unmerged silver files are not compacted"""
+    store = S3Store(fake_s3)
+    monkeypatch.setattr(transform_silver_to_gold, "store", store)
+    monkeypatch.setattr(transform_silver_to_gold, "catalog", None)
+    monkeypatch.setattr(transform_silver_to_gold, "glue_partitions", None)
+    assert compact_partitions.GOLD_BUCKET == transform_silver_to_gold.GOLD_BUCKET
+
+    def planned():
+        plan = compact_partitions.plan_partitions(
+            "silver", transform_silver_to_gold.SILVER_BUCKET, "orders_clean", 1 << 30
+        )
+        return [
+            "compacted" if "/compacted-" in obj["Key"] else obj["Key"][-14:]
+            for files in plan.values()
+            for obj in files
+        ]
+
+    for hour, order_id in [(10, "O1"), (11, "O2"), (12, "O3")]:
+        put_silver_orders(
+            store,
+            f"20250127_{hour}0000",
+            [(order_id, "C1", "P1", "2025-01-27 10:00", 10.0)],
+        )
+    # No gold state: every file but the latest run's
+    assert planned() == ["100000.parquet", "110000.parquet"]
+
+    transform_silver_to_gold.main(mode="incremental")
+    for hour, order_id in [(13, "O4"), (14, "O5")]:
+        put_silver_orders(
+            store,
+            f"20250127_{hour}0000",
+            [(order_id, "C1", "P1", "2025-01-27 10:00", 10.0)],
+        )
+    # The 13:00 run is older than the latest but not merged yet
+    assert planned() == ["100000.parquet", "110000.parquet", "120000.parquet"]
+
+    compact_partitions.main(layers=("silver",), datasets=["orders_clean"])
+    transform_silver_to_gold.main(mode="incremental")
+    [daily] = [
+        key for bucket, key in fake_s3.objects if key.startswith("daily_sales_summary/")
+    ]
+    body = fake_s3.objects[(transform_silver_to_gold.GOLD_BUCKET, daily)][0]
+    assert pd.read_parquet(BytesIO(body))["total_orders"].tolist() == [5]
+    assert planned() == ["130000.parquet", "compacted"]
@@ -0,0 +1,87 @@
+"""
+Tests for the ingestion seen-ID index and idempotency store
+"""
+
+import sys
+import time
+
+sys.path.append("src/ingestion")
+
+from dedup_index import IdempotencyStore, SeenIdIndex  # noqa: E402
+
+DAY = 86400
+
+
+def ids(prefix, n):
+    return [f"{prefix}-{i}" for i in range(n)]
+
+
+def test_no_false_negatives_and_bounded_false_positives():
+    """Test every added ID is seen and new IDs rarely are"""
+    index = SeenIdIndex(capacity=20000, error_rate=1e-3)
+    now = time.time()
+    index.add(ids("ORD", 20000), now=now)
+
+    assert index.seen(ids("ORD", 20000), now=now).all()
+    false_positives = index.seen(ids("NEW", 100000), now=now).mean()
+    assert false_positives < 3e-3
+    assert not index.over_capacity()
+    index.add(["ORD-extra"], now=now)
+    assert index.over_capacity()
+
+
+def test_buckets_expire_after_retention():
+    """Test IDs are remembered for retention_buckets days, then forgotten"""
+    index = SeenIdIndex(capacity=1000, retention_buckets=3)
+    now = time.time()
+    index.add(["O-1"], now=now)
+    index.add(["O-2"], now=now + DAY)
+
+    seen = index.seen(["O-1", "O-2", "O-3"], now=now + 2 * DAY)
+    assert seen.tolist() == [True, True, False]
+    assert index.seen(["O-1", "O-2"], now=now + 3 * DAY).tolist() == [False, True]
+    assert len(index.filters) == 1
+
+
+def test_snapshots_from_two_containers_merge():
+    """Test loading snapshots unions the IDs of both containers"""
+    now = time.time()
+    first, second = SeenIdIndex(capacity=1000), SeenIdIndex(capacity=1000)
+    first.add(ids("A", 100), now=now)
+    second.add(ids("B", 100), now=now)
+    second.add(ids("C", 10), now=now - DAY)
+
+    merged = SeenIdIndex(capacity=1000)
+    merged.load_bytes(first.to_bytes())
+    merged.load_bytes(second.to_bytes())
+    assert merged.seen(ids("A", 100) + ids("B", 100) + ids("C", 10), now=now).all()
+    assert not merged.seen(ids("D", 100), now=now).any()
+
+    # A snapshot sized differently can't be merged bit-for-bit: ignored
+    other = SeenIdIndex(capacity=50)
+    other.load_bytes(first.to_bytes())
+    assert other.filters == {}
+
+
+def test_idempotency_store_persists_and_evicts():
+    """Test responses survive the LRU and reach other containers"""
+    saved = {}
+    loads = []
+
+    def load(name):
+        loads.append(name)
+        return saved.get(name)
+
+    store = IdempotencyStore(load, saved.__setitem__, max_entries=2)
+    for key in ["req-1", "req-2", "req-3"]:
+        store.put(key, {"statusCode": 200, "body": key})
+    assert len(store._cache) == 2
+
+    # Evicted from the LRU: read back from the persisted copy
+    assert store.get("req-1") == {"statusCode": 200, "body": "req-1"}
+    assert loads == [IdempotencyStore.object_name("req-1")]
+    assert store.get("unknown") is None
+
+    # A fresh container sees the same responses
+    other = IdempotencyStore(load, saved.__setitem__)
+    assert other.get("req-3") == {"statusCode": 200, "body": "req-3"}
@@ -0,0 +1,101 @@
+"""
+Tests for HyperLogLog sketches and the distinct counts stored in gold
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append("src/processing")
+
+import transform_silver_to_gold  # noqa: E402
+from hll import HyperLogLog, rollup_distinct, sketch_by  # noqa: E402
+
+
+def test_merged_sketches_estimate_the_union():
+    """Test merge is a union and survives serialization"""
+    monday = pd.Series([f"C{i}" for i in range(0, 60000)])
+    tuesday = pd.Series([f"C{i}" for i in range(40000, 100000)] + [None])
+
+    merged = HyperLogLog.merge_all(
+        [HyperLogLog.of(monday).to_bytes(), None, HyperLogLog.of(tuesday)]
+    )
+    assert merged.count() == pytest.approx(100000, rel=0.03)
+    assert HyperLogLog.from_bytes(merged.to_bytes()).count() == merged.count()
+    # Small counts are (near) exact
+    assert HyperLogLog.of(monday[:50]).count() == 50
+    assert HyperLogLog.merge_all([]) is None
+
+    with pytest.raises(ValueError):
+        merged.merge(HyperLogLog(precision=10))
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(b"not a sketch")
+
+
+def test_sketch_by_groups_roll_up_like_distinct_counts():
+    """Test per-group sketches match exact counts, per day and rolled up"""
+    rng = np.random.default_rng(0)
+    rows = pd.DataFrame(
+        {
+            "day": rng.integers(0, 14, 50000),
+            "customer_id": rng.integers(0, 3000, 50000).astype(str),
+        }
+    )
+    sketches = sketch_by(rows, "day", "customer_id")
+    daily = sketches.rename("sketch").rename_axis("day").reset_index()
+
+    exact_daily = rows.groupby("day")["customer_id"].nunique()
+    estimated_daily = rollup_distinct(daily, "day", "sketch")
+    assert np.allclose(estimated_daily, exact_daily, rtol=0.03)
+
+    weekly = rollup_distinct(daily, daily["day"] // 7, "sketch")
+    exact_weekly = rows.groupby(rows["day"] // 7)["customer_id"].nunique()
+    assert np.allclose(weekly, exact_weekly, rtol=0.03)
+
+
+def test_gold_tables_carry_sketches_next_to_exact_counts():
+    """Test daily sales and the funnel store sketches of their unique counts"""
+    orders = pd.DataFrame(
+        {
+            "order_id": ["O1", "O2", "O3", "O4"],
+            "customer_id": ["C1", "C2", "C1", "C3"],
+            "order_date": pd.to_datetime(
+                ["2025-01-27", "2025-01-27", "2025-01-28", "2025-01-28"]
+            ),
+            "total_amount": [10.0, 20.0, 30.0, 40.0],
+            "quantity": [1, 1, 1, 1],
+        }
+    )
+    daily = transform_silver_to_gold.create_daily_sales_summary(orders)
+    assert daily["unique_customers"].tolist() == [2, 2]
+    assert HyperLogLog.merge_all(daily["customers_sketch"]).count() == 3
+
+    events = pd.DataFrame(
+        {
+            "session_id": ["S1", "S1", "S2", "S2", "S1", "S3"],
+            "event_type": [
+                "page_view",
+                "purchase",
+                "page_view",
+                "search",
+                "page_view",
+                "page_view",
+            ],
+            "event_timestamp": pd.to_datetime(
+                ["2025-01-27 10:00", "2025-01-27 10:05", "2025-01-27 11:00"]
+                + ["2025-01-27 11:01", "2025-01-28 09:00", "2025-01-28 09:30"]
+            ),
+        }
+    )
+    funnel = transform_silver_to_gold.create_conversion_funnel(events)
+    assert funnel[["event_type", "unique_sessions", "stage_order"]].values.tolist() == [
+        ["page_view", 2, 1],
+        ["purchase", 1, 5],
+        ["page_view", 2, 1],
+    ]
+    assert funnel["session_conversion_rate"].tolist() == [100.0, 50.0, 100.0]
+    # Two days of page views by S1, S2 and S3
+    totals = rollup_distinct(funnel, "event_type", "sessions_sketch")
+    assert totals.to_dict() == {"page_view": 3, "purchase": 1}
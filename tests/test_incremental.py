@@ -0,0 +1,319 @@
+"""
+Tests for incremental bronze → silver processing
+"""
+
+import sys
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+
+sys.path.append("src/processing")
+
+import transform_bronze_to_silver  # noqa: E402
+from object_store import S3Store  # noqa: E402
+from watermark import WatermarkManifest  # noqa: E402
+
+T0 = datetime(2025, 1, 27, 10, 0, tzinfo=timezone.utc)
+
+
+class FakeS3:
+    """In-memory stand-in for the S3 calls the transform makes"""
+
+    def __init__(self):
+        self.objects = {}
+        self.clock = T0
+        self.range_gets = 0
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.clock += timedelta(seconds=1)
+        self.objects[(Bucket, Key)] = (Body, self.clock)
+
+    def get_object(self, Bucket, Key, Range=None):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        body = self.objects[(Bucket, Key)][0]
+        if Range:
+            self.range_gets += 1
+            start, end = Range[len("bytes=") :].split("-")
+            body = body[int(start) : int(end) + 1]
+        return {"Body": BytesIO(body)}
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.objects[(Bucket, Key)][0])}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read())
+
+    def copy(self, CopySource, Bucket, Key):
+        body = self.get_object(**CopySource)["Body"].read()
+        self.put_object(Bucket=Bucket, Key=Key, Body=body)
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.objects.pop((Bucket, obj["Key"]), None)
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix, StartAfter=""):
+        contents = [
+            {"Key": key, "LastModified": modified, "Size": len(body)}
+            for (bucket, key), (body, modified) in sorted(self.objects.items())
+            if bucket == Bucket and key.startswith(Prefix) and key > StartAfter
+        ]
+        yield {"Contents": contents} if contents else {}
+
+    def silver_keys(self):
+        return [
+            key
+            for bucket, key in self.objects
+            if bucket == transform_bronze_to_silver.SILVER_BUCKET
+            and key.startswith("orders_clean/")
+        ]
+
+
+def put_orders(fake, name, order_ids, total_amount=10.0):
+    df = pd.DataFrame(
+        {
+            "order_id": order_ids,
+            "customer_id": "C1",
+            "product_id": "P1",
+            "total_amount": total_amount,
+            "quantity": 1,
+            "order_date": "2025-01-27T10:00:00",
+            "status": "pending",
+        }
+    )
+    buffer = BytesIO()
+    df.to_parquet(buffer, index=False)
+    key = f"orders/year=2025/month=01/day=27/{name}.parquet"
+    fake.put_object(
+        Bucket=transform_bronze_to_silver.BRONZE_BUCKET, Key=key, Body=buffer.getvalue()
+    )
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(transform_bronze_to_silver, "store", S3Store(fake))
+    return fake
+
+
+def test_incremental_processes_every_new_file_once(fake_s3):
+    """Test all new files are processed in one pass and reruns are no-ops"""
+    put_orders(fake_s3, "order_1", ["O1", "O2"])
+    put_orders(fake_s3, "order_2", ["O3"])
+
+    transform_bronze_to_silver.process_incremental("orders")
+    assert len(fake_s3.silver_keys()) == 1
+
+    # Nothing new: no silver write
+    transform_bronze_to_silver.process_incremental("orders")
+    assert len(fake_s3.silver_keys()) == 1
+
+    put_orders(fake_s3, "order_3", ["O4"])
+    transform_bronze_to_silver.process_incremental("orders")
+
+    manifest = transform_bronze_to_silver.load_manifest("orders")
+    assert len(manifest.recent_keys) == 3
+    bronze_key = "orders/year=2025/month=01/day=27/order_3.parquet"
+    bronze_modified = fake_s3.objects[
+        (transform_bronze_to_silver.BRONZE_BUCKET, bronze_key)
+    ][1]
+    assert manifest.watermark == bronze_modified
+
+
+def test_watermark_skips_objects_older_than_grace():
+    """Test objects before the grace window are treated as consumed"""
+    manifest = WatermarkManifest(grace_seconds=60)
+    manifest.advance([{"Key": "a", "LastModified": T0}])
+
+    old = {"Key": "old", "LastModified": T0 - timedelta(minutes=5)}
+    late = {"Key": "late", "LastModified": T0 - timedelta(seconds=30)}
+    seen = {"Key": "a", "LastModified": T0}
+
+    assert manifest.new_objects([old, late, seen]) == [late]
+
+    restored = WatermarkManifest.from_json(manifest.to_json(), grace_seconds=60)
+    assert restored.watermark == T0
+    assert restored.start_after("orders/") == "orders/year=2025/month=01/day=26/"
+
+
+def test_incremental_uses_catalog_instead_of_listing(fake_s3, monkeypatch, tmp_path):
+    """Test bronze objects are found through the catalog with no bucket listing"""
+    from partition_catalog import PartitionCatalog
+
+    catalog = PartitionCatalog(str(tmp_path / "catalog.db"))
+    monkeypatch.setattr(transform_bronze_to_silver, "catalog", catalog)
+    monkeypatch.setattr(fake_s3, "paginate", None)
+
+    put_orders(fake_s3, "order_1", ["O1", "O2"])
+    catalog.record(
+        "bronze",
+        "orders",
+        transform_bronze_to_silver.BRONZE_BUCKET,
+        "orders/year=2025/month=01/day=27/order_1.parquet",
+        written_at=fake_s3.clock,
+    )
+
+    transform_bronze_to_silver.process_incremental("orders")
+    transform_bronze_to_silver.process_incremental("orders")
+
+    assert len(fake_s3.silver_keys()) == 1
+    silver = catalog.latest("silver", "orders_clean")
+    assert silver["Key"] == fake_s3.silver_keys()[0]
+    assert silver["row_count"] == 2
+
+
+def test_run_data_type_captures_output_and_errors(fake_s3, monkeypatch):
+    """Test a worker's log output and failure are returned for the summary"""
+    put_orders(fake_s3, "order_1", ["O1"])
+
+    result = transform_bronze_to_silver.run_data_type("orders", capture=True)
+    assert result["ok"] and result["error"] is None
+    assert "Cleaned to 1 valid orders" in result["output"]
+
+    def broken(data_type):
+        raise RuntimeError("listing failed")
+
+    monkeypatch.setattr(transform_bronze_to_silver, "process_incremental", broken)
+    results = transform_bronze_to_silver.main(workers=1)
+
+    assert [r["ok"] for r in results] == [False] * 4
+    assert results[0]["error"] == "RuntimeError: listing failed"
+
+
+def read_silver(fake, key):
+    body = fake.objects[(transform_bronze_to_silver.SILVER_BUCKET, key)][0]
+    return pd.read_parquet(BytesIO(body))
+
+
+def test_streaming_matches_in_memory_output(fake_s3, monkeypatch):
+    """Test batch streaming keeps the last duplicate across files like pandas"""
+    put_orders(fake_s3, "order_1", [f"O{i}" for i in range(10)], total_amount=1.0)
+    put_orders(fake_s3, "order_2", ["O3", "O12", "O7", "O12"], total_amount=2.0)
+    keys = sorted(key for _, key in fake_s3.objects)
+
+    assert transform_bronze_to_silver.process_data_type("orders", keys)
+    expected = read_silver(fake_s3, fake_s3.silver_keys()[0])
+    fake_s3.objects = {k: v for k, v in fake_s3.objects.items() if "clean" not in k[1]}
+
+    monkeypatch.setattr(transform_bronze_to_silver, "STREAMING", True)
+    monkeypatch.setattr(transform_bronze_to_silver, "STREAM_BATCH_ROWS", 3)
+    assert transform_bronze_to_silver.process_data_type("orders", keys)
+    streamed = read_silver(fake_s3, fake_s3.silver_keys()[0])
+
+    assert fake_s3.range_gets > 0
+    by_id = ["order_id", "total_amount", "order_year", "dq_valid_status"]
+    pd.testing.assert_frame_equal(
+        streamed[by_id].sort_values("order_id").reset_index(drop=True),
+        expected[by_id].sort_values("order_id").reset_index(drop=True),
+    )
+    assert len(streamed) == 11
+
+
+def test_incremental_drops_records_already_in_silver(fake_s3):
+    """Test a record redelivered in a later bronze file is written to silver once"""
+    put_orders(fake_s3, "order_1", ["O1", "O2"])
+    transform_bronze_to_silver.process_incremental("orders")
+    first = read_silver(fake_s3, fake_s3.silver_keys()[0])
+    assert sorted(first["order_id"]) == ["O1", "O2"]
+    fake_s3.objects = {k: v for k, v in fake_s3.objects.items() if "clean" not in k[1]}
+
+    # O1 again unchanged, O2 with a new amount, O3 new
+    put_orders(fake_s3, "order_2", ["O1"])
+    put_orders(fake_s3, "order_3", ["O2", "O3"], total_amount=20.0)
+    transform_bronze_to_silver.process_incremental("orders")
+    second = read_silver(fake_s3, fake_s3.silver_keys()[0])
+    assert sorted(second["order_id"]) == ["O2", "O3"]
+    assert (second["total_amount"] == 20.0).all()
+    fake_s3.objects = {k: v for k, v in fake_s3.objects.items() if "clean" not in k[1]}
+
+    # Same bronze content again: nothing new reaches silver
+    put_orders(fake_s3, "order_4", ["O1"])
+    transform_bronze_to_silver.process_incremental("orders")
+    assert fake_s3.silver_keys() == []
+
+
+class FakeGlue:
+    """Records the partitions a registrar creates"""
+
+    class exceptions:
+        class EntityNotFoundException(Exception):
+            pass
+
+    def __init__(self):
+        self.partitions = []
+
+    def get_table(self, DatabaseName, Name):
+        return {"Table": {"StorageDescriptor": {"Location": f"s3://bucket/{Name}/"}}}
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        for partition in PartitionInputList:
+            self.partitions.append(
+                (
+                    TableName,
+                    partition["Values"],
+                    partition["StorageDescriptor"]["Location"],
+                )
+            )
+        return {}
+
+
+def test_silver_is_partitioned_by_event_time(fake_s3, monkeypatch, tmp_path):
+    """Test orders land in their order-date partitions, late ones included"""
+    from glue_partitions import PartitionRegistrar
+    from partition_catalog import PartitionCatalog
+
+    catalog = PartitionCatalog(str(tmp_path / "catalog.db"))
+    glue = FakeGlue()
+    monkeypatch.setattr(transform_bronze_to_silver, "catalog", catalog)
+    monkeypatch.setattr(
+        transform_bronze_to_silver, "glue_partitions", PartitionRegistrar(glue, "db")
+    )
+
+    df = pd.DataFrame(
+        {
+            "order_id": ["O1", "O2", "O3"],
+            "customer_id": "C1",
+            "product_id": "P1",
+            "total_amount": 10.0,
+            "quantity": 1,
+            "order_date": [
+                "2025-01-27T10:00:00",
+                "2025-01-26T23:59:00",
+                "2024-12-31T08:00:00",
+            ],
+            "status": "pending",
+        }
+    )
+    keys = transform_bronze_to_silver.write_silver(
+        "orders", transform_bronze_to_silver.transform_orders(df)
+    )
+
+    partitions = [key.rsplit("/", 1)[0] for key in keys]
+    assert partitions == [
+        "orders_clean/year=2024/month=12/day=31",
+        "orders_clean/year=2025/month=01/day=26",
+        "orders_clean/year=2025/month=01/day=27",
+    ]
+    assert len({key.rsplit("/", 1)[1] for key in keys}) == 1
+    assert [read_silver(fake_s3, key)["order_id"].tolist() for key in keys] == [
+        ["O3"],
+        ["O2"],
+        ["O1"],
+    ]
+
+    in_january = catalog.in_range(
+        "silver", "orders_clean", date(2025, 1, 1), date(2025, 1, 31)
+    )
+    assert [entry["day"] for entry in in_january] == [26, 27]
+    assert glue.partitions[0] == (
+        "orders_clean",
+        ["2024", "12", "31"],
+        f"s3://{transform_bronze_to_silver.SILVER_BUCKET}/orders_clean/year=2024/month=12/day=31/",
+    )
+    assert len(glue.partitions) == 3
@@ -0,0 +1,249 @@
+"""
+Tests for incremental silver → gold aggregation
+"""
+
+import sys
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.append("src/processing")
+
+import compact_partitions  # noqa: E402
+import transform_silver_to_gold  # noqa: E402
+from object_store import MemoryStore  # noqa: E402
+from schema_registry import conform_dataframe  # noqa: E402
+
+SILVER = transform_silver_to_gold.SILVER_BUCKET
+GOLD = transform_silver_to_gold.GOLD_BUCKET
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryStore()
+    monkeypatch.setattr(transform_silver_to_gold, "store", store)
+    monkeypatch.setattr(transform_silver_to_gold, "catalog", None)
+    monkeypatch.setattr(transform_silver_to_gold, "glue_partitions", None)
+    return store
+
+
+def put_silver_orders(store, run, rows):
+    df = pd.DataFrame(
+        rows,
+        columns=["order_id", "customer_id", "product_id", "order_date", "total_amount"],
+    )
+    df["order_date"] = pd.to_datetime(df["order_date"])
+    df["quantity"] = 2
+    df["_ingestion_timestamp"] = pd.to_datetime(run, format="%Y%m%d_%H%M%S")
+    buffer = BytesIO()
+    pq.write_table(conform_dataframe(df, "silver", "orders_clean"), buffer)
+    key = f"orders_clean/year=2025/month=01/day=27/orders_clean_{run}.parquet"
+    store.put(SILVER, key, buffer.getvalue())
+    return df
+
+
+def read_gold(store, table):
+    keys = [
+        key
+        for bucket, key in store.objects
+        if bucket == GOLD and key.startswith(f"{table}/")
+    ]
+    frames = [pd.read_parquet(BytesIO(store.get(GOLD, key))) for key in keys]
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_incremental_runs_match_full_aggregation(store):
+    """Test merged deltas (with a changed order) equal a full recomputation"""
+    first = put_silver_orders(
+        store,
+        "20250127_100000",
+        [
+            ("O1", "C1", "P1", "2025-01-27 10:00", 10.0),
+            ("O2", "C2", "P1", "2025-01-27 11:00", 20.0),
+            ("O3", "C1", "P2", "2025-02-03 09:00", 30.0),
+        ],
+    )
+    transform_silver_to_gold.main(mode="incremental")
+
+    # Nothing new: no state change
+    manifest = store.get(GOLD, "_state/manifest.json")
+    transform_silver_to_gold.main(mode="incremental")
+    assert store.get(GOLD, "_state/manifest.json") == manifest
+
+    # O2 changes customer and amount; O1 (C1's first order) moves later in
+    # its month; O4 is new
+    second = put_silver_orders(
+        store,
+        "20250128_100000",
+        [
+            ("O1", "C1", "P1", "2025-01-29 10:00", 10.0),
+            ("O2", "C3", "P2", "2025-01-27 11:00", 25.0),
+            ("O4", "C1", "P1", "2025-01-28 12:00", 5.0),
+        ],
+    )
+    transform_silver_to_gold.main(mode="incremental")
+
+    orders = pd.concat([first, second]).drop_duplicates("order_id", keep="last")
+    expected_daily = transform_silver_to_gold.create_daily_sales_summary(orders)
+    expected_ltv = transform_silver_to_gold.create_customer_ltv(orders)
+    expected_products = transform_silver_to_gold.create_product_performance(
+        orders, None
+    )
+
+    daily = read_gold(store, "daily_sales_summary").sort_values("order_date")
+    assert daily["order_date"].tolist() == expected_daily["order_date"].tolist()
+    for column in ["total_orders", "unique_customers", "total_units_sold"]:
+        assert daily[column].tolist() == expected_daily[column].tolist()
+    assert daily["total_revenue"].tolist() == pytest.approx(
+        expected_daily["total_revenue"].tolist()
+    )
+
+    ltv = read_gold(store, "customer_lifetime_value").set_index("customer_id")
+    expected_ltv = expected_ltv.set_index("customer_id")
+    assert sorted(ltv.index) == sorted(expected_ltv.index) == ["C1", "C3"]
+    assert ltv.loc["C1", "first_order_date"] == pd.Timestamp("2025-01-28 12:00")
+    for column in [
+        "total_orders",
+        "lifetime_value",
+        "first_order_date",
+        "last_order_date",
+    ]:
+        assert (ltv[column].sort_index() == expected_ltv[column].sort_index()).all()
+
+    products = read_gold(store, "product_performance").set_index("product_id")
+    expected_products = expected_products.set_index("product_id")
+    for column in ["times_ordered", "units_sold", "total_revenue"]:
+        assert products[column].sort_index().tolist() == pytest.approx(
+            expected_products[column].sort_index().tolist()
+        )
+
+
+def test_orders_compacted_before_gold_merged_them_are_not_lost(store, monkeypatch):
+    """Test a compacted silver file is still read, without double counting"""
+    monkeypatch.setattr(compact_partitions, "store", store)
+    monkeypatch.setattr(compact_partitions, "catalog", None)
+    monkeypatch.setattr(compact_partitions, "MIN_AGE_MINUTES", 0)
+
+    put_silver_orders(
+        store, "20250127_100000", [("O1", "C1", "P1", "2025-01-27 10:00", 10.0)]
+    )
+    transform_silver_to_gold.main(mode="incremental")
+    put_silver_orders(
+        store, "20250127_110000", [("O2", "C2", "P1", "2025-01-27 11:00", 20.0)]
+    )
+    put_silver_orders(
+        store, "20250127_120000", [("O3", "C3", "P1", "2025-01-27 12:00", 30.0)]
+    )
+    compact_partitions.main(layers=("silver",))
+    transform_silver_to_gold.main(mode="incremental")
+
+    daily = read_gold(store, "daily_sales_summary")
+    assert daily["total_orders"].tolist() == [3]
+    assert daily["total_revenue"].tolist() == [60.0]
+
+
+def test_runs_rewrite_only_the_buckets_they_change(store, monkeypatch):
+    """Test a small delta loads one ledger month and rewrites one bucket"""
+    monkeypatch.setattr(transform_silver_to_gold, "GOLD_STATE_BUCKETS", 8)
+    put_silver_orders(
+        store,
+        "20250127_100000",
+        [(f"O{i}", f"C{i}", f"P{i}", "2025-01-27 10:00", 1.0) for i in range(40)]
+        + [("O99", "C99", "P99", "2024-12-01 10:00", 1.0)],
+    )
+    transform_silver_to_gold.main(mode="incremental")
+    ltv_files = {key for _, key in store.objects if "customer_lifetime" in key}
+    assert len(ltv_files) == 8
+
+    written = []
+    put = store.put
+
+    def recording_put(bucket, key, *args, **kwargs):
+        written.append(key)
+        put(bucket, key, *args, **kwargs)
+
+    monkeypatch.setattr(store, "put", recording_put)
+    put_silver_orders(
+        store, "20250128_100000", [("O1", "C1", "P1", "2025-01-27 10:00", 2.0)]
+    )
+    transform_silver_to_gold.main(mode="incremental")
+
+    rewritten = [key for key in written if not key.startswith("_state/manifest")]
+    assert len([key for key in rewritten if "customer_lifetime" in key]) == 1
+    assert len([key for key in rewritten if "product_performance" in key]) == 1
+    state = [key for key in rewritten if key.startswith("_state/orders/")]
+    assert state == [key for key in state if "year=2025/month=01" in key]
+    assert read_gold(store, "customer_lifetime_value")["lifetime_value"].sum() == 42
+
+
+def test_full_runs_keep_the_latest_version_of_each_order(store):
+    """Test an order changed within a silver run is aggregated once"""
+    df = pd.DataFrame(
+        {
+            "order_id": ["O1", "O2", "O1"],
+            "customer_id": ["C1", "C2", "C1"],
+            "product_id": ["P1", "P1", "P1"],
+            "order_date": pd.to_datetime(["2025-01-27 10:00"] * 3),
+            "total_amount": [10.0, 20.0, 15.0],
+            "quantity": [1, 1, 3],
+            "_ingestion_timestamp": pd.to_datetime(
+                ["2025-01-27 10:05", "2025-01-27 10:05", "2025-01-27 10:30"]
+            ),
+        }
+    )
+    buffer = BytesIO()
+    pq.write_table(conform_dataframe(df, "silver", "orders_clean"), buffer)
+    key = "orders_clean/year=2025/month=01/day=27/orders_clean_20250127_110000.parquet"
+    store.put(SILVER, key, buffer.getvalue())
+
+    transform_silver_to_gold.main(mode="full")
+
+    daily = read_gold(store, "daily_sales_summary")
+    assert daily["total_orders"].tolist() == [2]
+    assert daily["total_revenue"].tolist() == [35.0]
+    assert daily["total_units_sold"].tolist() == [4]
+
+
+def test_full_runs_replace_partitions_and_read_every_run(store, monkeypatch):
+    """Test full runs on different days aggregate all runs into one file each"""
+
+    class RunDay(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2025, 2, day)
+
+    monkeypatch.setattr(transform_silver_to_gold, "datetime", RunDay)
+    put_silver_orders(
+        store,
+        "20250127_100000",
+        [
+            ("O1", "C1", "P1", "2025-01-27 10:00", 10.0),
+            ("O2", "C2", "P1", "2025-01-27 11:00", 20.0),
+        ],
+    )
+    day = 1
+    transform_silver_to_gold.main(mode="full")
+
+    # The next run only holds a new order and a changed one
+    put_silver_orders(
+        store,
+        "20250201_100000",
+        [
+            ("O1", "C1", "P1", "2025-01-27 10:00", 15.0),
+            ("O3", "C1", "P2", "2025-01-27 12:00", 30.0),
+        ],
+    )
+    day = 2
+    transform_silver_to_gold.main(mode="full")
+
+    for table in ["daily_sales_summary", "customer_lifetime_value"]:
+        keys = [key for _, key in store.objects if key.startswith(f"{table}/")]
+        assert len(keys) == 1 and keys[0].endswith("_20250202.parquet")
+    daily = read_gold(store, "daily_sales_summary")
+    assert daily["total_orders"].tolist() == [3]
+    assert daily["total_revenue"].tolist() == [65.0]
+    ltv = read_gold(store, "customer_lifetime_value").set_index("customer_id")
+    assert ltv.loc["C1", "lifetime_value"] == 45.0
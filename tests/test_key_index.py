@@ -0,0 +1,70 @@
+"""
+Tests for the cross-file primary-key index
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.append("src/common")
+sys.path.append("src/processing")
+
+from key_index import (  # noqa: E402
+    KeyIndex,
+    fingerprint_rows,
+    fingerprint_table,
+    hash_values,
+)
+from schema_registry import conform_table  # noqa: E402
+
+
+def make_index(store):
+    return KeyIndex(store.get, store.__setitem__, num_partitions=4)
+
+
+def upsert(index, keys, amounts, ingested_at):
+    df = pd.DataFrame({"order_id": keys, "total_amount": amounts})
+    return index.upsert(
+        hash_values(df["order_id"]),
+        fingerprint_rows(df),
+        np.array(ingested_at, dtype=np.int64),
+    )
+
+
+def test_upsert_keeps_new_and_changed_versions():
+    """Test new and changed keys are written, unchanged and stale ones dropped"""
+    store = {}
+    index = make_index(store)
+
+    written = upsert(index, ["O1", "O2", "O3"], [1.0, 2.0, 3.0], [100, 100, 100])
+    assert written.tolist() == [True, True, True]
+    assert index.save() > 0
+
+    # Reloaded from the store: unchanged, changed, stale change and a new key
+    index = make_index(store)
+    written = upsert(
+        index, ["O1", "O2", "O3", "O4"], [1.0, 5.0, 9.0, 4.0], [200, 200, 50, 200]
+    )
+    assert written.tolist() == [False, True, False, True]
+    assert len(index) == 4
+
+    index.save()
+    written = upsert(make_index(store), ["O2"], [5.0], [300])
+    assert written.tolist() == [False]
+
+
+def test_fingerprints_ignore_the_batch_dtype():
+    """Test a row fingerprints alike whether its batch made ints floats"""
+
+    def fingerprints(df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        return fingerprint_table(conform_table(table, "bronze", "orders", False))
+
+    with_nulls = pd.DataFrame({"order_id": ["O1", "O2"], "quantity": [3, None]})
+    without = pd.DataFrame({"order_id": ["O1"], "quantity": [3]})
+    assert with_nulls["quantity"].dtype != without["quantity"].dtype
+
+    assert fingerprints(with_nulls)[0] == fingerprints(without)[0]
+    assert fingerprints(with_nulls)[1] != fingerprints(without)[0]
@@ -0,0 +1,89 @@
+"""
+Tests for the object store backends
+"""
+
+import sys
+from io import BytesIO
+
+import pytest
+
+sys.path.append("src/common")
+
+from object_store import LocalStore, MemoryStore, ObjectNotFound  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "local"])
+def store(request, tmp_path):
+    if request.param == "local":
+        return LocalStore(str(tmp_path))
+    return MemoryStore()
+
+
+def test_put_get_and_ranges(store):
+    """Test whole and ranged reads, and missing objects"""
+    store.put("bronze", "orders/year=2025/a.parquet", b"0123456789")
+
+    assert store.get("bronze", "orders/year=2025/a.parquet") == b"0123456789"
+    assert store.get_range("bronze", "orders/year=2025/a.parquet", 2, 5) == b"234"
+    assert store.size("bronze", "orders/year=2025/a.parquet") == 10
+    assert store.open("bronze", "orders/year=2025/a.parquet").read(4) == b"0123"
+    with pytest.raises(ObjectNotFound):
+        store.get("bronze", "orders/missing.parquet")
+    with pytest.raises(ObjectNotFound):
+        store.get("silver", "orders/year=2025/a.parquet")
+
+    store.copy("bronze", "orders/year=2025/a.parquet", "_staging/a.parquet")
+    assert store.get("bronze", "_staging/a.parquet") == b"0123456789"
+    with pytest.raises(ObjectNotFound):
+        store.copy("bronze", "orders/missing.parquet", "_staging/b.parquet")
+
+
+def test_list_is_in_key_order_after_start_key(store):
+    """Test listings filter by prefix and StartAfter like S3"""
+    keys = [
+        "orders/year=2025/month=01/day=27/b.parquet",
+        "orders/year=2025/month=01/day=26/a.parquet",
+        "orders/year=2025/month=01/day=27/a.parquet",
+        "orders_x.parquet",
+        "products/year=2025/month=01/day=27/a.parquet",
+    ]
+    for key in keys:
+        store.put("bronze", key, b"x")
+
+    listed = [obj["Key"] for obj in store.list("bronze", "orders/")]
+    assert listed == sorted(keys[:3])
+
+    after = store.list(
+        "bronze", "orders/", start_after="orders/year=2025/month=01/day=27/"
+    )
+    assert [obj["Key"] for obj in after] == sorted(keys[:3])[1:]
+
+    first = next(iter(store.list("bronze", "orders/year=2025/month=01/day=2")))
+    assert first["Size"] == 1
+    assert first["LastModified"].tzinfo is not None
+
+    store.delete("bronze", keys[:2] + ["never-written"])
+    assert [obj["Key"] for obj in store.list("bronze", "orders")] == keys[2:4]
+
+
+def test_upload_file_in_parts(store):
+    """Test large uploads go through multipart and small ones don't"""
+    data = bytes(range(256)) * 40
+    store.upload_file(BytesIO(data), "silver", "big.parquet", part_size=1000)
+    store.upload_file(BytesIO(b"small"), "silver", "small.parquet", part_size=1000)
+
+    assert store.get("silver", "big.parquet") == data
+    assert store.get("silver", "small.parquet") == b"small"
+    assert [obj["Key"] for obj in store.list("silver")] == [
+        "big.parquet",
+        "small.parquet",
+    ]
+
+
+def test_aborted_multipart_upload_leaves_no_object(store):
+    """Test an aborted upload is never visible"""
+    upload_id = store.create_multipart("silver", "partial.parquet")
+    store.upload_part("silver", "partial.parquet", upload_id, 1, b"part")
+    store.abort_multipart("silver", "partial.parquet", upload_id)
+
+    assert list(store.list("silver")) == []
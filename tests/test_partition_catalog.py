@@ -0,0 +1,145 @@
+"""
+Unit tests for the partition catalog
+"""
+
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import pyarrow as pa
+import pytest
+
+sys.path.append("src/common")
+
+from object_store import MemoryStore  # noqa: E402
+from partition_catalog import (  # noqa: E402
+    CatalogMismatch,
+    PartitionCatalog,
+    open_catalog,
+    partition_bounds,
+)
+
+T0 = datetime(2025, 1, 27, 10, 0, tzinfo=timezone.utc)
+
+
+def make_catalog(tmp_path):
+    catalog = PartitionCatalog(str(tmp_path / "catalog.db"))
+    for day in range(1, 4):
+        catalog.record(
+            "silver",
+            "orders_clean",
+            "silver-bucket",
+            f"orders_clean/year=2025/month=01/day={day:02d}/part.parquet",
+            size_bytes=100 * day,
+            row_count=day,
+            stats={"total_amount": (day * 10.0, day * 10.0 + 5)},
+            written_at=T0 + timedelta(hours=day),
+        )
+    return catalog
+
+
+def test_latest_and_since(tmp_path):
+    """Test latest-file and written-since lookups"""
+    catalog = make_catalog(tmp_path)
+
+    assert catalog.latest("silver", "orders_clean")["day"] == 3
+    assert catalog.latest("silver", "customers_clean") is None
+    since = catalog.files("silver", "orders_clean", since=T0 + timedelta(hours=1))
+    assert [entry["day"] for entry in since] == [2, 3]
+
+
+def test_range_and_stats_lookups(tmp_path):
+    """Test partition range and column min/max overlap lookups"""
+    catalog = make_catalog(tmp_path)
+
+    in_range = catalog.in_range(
+        "silver", "orders_clean", date(2025, 1, 2), date(2025, 1, 31)
+    )
+    assert [entry["day"] for entry in in_range] == [2, 3]
+
+    overlapping = catalog.overlapping("silver", "orders_clean", "total_amount", 12, 22)
+    assert [entry["day"] for entry in overlapping] == [1, 2]
+
+
+def test_record_table_stats_and_month_partitions(tmp_path):
+    """Test stats come from the table and month partitions cover the month"""
+    catalog = PartitionCatalog(str(tmp_path / "catalog.db"))
+    table = pa.table(
+        {"order_date": [date(2025, 2, 3), date(2025, 2, 9)], "id": ["a", "b"]}
+    )
+    key = "daily_sales_summary/year=2025/month=02/summary.parquet"
+
+    catalog.record_table("gold", "daily_sales_summary", "gold-bucket", key, table, 10)
+
+    assert catalog.column_stats("gold", key) == {
+        "order_date": ("2025-02-03", "2025-02-09")
+    }
+    assert partition_bounds({"year": 2025, "month": 2}) == ("2025-02-01", "2025-02-28")
+    assert (
+        len(
+            catalog.in_range(
+                "gold", "daily_sales_summary", date(2025, 2, 28), date(2025, 3, 5)
+            )
+        )
+        == 1
+    )
+
+
+def test_latest_run_is_the_newest_run_and_its_siblings(tmp_path):
+    """Test the newest non-compacted run's files, matched by exact file name"""
+    catalog = PartitionCatalog(str(tmp_path / "catalog.db"))
+
+    def record(key, hours):
+        catalog.record(
+            "silver",
+            "orders_clean",
+            "silver-bucket",
+            f"orders_clean/year=2025/month=01/{key}",
+            written_at=T0 + timedelta(hours=hours),
+        )
+
+    record("day=26/orders_clean_20250127_100000.parquet", 0)
+    record("day=26/orders_clean_20250127_110000.parquet", 1)
+    record("day=27/orders_clean_20250127_110000.parquet", 1)
+    # "_" isn't a wildcard: only the exact name matches
+    record("day=27/orders_clean_20250127x110000.parquet", 0)
+    # Compaction outputs carry the time of their newest input
+    record("day=26/compacted-run1-0000.parquet", 2)
+
+    keys = [entry["key"] for entry in catalog.latest_run("silver", "orders_clean")]
+    assert keys == [
+        "orders_clean/year=2025/month=01/day=26/orders_clean_20250127_110000.parquet",
+        "orders_clean/year=2025/month=01/day=27/orders_clean_20250127_110000.parquet",
+    ]
+    assert catalog.latest_run("silver", "customers_clean") == []
+
+    cursor = catalog.conn.cursor()
+    cursor.row_factory = None
+    plan = cursor.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM files WHERE layer = ? AND dataset = ? "
+        "AND key NOT LIKE ? ORDER BY written_at DESC, key DESC LIMIT 1",
+        ("silver", "orders_clean", "%/compacted-%"),
+    ).fetchall()
+    assert "files_by_time" in str(plan)
+
+
+def test_a_second_catalog_for_a_bucket_fails_loudly(tmp_path):
+    """Test that a catalog refuses buckets recorded in another catalog"""
+    store = MemoryStore()
+    path = str(tmp_path / "shared.db")
+    writer = open_catalog(path, store=store, buckets=["bronze-bucket"])
+    writer.record("bronze", "orders", "bronze-bucket", "orders/a.parquet")
+
+    # The same catalog file, from another process or container, is accepted
+    reader = open_catalog(path, store=store, buckets=["bronze-bucket"])
+    assert [entry["key"] for entry in reader.files("bronze", "orders")] == [
+        "orders/a.parquet"
+    ]
+
+    # A container-local catalog would miss the writer's objects
+    local = open_catalog(
+        str(tmp_path / "local.db"), store=store, buckets=["bronze-bucket"]
+    )
+    with pytest.raises(CatalogMismatch):
+        local.files("bronze", "orders")
+    with pytest.raises(CatalogMismatch):
+        local.files("bronze", "orders")
@@ -0,0 +1,48 @@
+"""
+Unit tests for the shared structured logging helpers
+"""
+
+import json
+import logging
+import sys
+
+sys.path.append("src/common")
+
+from pipeline_logging import BatchLog, StructuredFormatter, capped  # noqa: E402
+
+
+def test_capped_payload_is_truncated():
+    """Test large payloads are shrunk and capped when logged"""
+    payload = {"body": "x" * 100000, "records": list(range(1000))}
+
+    text = str(capped(payload, max_chars=500))
+
+    assert len(text) <= 500 + len("...(truncated)")
+    assert "(+" in text
+
+
+def test_batch_log_samples_repetitive_warnings(caplog):
+    """Test only the first N warnings are logged and the rest are counted"""
+    logger = logging.getLogger("test_batch_log")
+    batch = BatchLog(logger, "order validation", sample_first=3)
+
+    with caplog.at_level(logging.INFO, logger="test_batch_log"):
+        for idx in range(10):
+            batch.warning("invalid", "Invalid record at index %d", idx)
+        summary = batch.summary(valid=5)
+
+    warnings = [r for r in caplog.records if r.levelno == logging.WARNING]
+    assert len(warnings) == 3
+    assert summary == {"valid": 5, "invalid": 10, "suppressed_warnings": {"invalid": 7}}
+    assert "order validation summary" in caplog.records[-1].getMessage()
+
+
+def test_structured_formatter_includes_fields():
+    """Test JSON output carries summary fields"""
+    record = logging.LogRecord("x", logging.INFO, "", 0, "done %d", (3,), None)
+    record.fields = {"rows": 3}
+
+    entry = json.loads(StructuredFormatter().format(record))
+
+    assert entry["message"] == "done 3"
+    assert entry["rows"] == 3
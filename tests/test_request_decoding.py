@@ -0,0 +1,127 @@
+"""
+Tests for ingestion API request body decoding
+"""
+
+import base64
+import gzip
+import json
+import sys
+
+import pytest
+
+sys.path.append("src/ingestion")
+
+import request_decoding  # noqa: E402
+from request_decoding import (  # noqa: E402
+    BodyDecodeError,
+    BodyTooLarge,
+    iter_api_batches,
+    parse_api_request,
+)
+
+RECORDS = [{"order_id": f"O{i}", "total_amount": 10.5} for i in range(3)]
+DOCUMENT = json.dumps({"data_type": "order", "records": RECORDS}).encode("utf-8")
+NDJSON = b"".join(json.dumps(r).encode("utf-8") + b"\n\n" for r in RECORDS)
+
+
+def base64_event(data, **extra):
+    body = base64.b64encode(data).decode("ascii")
+    return dict(body=body, isBase64Encoded=True, **extra)
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        {"body": DOCUMENT.decode("utf-8")},
+        base64_event(DOCUMENT),
+        # gzip from the header, and from the magic bytes alone
+        base64_event(gzip.compress(DOCUMENT), headers={"Content-Encoding": "gzip"}),
+        base64_event(gzip.compress(DOCUMENT)),
+        {"body": gzip.compress(DOCUMENT)},
+    ],
+)
+def test_json_documents_in_every_encoding(event):
+    """Test plain, base64 and gzip bodies decode to the same records"""
+    assert parse_api_request(event) == ("order", RECORDS)
+
+
+def test_ndjson_bodies():
+    """Test NDJSON (blank lines skipped) takes its data type from the request"""
+    event = base64_event(
+        gzip.compress(NDJSON),
+        headers={"Content-Type": "application/x-ndjson; charset=utf-8"},
+        queryStringParameters={"data_type": "order"},
+    )
+    assert parse_api_request(event) == ("order", RECORDS)
+
+    event = {
+        "body": NDJSON.decode("utf-8"),
+        "headers": {"content-type": "application/jsonl", "X-Data-Type": "event"},
+    }
+    assert parse_api_request(event) == ("event", RECORDS)
+
+
+def test_zstd_bodies():
+    """Test zstd bodies decode, or fail cleanly without zstandard"""
+    try:
+        import zstandard
+    except ImportError:
+        event = base64_event(b"\x28\xb5\x2f\xfd" + b"\x00" * 8)
+        with pytest.raises(BodyDecodeError, match="zstandard"):
+            parse_api_request(event)
+        return
+    compressed = zstandard.ZstdCompressor().compress(DOCUMENT)
+    assert parse_api_request(base64_event(compressed)) == ("order", RECORDS)
+
+
+def test_invalid_bodies_are_rejected():
+    """Test corrupt base64/compression and unknown encodings raise BodyDecodeError"""
+    with pytest.raises(BodyDecodeError):
+        parse_api_request({"body": "not base64!", "isBase64Encoded": True})
+    with pytest.raises(BodyDecodeError):
+        parse_api_request(base64_event(b"\x1f\x8bnot-gzip"))
+    with pytest.raises(BodyDecodeError, match="Unsupported"):
+        parse_api_request({"body": "{}", "headers": {"Content-Encoding": "br"}})
+    # Not a JSON object: no records
+    assert parse_api_request({"body": "[1, 2]"}) == (None, [])
+    assert parse_api_request({}) == (None, [])
+
+
+def test_decoded_size_is_bounded(monkeypatch):
+    """Test bodies expanding past MAX_DECODED_BYTES raise BodyTooLarge"""
+    monkeypatch.setattr(request_decoding, "MAX_DECODED_BYTES", len(DOCUMENT))
+    assert parse_api_request(base64_event(gzip.compress(DOCUMENT)))[1] == RECORDS
+
+    bomb = gzip.compress(DOCUMENT + b" " * 100_000)
+    with pytest.raises(BodyTooLarge):
+        parse_api_request(base64_event(bomb))
+    with pytest.raises(BodyTooLarge):
+        parse_api_request({"body": DOCUMENT + b" "})
+
+
+def test_ndjson_is_decoded_in_batches():
+    """Test NDJSON batches are parsed lazily, batch_rows records at a time"""
+    event = {
+        "body": NDJSON + b"not json\n",
+        "headers": {"content-type": "application/x-ndjson"},
+        "queryStringParameters": {"data_type": "order"},
+    }
+    data_type, batches = iter_api_batches(event, batch_rows=2)
+
+    assert data_type == "order"
+    assert next(batches) == RECORDS[:2]
+    with pytest.raises(json.JSONDecodeError):
+        next(batches)
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_stdlib_fallback_decodes_the_same(monkeypatch, fast):
+    """Test decoding with and without the fast JSON decoder"""
+    if fast:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(request_decoding, "_fast_loads", None)
+    assert parse_api_request({"body": DOCUMENT}) == ("order", RECORDS)
+    # Both decoders raise the stdlib's error type on bad JSON
+    with pytest.raises(json.JSONDecodeError):
+        parse_api_request({"body": '{"records": ['})
@@ -0,0 +1,152 @@
+"""
+Tests for the sales cube and slicing it
+"""
+
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append("src/processing")
+
+import transform_silver_to_gold  # noqa: E402
+from object_store import MemoryStore  # noqa: E402
+from sales_cube import build_cube, grouping_id, load_cube, slice_cube  # noqa: E402
+from test_incremental_gold import put_silver_orders  # noqa: E402
+
+
+def make_orders(n=2000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "order_id": [f"O{i}" for i in range(n)],
+            "customer_id": rng.choice(["C1", "C2", "C3", None], n),
+            "product_id": rng.choice(["P1", "P2", "P3"], n),
+            "order_date": pd.Timestamp("2025-01-30")
+            + pd.to_timedelta(rng.integers(0, 5 * 24 * 60, n), unit="min"),
+            "payment_method": rng.choice(["credit_card", "paypal", None], n),
+            "status": rng.choice(["delivered", "cancelled"], n),
+            "quantity": rng.integers(1, 4, n),
+            "total_amount": rng.uniform(5, 100, n).round(2),
+        }
+    )
+
+
+PRODUCTS = pd.DataFrame(
+    {"product_id": ["P1", "P2"], "category": ["Books", "Electronics"]}
+)
+
+
+def test_slices_match_aggregating_the_orders():
+    """Test any slice of the cube equals the same aggregation of raw orders"""
+    orders = make_orders()
+    cube = build_cube(orders, PRODUCTS)
+    raw = orders.assign(
+        order_date=orders["order_date"].dt.date,
+        category=orders["product_id"].map(PRODUCTS.set_index("product_id")["category"]),
+    ).fillna({"category": "unknown", "payment_method": "unknown"})
+
+    by_category = slice_cube(cube, by=["category"], where={"status": "delivered"})
+    delivered = raw[raw["status"] == "delivered"]
+    expected = delivered.groupby("category")["total_amount"].sum()
+    assert by_category["category"].tolist() == ["Books", "Electronics", "unknown"]
+    assert by_category["revenue"].to_numpy() == pytest.approx(expected.to_numpy())
+
+    start, end = date(2025, 1, 31), date(2025, 2, 2)
+    in_range = raw[(raw["order_date"] >= start) & (raw["order_date"] <= end)]
+    total = slice_cube(cube, start_date=start, end_date=end)
+    assert total["orders"].tolist() == [len(in_range)]
+    assert total["units_sold"].tolist() == [in_range["quantity"].sum()]
+
+    # Answered from the finest grain: two non-date dimensions
+    sliced = slice_cube(
+        cube,
+        by=["order_date", "payment_method"],
+        where={"category": ["Books", "unknown"]},
+    )
+    books = raw[raw["category"].isin(["Books", "unknown"])]
+    expected = books.groupby(["order_date", "payment_method"]).size()
+    assert sliced["orders"].tolist() == expected.tolist()
+
+    with pytest.raises(ValueError):
+        slice_cube(cube, by=["region"])
+
+
+def test_orders_take_the_device_of_the_customers_last_event():
+    """Test device attribution from clickstream events"""
+    orders = make_orders(3)
+    orders["customer_id"] = ["C1", "C1", None]
+    orders["order_date"] = pd.to_datetime(
+        ["2025-01-30 10:10", "2025-01-30 12:00", "2025-01-30 10:10"]
+    )
+    events = pd.DataFrame(
+        {
+            "customer_id": ["C1", "C1"],
+            "event_timestamp": pd.to_datetime(["2025-01-30 09:00", "2025-01-30 10:00"]),
+            "device_type": ["desktop", "mobile"],
+        }
+    )
+
+    cube = build_cube(orders, None, events, timeout_minutes=30)
+    devices = slice_cube(cube, by=["device_type"])
+    assert devices.set_index("device_type")["orders"].to_dict() == {
+        "mobile": 1,
+        "unknown": 2,
+    }
+    # Every grouping set covers all orders
+    assert (cube.groupby("grouping_id")["orders"].sum() == 3).all()
+    assert grouping_id(["order_date"]) == 0b01111
+
+
+def test_cube_round_trips_through_gold(monkeypatch):
+    """Test the gold table is read back by month and sliced"""
+    store = MemoryStore()
+    monkeypatch.setattr(transform_silver_to_gold, "store", store)
+    monkeypatch.setattr(transform_silver_to_gold, "catalog", None)
+    monkeypatch.setattr(transform_silver_to_gold, "glue_partitions", None)
+
+    orders = make_orders()
+    cube = transform_silver_to_gold.create_sales_cube(orders, PRODUCTS, None)
+    transform_silver_to_gold.write_to_gold(cube, "sales_cube", replace=True)
+
+    bucket = transform_silver_to_gold.GOLD_BUCKET
+    february = load_cube(store, bucket, date(2025, 2, 1), date(2025, 2, 28))
+    assert set(pd.to_datetime(february["order_date"]).dt.month) == {2}
+
+    everything = slice_cube(load_cube(store, bucket), by=["status"])
+    assert everything["orders"].sum() == len(orders)
+    assert everything["revenue"].sum() == pytest.approx(orders["total_amount"].sum())
+
+
+def test_later_runs_rebuild_whole_months_of_the_cube(monkeypatch):
+    """Test a run's delta doesn't replace the cube of earlier runs' orders"""
+    store = MemoryStore()
+    monkeypatch.setattr(transform_silver_to_gold, "store", store)
+    monkeypatch.setattr(transform_silver_to_gold, "catalog", None)
+    monkeypatch.setattr(transform_silver_to_gold, "glue_partitions", None)
+
+    put_silver_orders(
+        store,
+        "20250127_100000",
+        [
+            ("O1", "C1", "P1", "2025-01-27 10:00", 10.0),
+            ("O2", "C2", "P1", "2025-01-27 11:00", 20.0),
+        ],
+    )
+    transform_silver_to_gold.main()
+    # The second run sends O3 and a changed O2
+    put_silver_orders(
+        store,
+        "20250128_100000",
+        [
+            ("O2", "C2", "P1", "2025-01-27 11:00", 25.0),
+            ("O3", "C3", "P2", "2025-01-28 09:00", 30.0),
+        ],
+    )
+    transform_silver_to_gold.main()
+
+    total = slice_cube(load_cube(store, transform_silver_to_gold.GOLD_BUCKET))
+    assert total["orders"].tolist() == [3]
+    assert total["revenue"].tolist() == pytest.approx([65.0])
@@ -0,0 +1,137 @@
+"""
+Unit tests for the typed Arrow schema registry
+"""
+
+import sys
+from io import BytesIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append("src/common")
+
+from schema_registry import (  # noqa: E402
+    GOLD,
+    VOCABULARIES,
+    athena_ddl,
+    athena_script,
+    categorize,
+    conform_dataframe,
+    conform_table,
+)
+
+
+def test_bronze_orders_are_typed():
+    """Test string timestamps and loose numbers get their registered types"""
+    table = pa.table(
+        {
+            "order_id": ["O1", "O2"],
+            "order_date": ["2025-01-27T10:30:00", "2025-01-27T10:30:00Z"],
+            "quantity": [1, 2],
+            "total_amount": [10, 20.5],
+            "_order_month": pa.array([1, None], type=pa.int64()),
+            "coupon_code": ["X", None],
+        }
+    )
+
+    result = conform_table(table, "bronze", "orders", fill_missing=False)
+
+    assert result.schema.field("order_date").type == pa.timestamp("ms")
+    assert result.column("order_date").null_count == 0
+    assert result.schema.field("quantity").type == pa.int32()
+    assert result.schema.field("total_amount").type == pa.float64()
+    assert result.schema.field("_order_month").type == pa.int8()
+    # Unregistered fields are kept, missing ones are not invented
+    assert result.column_names[-1] == "coupon_code"
+    assert "customer_id" not in result.column_names
+
+
+def test_unparseable_values_become_nulls():
+    """Test values that cannot be converted are nulled instead of failing"""
+    table = pa.table(
+        {
+            "order_date": ["2025-01-27", "not a date"],
+            "quantity": ["3", "three"],
+        }
+    )
+
+    result = conform_table(table, "bronze", "orders", fill_missing=False)
+
+    assert result.column("order_date").null_count == 1
+    assert result.column("quantity").to_pylist() == [3, None]
+
+
+def test_gold_tables_have_identical_schemas():
+    """Test gold writes always produce the full registered schema"""
+    df = pd.DataFrame(
+        {
+            "customer_id": ["C1"],
+            "total_orders": [3],
+            "lifetime_value": [120.0],
+            "segment": pd.Categorical(["Medium"]),
+        }
+    )
+
+    table = conform_dataframe(df, "gold", "customer_lifetime_value")
+
+    assert table.column_names == [name for name, _ in GOLD["customer_lifetime_value"]]
+    assert table.schema.field("segment").type == pa.string()
+    assert table.schema.field("days_as_customer").type == pa.int32()
+
+
+def test_athena_ddl_uses_registry_types():
+    """Test generated DDL declares Athena types and partitions"""
+    ddl = athena_ddl("gold", "daily_sales_summary", "my-bucket")
+
+    assert "order_date DATE" in ddl
+    assert "total_orders BIGINT" in ddl
+    assert "PARTITIONED BY (\n    year INT,\n    month INT\n)" in ddl
+    assert "LOCATION 's3://my-bucket/daily_sales_summary/'" in ddl
+
+
+def test_silver_script_adds_latest_version_views():
+    """Test silver DDL ends with views keeping each key's latest version"""
+    script = athena_script("silver", "my-bucket")
+
+    assert "CREATE OR REPLACE VIEW orders_latest AS" in script
+    assert "PARTITION BY order_id ORDER BY _ingestion_timestamp DESC" in script
+    assert "FROM customers_clean" in script
+    assert "VIEW" not in athena_script("gold", "my-bucket")
+
+
+def test_vocabulary_columns_round_trip_as_categoricals():
+    """Test silver vocabulary columns are dictionary-encoded in vocabulary order"""
+    df = pd.DataFrame(
+        {
+            "event_id": ["E1", "E2", "E3", "E4"],
+            "event_type": ["purchase", "bogus", None, "page_view"],
+            "device_type": categorize(
+                pd.Series(["tablet", "watch", "mobile", "tablet"]),
+                VOCABULARIES["device_type"],
+            ),
+        }
+    )
+
+    table = conform_dataframe(df, "silver", "events_clean")
+    assert pa.types.is_dictionary(table.schema.field("event_type").type)
+
+    buffer = BytesIO()
+    pq.write_table(table, buffer)
+    buffer.seek(0)
+    result = pd.read_parquet(buffer)
+
+    event_types = result["event_type"]
+    assert isinstance(event_types.dtype, pd.CategoricalDtype)
+    assert list(event_types.cat.categories) == list(VOCABULARIES["event_type"]) + [
+        "bogus"
+    ]
+    assert event_types.tolist()[:2] == ["purchase", "bogus"]
+    assert pd.isna(event_types.iloc[2])
+    assert list(result["device_type"].cat.categories) == [
+        "mobile",
+        "desktop",
+        "tablet",
+        "watch",
+    ]
+    assert result["device_type"].tolist() == ["tablet", "watch", "mobile", "tablet"]
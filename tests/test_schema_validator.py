@@ -0,0 +1,135 @@
+"""
+Tests for the columnar ingestion schema validator
+"""
+
+import random
+import sys
+
+sys.path.append("src/ingestion")
+
+from schema_validator import CompiledSchema  # noqa: E402
+
+ORDER_SCHEMA = {
+    "required_fields": ["order_id", "customer_id", "product_id", "total_amount"],
+    "types": {
+        "order_id": str,
+        "customer_id": str,
+        "product_id": str,
+        "quantity": int,
+        "total_amount": (int, float),
+    },
+    "positive_fields": ["total_amount", "quantity"],
+}
+
+_ABSENT = object()
+
+
+def validate_per_record(records, schema):
+    """Reference: the record-at-a-time loop the validator replaced"""
+    valid, invalid = [], []
+    for idx, record in enumerate(records):
+        errors = []
+        for field in schema["required_fields"]:
+            if record.get(field) is None:
+                errors.append(f"Missing required field: {field}")
+        for field, expected_type in schema["types"].items():
+            value = record.get(field)
+            if value is not None and not isinstance(value, expected_type):
+                errors.append(
+                    f"Invalid type for {field}: expected {expected_type}, "
+                    f"got {type(value)}"
+                )
+        for field in schema["positive_fields"]:
+            value = record.get(field)
+            if isinstance(value, (int, float)) and value <= 0:
+                errors.append(f"{field} must be positive")
+        if errors:
+            invalid.append({"record_index": idx, "errors": errors, "record": record})
+        else:
+            valid.append(record)
+    return valid, invalid
+
+
+def random_records(n):
+    rng = random.Random(0)
+    choices = {
+        "order_id": ["O1", None, 7, _ABSENT],
+        "customer_id": ["C1", "C2", None, _ABSENT],
+        "product_id": ["P1", b"P2", _ABSENT],
+        "quantity": [1, 3, 0, -2, True, "2", 1.5, None, _ABSENT],
+        "total_amount": [10, 9.5, 0, -1.0, "10", None, False, _ABSENT],
+        "status": ["pending", 5, _ABSENT],
+    }
+    records = []
+    for _ in range(n):
+        record = {}
+        for field, values in choices.items():
+            # Mostly valid values, so both outcomes are common
+            value = values[0] if rng.random() < 0.7 else rng.choice(values)
+            if value is not _ABSENT:
+                record[field] = value
+        records.append(record)
+    return records
+
+
+def test_matches_record_at_a_time_validation():
+    """Test the valid/invalid split and error lists equal the per-record loop"""
+    records = random_records(5000)
+    expected_valid, expected_invalid = validate_per_record(records, ORDER_SCHEMA)
+
+    valid, invalid = CompiledSchema(ORDER_SCHEMA).validate(records)
+
+    assert 0 < len(invalid) < len(records)
+    assert [id(r) for r in valid] == [id(r) for r in expected_valid]
+    assert invalid == expected_invalid
+
+
+def test_error_messages_are_built_for_failed_rows_only(monkeypatch):
+    """Test clean batches skip formatting and failed rows format once each"""
+    schema = CompiledSchema(ORDER_SCHEMA)
+    formatted = []
+    format_errors = schema._format_errors
+
+    def counting(record, idx, masks):
+        formatted.append(idx)
+        return format_errors(record, idx, masks)
+
+    monkeypatch.setattr(schema, "_format_errors", counting)
+    clean = [
+        {"order_id": f"O{i}", "customer_id": "C", "product_id": "P", "total_amount": 1}
+        for i in range(1000)
+    ]
+    valid, invalid = schema.validate(clean)
+    assert len(valid) == 1000 and invalid == [] and formatted == []
+
+    clean[10] = dict(clean[10], total_amount=-1)
+    valid, invalid = schema.validate(clean)
+    assert formatted == [10]
+    assert invalid[0]["errors"] == ["total_amount must be positive"]
+    assert schema.validate([]) == ([], [])
+
+
+def test_dates_must_be_iso_8601():
+    """Test dates bronze could not cast are rejected instead of nulled"""
+    schema = CompiledSchema(
+        {
+            "required_fields": ["customer_id"],
+            "formats": {"date_of_birth": "date", "signup_date": "timestamp"},
+        }
+    )
+    records = [
+        {"customer_id": "C1", "date_of_birth": "1990-01-02"},
+        {"customer_id": "C2", "date_of_birth": "01/02/1990"},
+        {"customer_id": "C3", "signup_date": "2025-01-27T10:00:00Z"},
+        {"customer_id": "C4", "signup_date": "2025-01-27 10:00:00.123456"},
+        {"customer_id": "C5", "date_of_birth": None, "signup_date": float("nan")},
+        {"customer_id": "C6", "signup_date": 1737972000},
+    ]
+
+    valid, invalid = schema.validate(records)
+
+    assert [record["customer_id"] for record in valid] == ["C1", "C3", "C4", "C5"]
+    assert [entry["errors"] for entry in invalid] == [
+        ["Invalid date for date_of_birth: expected ISO 8601, got '01/02/1990'"],
+        ["Invalid timestamp for signup_date: expected ISO 8601, got 1737972000"],
+    ]
@@ -0,0 +1,93 @@
+"""
+Tests for sessionization and the session_summary gold table
+"""
+
+import sys
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+sys.path.append("src/processing")
+
+import transform_silver_to_gold  # noqa: E402
+from object_store import MemoryStore  # noqa: E402
+from schema_registry import categorize, conform_dataframe  # noqa: E402
+from sessionization import summarize_sessions  # noqa: E402
+
+
+def make_events():
+    rows = [
+        ("S1", None, "page_view", "2025-01-27 10:00", "mobile"),
+        ("S1", "C1", "product_view", "2025-01-27 10:05", "mobile"),
+        ("S1", None, "add_to_cart", "2025-01-27 10:20", "mobile"),
+        # 45 minutes idle: the same session ID starts a second session
+        ("S1", None, "purchase", "2025-01-27 11:05", "desktop"),
+        ("S2", None, "page_view", "2025-01-27 09:00", "tablet"),
+        (None, "C9", "checkout_start", "2025-01-27 12:00", None),
+        # Neither a session nor a customer, or no time: not placed
+        (None, None, "page_view", "2025-01-27 12:00", "mobile"),
+        ("S3", None, "page_view", None, "mobile"),
+    ]
+    events = pd.DataFrame(
+        rows,
+        columns=[
+            "session_id",
+            "customer_id",
+            "event_type",
+            "event_timestamp",
+            "device_type",
+        ],
+    )
+    events["event_timestamp"] = pd.to_datetime(events["event_timestamp"])
+    return events
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_summarize_sessions_splits_idle_sessions(categorical):
+    """Test sessions are split on inactivity and carry funnel flags"""
+    events = make_events()
+    if categorical:
+        events["event_type"] = categorize(
+            events["event_type"], ("page_view", "add_to_cart", "purchase")
+        )
+
+    sessions = summarize_sessions(events, timeout_minutes=30)
+    sessions = sessions.set_index(["session_id", "session_seq"])
+
+    assert len(sessions) == 4
+    first = sessions.loc[("S1", 1)]
+    assert first["event_count"] == 3
+    assert first["duration_seconds"] == 20 * 60
+    assert first["page_views"] == 1 and first["product_views"] == 1
+    assert first["reached_cart"] and not first["purchased"]
+    assert first["customer_id"] == "C1"
+    assert first["device_type"] == "mobile"
+
+    second = sessions.loc[("S1", 2)]
+    assert second["purchased"] and not second["reached_cart"]
+    assert second["device_type"] == "desktop"
+
+    # Events without a session ID are sessionized by customer
+    assert sessions.loc[("C9", 1), "reached_checkout"]
+    assert sessions.loc[("S2", 1), "customer_id"] is None
+
+
+def test_session_summary_is_written_by_month_of_session_start(monkeypatch):
+    """Test gold writes the summary under the month its sessions started"""
+    store = MemoryStore()
+    monkeypatch.setattr(transform_silver_to_gold, "store", store)
+    monkeypatch.setattr(transform_silver_to_gold, "catalog", None)
+    monkeypatch.setattr(transform_silver_to_gold, "glue_partitions", None)
+
+    sessions = transform_silver_to_gold.create_session_summary(make_events())
+    transform_silver_to_gold.write_to_gold(sessions, "session_summary")
+
+    (key,) = [key for _, key in store.objects]
+    assert key.startswith("session_summary/year=2025/month=01/")
+    written = pd.read_parquet(
+        BytesIO(store.get(transform_silver_to_gold.GOLD_BUCKET, key))
+    )
+    expected = conform_dataframe(sessions, "gold", "session_summary")
+    assert written.columns.tolist() == expected.column_names
+    assert written["event_count"].sum() == 6
@@ -0,0 +1,113 @@
+"""
+Tests for the projected, date-filtered silver reader used by gold
+"""
+
+import sys
+from datetime import date
+from io import BytesIO
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.append("src/processing")
+
+import transform_silver_to_gold  # noqa: E402
+from object_store import S3Store  # noqa: E402
+from schema_registry import conform_dataframe  # noqa: E402
+from test_incremental import FakeS3  # noqa: E402
+
+SILVER = transform_silver_to_gold.SILVER_BUCKET
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(transform_silver_to_gold, "store", S3Store(fake))
+    return fake
+
+
+def put_silver_orders(fake, day, order_dates):
+    df = pd.DataFrame(
+        {
+            "order_id": [f"O{day}-{i}" for i in range(len(order_dates))],
+            "customer_id": "C1",
+            "product_id": "P1",
+            "order_date": pd.to_datetime(order_dates),
+            "quantity": 1,
+            "total_amount": 10.0,
+            "shipping_address": "1 Long Street, Springfield",
+        }
+    )
+    buffer = BytesIO()
+    table = conform_dataframe(df, "silver", "orders_clean")
+    pq.write_table(table, buffer, row_group_size=4)
+    key = f"orders_clean/year=2025/month=01/day={day:02d}/orders_clean_20250201_000000.parquet"
+    fake.put_object(Bucket=SILVER, Key=key, Body=buffer.getvalue())
+
+
+def test_read_latest_projects_columns_and_prunes_dates(fake_s3):
+    """Test only requested columns and matching partitions/row groups are read"""
+    put_silver_orders(fake_s3, 10, ["2025-01-10 08:00"] * 8)
+    put_silver_orders(fake_s3, 11, ["2025-01-11 01:00"] * 4 + ["2025-01-11 23:00"] * 4)
+
+    everything = transform_silver_to_gold.read_latest("orders_clean/")
+    assert len(everything) == 16 and "shipping_address" in everything.columns
+
+    fake_s3.range_gets = 0
+    orders = transform_silver_to_gold.read_latest(
+        "orders_clean/",
+        columns=["order_id", "order_date", "total_amount"],
+        start_date=date(2025, 1, 11),
+        end_date=date(2025, 1, 12),
+    )
+    assert list(orders.columns) == ["order_id", "order_date", "total_amount"]
+    assert len(orders) == 8
+    assert (orders["order_date"].dt.day == 11).all()
+    # Footer plus column chunks of one file only
+    assert 0 < fake_s3.range_gets <= 4
+
+
+def test_read_pruned_skips_row_groups_outside_the_range():
+    """Test row-group statistics exclude groups that cannot match"""
+    from streaming import read_pruned, row_groups_overlapping
+    from datetime import datetime
+
+    df = pd.DataFrame(
+        {
+            "order_date": pd.date_range("2025-01-01", periods=12, freq="D"),
+            "x": range(12),
+        }
+    )
+    buffer = BytesIO()
+    pq.write_table(
+        conform_dataframe(df, "silver", "orders_clean"), buffer, row_group_size=4
+    )
+    parquet_file = pq.ParquetFile(BytesIO(buffer.getvalue()))
+
+    low, high = datetime(2025, 1, 6), datetime(2025, 1, 8)
+    assert row_groups_overlapping(parquet_file.metadata, "order_date", low, high) == [1]
+    table = read_pruned(parquet_file, ["x"], ("order_date", low, high))
+    assert table.column_names == ["x"]
+    assert table.column("x").to_pylist() == [5, 6]
+
+
+def test_stream_writer_reports_columns_it_cannot_write(caplog):
+    """Test columns added after the file schema is fixed are named, not lost silently"""
+    import pyarrow as pa
+    from streaming import ParquetStreamWriter
+
+    with ParquetStreamWriter() as writer:
+        writer.write(pa.table({"order_id": ["O1"], "total_amount": [1.0]}))
+        writer.write(pa.table({"order_id": ["O2", "O3"], "coupon": ["A", "B"]}))
+        writer.write(pa.table({"order_id": ["O4"], "coupon": ["C"]}))
+        writer.finish()
+
+        assert writer.dropped_columns == {"coupon": 3}
+        assert [record.message for record in caplog.records].count(
+            "Column coupon is not in the file schema, fixed by an earlier batch; "
+            "dropping it"
+        ) == 1
+        written = pq.read_table(writer.file)
+    assert written.column_names == ["order_id", "total_amount"]
+    assert written.column("total_amount").to_pylist() == [1.0, None, None, None]
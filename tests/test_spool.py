@@ -0,0 +1,99 @@
+"""
+Tests for the ingestion write-ahead spool
+"""
+
+import os
+import sys
+
+sys.path.append("src/ingestion")
+
+from spool import IngestionSpool  # noqa: E402
+
+
+class RecordingWriter:
+    """Writer keyed like write_to_s3: one key per (data type, batch)"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.objects = {}
+
+    def __call__(self, records, data_type, batch_id=None):
+        if self.fail:
+            raise IOError("simulated upload failure")
+        key = f"{data_type}s/{data_type}_20250127_100000_{batch_id}.parquet"
+        self.objects[key] = records
+        return key
+
+
+def records(start, count):
+    return [{"order_id": f"O{i}"} for i in range(start, start + count)]
+
+
+def test_flush_on_row_threshold_and_age(tmp_path):
+    """Test segments flush once they reach max_rows or max_age_seconds"""
+    spool = IngestionSpool(str(tmp_path), max_rows=5, max_age_seconds=60)
+    writer = RecordingWriter()
+
+    spool.append("order", records(0, 3))
+    assert spool.flush(writer) == []
+    assert spool.pending_rows("order") == 3
+
+    spool.append("order", records(3, 2))
+    [(data_type, key)] = spool.flush(writer)
+    assert data_type == "order"
+    assert [r["order_id"] for r in writer.objects[key]] == [f"O{i}" for i in range(5)]
+    assert spool.pending_rows("order") == 0
+
+    # Below the row threshold, but older than max_age_seconds
+    spool.append("customer", [{"customer_id": "C1"}])
+    [segment] = spool._segments("customer")
+    assert not spool.is_due(segment)
+    _, opened_at = spool._parse_segment(segment)
+    assert spool.is_due(segment, now=opened_at + 60)
+    assert spool.flush(writer, force=True)[0][0] == "customer"
+
+
+def test_segments_survive_a_crash(tmp_path):
+    """Test .log and .flushing segments left by a crash are flushed later"""
+    spool = IngestionSpool(str(tmp_path), max_rows=100)
+    spool.append("order", records(0, 2))
+    # The upload fails after the segment was renamed to .flushing
+    try:
+        spool.flush(RecordingWriter(fail=True), force=True)
+    except IOError:
+        pass
+    assert len(spool._segments("order", ".flushing")) == 1
+    spool.append("order", records(2, 1))
+    # A torn write: the crash came mid-append, before the acknowledgment
+    with open(spool._segments("order")[0], "ab") as f:
+        f.write(b'{"order_id": "O')
+
+    # A fresh spool over the directory, as in a recycled container
+    recovered = IngestionSpool(str(tmp_path), max_rows=100)
+    assert recovered.pending_rows("order") == 3
+    writer = RecordingWriter()
+    flushed = recovered.flush(writer, force=True)
+    assert len(flushed) == 2
+    ids = sorted(r["order_id"] for rows in writer.objects.values() for r in rows)
+    assert ids == ["O0", "O1", "O2"]
+    assert os.listdir(tmp_path) == [".lock"]
+
+
+def test_segments_flushed_in_the_same_second_get_their_own_objects(tmp_path):
+    """Test two segments of one data type never write the same key"""
+    spool = IngestionSpool(str(tmp_path), max_rows=2)
+    writer = RecordingWriter()
+
+    spool.append("order", records(0, 2))
+    # The first upload fails: its segment waits while the next one fills
+    try:
+        spool.flush(RecordingWriter(fail=True))
+    except IOError:
+        pass
+    spool.append("order", records(2, 2))
+    flushed = spool.flush(writer)
+
+    assert len(flushed) == 2
+    assert len(writer.objects) == 2
+    ids = sorted(r["order_id"] for rows in writer.objects.values() for r in rows)
+    assert ids == ["O0", "O1", "O2", "O3"]
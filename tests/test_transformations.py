@@ -111,3 +111,47 @@ def test_transform_orders_extracts_date_components():
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+def test_arrow_cleaning_backend_matches_pandas(monkeypatch):
+    """Test the Arrow kernels produce the same silver tables as pandas"""
+    import transform_bronze_to_silver
+    from schema_registry import conform_dataframe
+
+    customers = pd.DataFrame(
+        {
+            "customer_id": ["C1", "C2", "C3", "C4"],
+            "email": ["  TEST@Example.COM ", None, "ÉLODIE@mail.fr\t", "no-at-sign"],
+            "phone": ["(555) 123-4567", None, "+1 555.987.6543", ""],
+            "date_of_birth": ["1990-01-01", None, "1985-06-30", "bad"],
+        }
+    )
+    events = pd.DataFrame(
+        {
+            "event_id": ["E1", "E2", "E3"],
+            "customer_id": ["C1", None, "C2"],
+            "session_id": ["S1", "S1", None],
+            "event_type": ["page_view", "purchase", "unknown"],
+            "event_timestamp": [
+                "2025-01-26T23:59:59",
+                "2025-01-27T00:00:00.5",
+                "not a time",
+            ],
+        }
+    )
+
+    def silver(backend):
+        monkeypatch.setattr(transform_bronze_to_silver, "CLEANING_BACKEND", backend)
+        return (
+            conform_dataframe(
+                transform_customers(customers.copy()), "silver", "customers_clean"
+            ),
+            conform_dataframe(
+                transform_bronze_to_silver.transform_events(events.copy()),
+                "silver",
+                "events_clean",
+            ),
+        )
+
+    for expected, actual in zip(silver("pandas"), silver("arrow")):
+        assert actual.equals(expected)